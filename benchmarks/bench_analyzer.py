@@ -0,0 +1,123 @@
+"""
+Dataclass vs slots-based HourInfo/DayInfo in external/analyzer.py.
+
+The dataclass version below is the analyzer as it was before the slots
+rewrite, kept here as the reference. examples/response.json is scaled up by
+repeating its forecast days; both versions are timed and their peak and retained
+allocations are measured with tracemalloc.
+
+    python -m benchmarks.bench_analyzer --scale 500
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.stub_server import RESPONSE_PATH
+from external.analyzer import (
+    INPUT_CONDITION_PATH,
+    INPUT_DATE_PATH,
+    INPUT_DAY_HOURS_END,
+    INPUT_DAY_HOURS_START,
+    INPUT_DAY_SUITABLE_CONDITIONS,
+    INPUT_HOUR_PATH,
+    INPUT_HOURS_PATH,
+    INPUT_TEMPERATURE_PATH,
+    DayInfo,
+    deep_getitem,
+)
+
+
+@dataclass
+class DataclassHourInfo:
+    raw_data: Dict[str, tuple[str, int]] = field(repr=False)
+    condition: Optional[str] = field(init=False, default=None)
+    temperature: Optional[int] = field(init=False, default=None)
+    hour: Optional[int] = field(init=False, default=None)
+
+    def __post_init__(self):
+        self.hour = int(self.raw_data[INPUT_HOUR_PATH])
+        self.temperature = int(deep_getitem(self.raw_data, INPUT_TEMPERATURE_PATH))
+        self.condition = deep_getitem(self.raw_data, INPUT_CONDITION_PATH)
+
+
+@dataclass
+class DataclassDayInfo:
+    raw_data: Dict[str, tuple[str, int]] = field(repr=False)
+    hours: Optional[List[DataclassHourInfo]] = field(init=False, default=None)
+    date: Optional[str] = field(init=False, default=None)
+    hour_start: Optional[int] = field(init=False, default=None)
+    hour_end: Optional[int] = field(init=False, default=None)
+    hours_count: Optional[int] = field(init=False, default=None)
+    temperature_avg: Optional[float] = field(init=False, default=None)
+    relevant_condition_hours: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self.date = self.raw_data[INPUT_DATE_PATH]
+        temp = hours_count = conds_count = 0
+        self.hours = self.raw_data[INPUT_HOURS_PATH]
+        for hour_data in self.hours:
+            hour = int(hour_data[INPUT_HOUR_PATH])
+            if not INPUT_DAY_HOURS_START <= hour <= INPUT_DAY_HOURS_END:
+                continue
+            h_info = DataclassHourInfo(raw_data=hour_data)
+            self.hour_start = self.hour_start or h_info.hour
+            self.hour_end = h_info.hour
+            temp += h_info.temperature
+            if h_info.condition in INPUT_DAY_SUITABLE_CONDITIONS:
+                conds_count += 1
+            hours_count += 1
+        self.relevant_condition_hours = conds_count
+        self.hours_count = hours_count
+        if hours_count > 0:
+            self.temperature_avg = temp / hours_count
+
+
+def scaled_days(scale: int) -> list[dict]:
+    return json.loads(RESPONSE_PATH.read_bytes())["forecasts"] * scale
+
+
+def measure(parse: Callable[[dict], object], days: list[dict], repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for day in days:
+            parse(day)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    start_size, _ = tracemalloc.get_traced_memory()
+    parsed = [parse(day) for day in days]
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(
+        stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, "filename")
+    )
+    del parsed
+    return elapsed, peak - start_size, retained
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default=500, type=int, help="forecast days multiplier")
+    parser.add_argument("--repeat", default=5, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    days = scaled_days(args.scale)
+    hours = sum(len(day[INPUT_HOURS_PATH]) for day in days)
+    print(f"days: {len(days)}, hours: {hours}")
+
+    for name, parse in (("dataclass", DataclassDayInfo), ("slots", DayInfo)):
+        elapsed, peak, retained = measure(parse, days, args.repeat)
+        print(
+            f"{name:>10}: {elapsed * 1000:8.2f} ms  {elapsed / hours * 1e9:6.0f} ns/hour"
+            f"  peak {peak / 1024:6.0f} KiB  retained {retained / 1024:6.0f} KiB"
+        )
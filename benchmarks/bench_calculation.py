@@ -0,0 +1,92 @@
+"""
+Row-by-row calculate_city_weather vs ColumnarWeatherEngine.
+
+Every synthetic city gets a copy of examples/response.json forecasts with
+shifted temperatures, so the engines see distinct rows.
+
+    python -m benchmarks.bench_calculation --cities 18 1000 10000 100000
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.stub_server import RESPONSE_PATH
+from columnar import ColumnarWeatherEngine, np
+from tasks import DataCalculationTask
+
+
+def synthetic_cities(count: int) -> dict[str, dict]:
+    forecasts = json.loads(RESPONSE_PATH.read_bytes())["forecasts"]
+    variants = []
+    for shift in range(-5, 6):
+        variants.append(
+            {
+                "forecasts": [
+                    {
+                        "date": day["date"],
+                        "hours": [
+                            {
+                                "hour": hour["hour"],
+                                "temp": hour["temp"] + shift,
+                                "condition": hour["condition"],
+                            }
+                            for hour in day["hours"]
+                        ],
+                    }
+                    for day in forecasts
+                ]
+            }
+        )
+    return {f"CITY{i}": variants[i % len(variants)] for i in range(count)}
+
+
+def bench_rows(cities: dict[str, dict]) -> tuple[float, list[dict]]:
+    started = time.perf_counter()
+    results = [
+        DataCalculationTask.calculate_city_weather(city, data)
+        for city, data in cities.items()
+    ]
+    return time.perf_counter() - started, results
+
+
+def bench_columnar(
+    cities: dict[str, dict], use_numpy: bool
+) -> tuple[float, float, list[dict]]:
+    """Packing (overlaps with fetching in the task) and reduction are timed apart"""
+    engine = ColumnarWeatherEngine(use_numpy=use_numpy)
+    started = time.perf_counter()
+    for city, data in cities.items():
+        engine.add(city, data)
+    packed = time.perf_counter()
+    results = engine.run()
+    return packed - started, time.perf_counter() - packed, results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cities", nargs="+", default=[18, 1000, 10000, 100000], type=int
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    modes = ["python"] + (["numpy"] if np is not None else [])
+    print(
+        f"{'cities':>8} {'rows':>9} "
+        + " ".join(f"{m + ' pack/reduce':>22}" for m in modes)
+    )
+    for count in args.cities:
+        cities = synthetic_cities(count)
+        rows_time, expected = bench_rows(cities)
+        timings = []
+        for mode in modes:
+            pack, reduce, results = bench_columnar(cities, use_numpy=mode == "numpy")
+            assert results == expected, f"{mode} engine output differs"
+            timings.append((pack, reduce))
+        print(
+            f"{count:>8} {rows_time:>8.3f}s "
+            + " ".join(f"{pack:>12.3f}s /{reduce:>7.3f}s" for pack, reduce in timings)
+        )
@@ -0,0 +1,54 @@
+"""
+Full json.loads vs projected decoding of a forecast payload.
+
+examples/response.json is scaled up by repeating its forecast days, then both
+modes are timed and their peak allocations are measured with tracemalloc.
+
+    python -m benchmarks.bench_decode --scale 50
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks.stub_server import RESPONSE_PATH
+from external.projection import decode_forecast
+
+
+def scaled_payload(scale: int) -> bytes:
+    data = json.loads(RESPONSE_PATH.read_bytes())
+    data["forecasts"] = data["forecasts"] * scale
+    return json.dumps(data).encode("utf-8")
+
+
+def measure(decode: Callable[[], dict], repeat: int) -> tuple[float, int]:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode()
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    result = decode()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default=50, type=int, help="forecast days multiplier")
+    parser.add_argument("--repeat", default=20, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    body = scaled_payload(args.scale)
+    print(f"payload: {len(body) / 1024:.0f} KiB")
+
+    for mode, projected in (("full", False), ("projected", True)):
+        elapsed, peak = measure(lambda: decode_forecast(body, projected), args.repeat)
+        print(f"{mode:>10}: {elapsed * 1000:8.2f} ms  peak {peak / 1024:8.0f} KiB")
@@ -0,0 +1,55 @@
+"""
+Thread-pool DataFetchingTask vs AsyncDataFetchingTask against the local stand-in server.
+
+    python -m benchmarks.bench_fetch --cities 500 --latency 0.05
+"""
+
+import argparse
+import logging
+import time
+from queue import Queue
+
+from benchmarks.stub_server import StubForecastServer
+from tasks import AsyncDataFetchingTask, DataFetchingTask
+
+
+def bench(task_cls, cities: dict[str, str], **options) -> tuple[float, int]:
+    queue: Queue = Queue()
+    task = task_cls(cities, queue, **options)
+    started = time.perf_counter()
+    task.run()
+    elapsed = time.perf_counter() - started
+
+    fetched = 0
+    while not queue.empty():
+        fetched += sum(1 for data in queue.get().values() if data)
+    return elapsed, fetched
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", default=200, type=int)
+    parser.add_argument("--latency", default=0.05, type=float, help="seconds")
+    parser.add_argument("--concurrency", default=100, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with StubForecastServer(latency=args.latency) as server:
+        cities = server.cities(args.cities)
+        results = {
+            "threads": bench(DataFetchingTask, cities),
+            "asyncio": bench(
+                AsyncDataFetchingTask, cities, concurrency=args.concurrency
+            ),
+        }
+
+    print(f"{args.cities} cities, {args.latency * 1000:.0f} ms latency")
+    for engine, (elapsed, fetched) in results.items():
+        print(
+            f"{engine:>8}: {elapsed:7.3f}s  {fetched / elapsed:8.1f} cities/s  "
+            f"({fetched}/{args.cities} ok)"
+        )
@@ -0,0 +1,92 @@
+"""
+Per-row cost of the shared HourFilter vs the inline checks it replaced.
+
+The inline versions below are the loops of DataCalculationTask and
+DayInfo.parse before the filter: ``9 <= int(hour) <= 19`` plus a list
+membership test, with the hour string converted again for the range check
+in the analyzer. Rows come from the synthetic forecast generator.
+
+    python -m benchmarks.bench_filters --days 20000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable
+
+from benchmarks.synthetic import generate_forecast
+from external.analyzer import DAY_FILTER, INPUT_DAY_SUITABLE_CONDITIONS
+from external.filters import CONDITION_CODES, HOUR_VALUES
+
+
+def inline_projected(rows: list[tuple[int, int, str]]) -> tuple[int, int, int]:
+    count = temp_sum = suitable = 0
+    for hour, temp, condition in rows:
+        if 9 <= hour <= 19:
+            count += 1
+            temp_sum += temp
+            if condition in INPUT_DAY_SUITABLE_CONDITIONS:
+                suitable += 1
+    return count, temp_sum, suitable
+
+
+def inline_raw(rows: list[dict]) -> tuple[int, int, int]:
+    count = temp_sum = suitable = 0
+    for row in rows:
+        if not 9 <= int(row["hour"]) <= 19:
+            continue
+        hour = int(row["hour"])  # noqa: F841 -- второе преобразование, как в HourInfo
+        temp_sum += int(row["temp"])
+        if row["condition"] in INPUT_DAY_SUITABLE_CONDITIONS:
+            suitable += 1
+        count += 1
+    return count, temp_sum, suitable
+
+
+def measure(evaluate: Callable, days: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for day in days:
+            evaluate(day)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", default=20000, type=int)
+    parser.add_argument("--repeat", default=5, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    forecast = generate_forecast(random.Random(args.seed), days=args.days)
+    raw_days = [day["hours"] for day in forecast["forecasts"]]
+    projected_days = [
+        [(HOUR_VALUES[h["hour"]], h["temp"], h["condition"]) for h in hours]
+        for hours in raw_days
+    ]
+    column_days = [
+        (
+            [hour for hour, _, _ in rows],
+            [temp for _, temp, _ in rows],
+            [CONDITION_CODES[condition] for _, _, condition in rows],
+        )
+        for rows in projected_days
+    ]
+    rows = sum(map(len, raw_days))
+    print(f"days: {len(raw_days)}, rows: {rows}")
+
+    cases = (
+        ("raw inline", inline_raw, raw_days),
+        ("raw filter", DAY_FILTER.evaluate_raw, raw_days),
+        ("rows inline", inline_projected, projected_days),
+        ("rows filter", DAY_FILTER.evaluate, projected_days),
+        ("codes filter", lambda day: DAY_FILTER.evaluate_codes(*day), column_days),
+    )
+    for name, evaluate, days in cases:
+        elapsed = measure(evaluate, days, args.repeat)
+        print(f"{name:>13}: {elapsed * 1000:8.2f} ms  {elapsed / rows * 1e9:6.1f} ns/row")
@@ -0,0 +1,97 @@
+"""
+Cold start of the entry points, measured with ``python -X importtime``.
+
+Every module is imported in a fresh interpreter; the cumulative import time
+of the module itself and the wall time of the whole process (interpreter
+startup included) are reported as medians, plus the heaviest imports.
+
+    python -m benchmarks.bench_startup --modules main service --repeat 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = ("main", "service", "sharding", "external.analyzer")
+
+
+@dataclass
+class ImportTime:
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """Lines like ``import time:       412 |       1270 |     weakref``"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # заголовок таблицы
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        imports.append(
+            ImportTime(stripped, depth, int(fields[0]), int(fields[1]))
+        )
+    return imports
+
+
+def import_times(module: str) -> tuple[list[ImportTime], float]:
+    """Imports of ``module`` in a fresh interpreter and the process wall time"""
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(process.stderr), time.perf_counter() - started
+
+
+def cold_start(module: str) -> tuple[float, float]:
+    """(import seconds of ``module``, process wall seconds)"""
+    imports, wall = import_times(module)
+    own = next(
+        item for item in imports if item.name == module and item.depth == 0
+    )
+    return own.cumulative_us / 1e6, wall
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", default=5, type=int)
+    parser.add_argument(
+        "--top", default=10, type=int, help="heaviest imports shown"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for module in args.modules:
+        runs = [cold_start(module) for _ in range(args.repeat)]
+        imported = statistics.median(run[0] for run in runs)
+        wall = statistics.median(run[1] for run in runs)
+        print(
+            f"{module:>18}: import {imported * 1000:7.1f} ms, "
+            f"process {wall * 1000:7.1f} ms"
+        )
+
+    imports, _ = import_times(args.modules[0])
+    print(f"\nheaviest imports of {args.modules[0]} (cumulative, direct children):")
+    children = [item for item in imports if item.depth == 1]
+    children.sort(key=lambda item: -item.cumulative_us)
+    for item in children[: args.top]:
+        print(f"{item.name:>30}: {item.cumulative_us / 1000:7.1f} ms")
@@ -0,0 +1,193 @@
+"""
+Local stand-in for code.s3.yandex.net: answers every GET with the same
+forecast payload (examples/response.json by default) after a configurable delay.
+FaultyForecastServer additionally injects errors, stalls and resets.
+
+    python -m benchmarks.stub_server --port 8080 --latency 0.05
+"""
+
+import argparse
+import gzip
+import hashlib
+import threading
+import time
+from collections import deque
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+FAULTS = ("ok", "error", "stall", "reset", "trickle")
+TRICKLE_PIECES = 20
+
+RESPONSE_PATH = Path(__file__).resolve().parent.parent / "examples" / "response.json"
+
+
+class ForecastHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # заголовки и тело уходят отдельными write: без TCP_NODELAY тело ждёт
+    # delayed ACK клиента, и к каждому ответу добавляется ~40 мс
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body, gzipped_body, etag = self.server.payload_for(self.path)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.server.last_modified)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzipped_body
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FaultInjectingHandler(ForecastHandler):
+    """
+    Answers according to the next scheduled fault of the request path:
+    "error" is a 503, "stall" sleeps ``server.stall`` seconds before the
+    normal answer, "reset" closes the connection without a response,
+    "trickle" sends the body in pieces spread over ``server.stall`` seconds.
+    """
+
+    def do_GET(self):
+        fault = self.server.next_fault(self.path)
+        if fault == "error":
+            self.server.count_request()
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if fault == "reset":
+            self.server.count_request()
+            self.close_connection = True
+            return
+        if fault == "stall":
+            time.sleep(self.server.stall)
+        if fault == "trickle":
+            self.trickle()
+            return
+        super().do_GET()
+
+    def trickle(self) -> None:
+        self.server.count_request()
+        body = self.server.payload
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        step = -(-len(body) // TRICKLE_PIECES)
+        try:
+            for start in range(0, len(body), step):
+                self.wfile.write(body[start : start + step])
+                time.sleep(self.server.stall / TRICKLE_PIECES)
+        except (BrokenPipeError, ConnectionResetError):
+            # клиент не дождался -- так и задумано
+            self.close_connection = True
+
+
+class StubForecastServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        payload: Optional[bytes] = None,
+        handler=ForecastHandler,
+    ):
+        super().__init__((host, port), handler)
+        self.latency = latency
+        self.payload = payload if payload is not None else RESPONSE_PATH.read_bytes()
+        self.gzipped_payload = gzip.compress(self.payload)
+        self.etag = '"{}"'.format(hashlib.sha1(self.payload).hexdigest())
+        self.last_modified = formatdate(usegmt=True)
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests_served += 1
+
+    def payload_for(self, path: str) -> tuple[bytes, bytes, str]:
+        """Body, gzipped body and ETag served for ``path``"""
+        return self.payload, self.gzipped_payload, self.etag
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def cities(self, count: int) -> dict[str, str]:
+        """Synthetic city registry whose URLs all point at this server"""
+        return {f"CITY{i}": f"{self.url}/city{i}-response.json" for i in range(count)}
+
+    def start(self) -> "StubForecastServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "StubForecastServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class FaultyForecastServer(StubForecastServer):
+    """
+    StubForecastServer with scheduled faults: ``schedule(path, "error",
+    "stall")`` makes the next two requests of ``path`` fail that way, after
+    which it answers normally again. ``default_fault`` applies to requests
+    with nothing scheduled, e.g. "error" for a host that is down.
+    """
+
+    def __init__(self, *args, stall: float = 1.0, default_fault: str = "ok", **kwargs):
+        kwargs.setdefault("handler", FaultInjectingHandler)
+        super().__init__(*args, **kwargs)
+        self.stall = stall
+        self.default_fault = default_fault
+        self._faults: dict[str, deque] = {}
+
+    def schedule(self, path: str, *faults: str) -> None:
+        unknown = set(faults) - set(FAULTS)
+        if unknown:
+            raise ValueError(f"Unknown faults: {unknown}")
+        with self._lock:
+            self._faults.setdefault(path, deque()).extend(faults)
+
+    def next_fault(self, path: str) -> str:
+        with self._lock:
+            faults = self._faults.get(path)
+            return faults.popleft() if faults else self.default_fault
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=8080, type=int)
+    parser.add_argument("--latency", default=0.0, type=float, help="seconds")
+    args = parser.parse_args()
+
+    server = StubForecastServer(args.host, args.port, args.latency)
+    print(f"Serving {RESPONSE_PATH} on {server.url}")
+    server.serve_forever()
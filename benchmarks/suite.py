@@ -0,0 +1,411 @@
+"""
+Per-stage and end-to-end benchmarks on synthetic forecasts.
+
+Every benchmark runs once under tracemalloc for peak memory, then ``repeat``
+times for timing; the fastest run gives the throughput and its per-item
+samples the p50/p99 latency. Results are written to ``--output`` and compared
+with ``--baseline``: throughput lower, or p99 or peak memory higher, by more
+than ``--tolerance`` counts as a regression and the suite exits with 1.
+
+    python -m benchmarks.suite --cities 200 --latency 0.005 --save-baseline
+    python -m benchmarks.suite --cities 200 --latency 0.005
+
+Memory of the calculation process pool is not traced, only the parent's.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from queue import Queue
+from typing import Any, Callable, Optional
+
+from benchmarks.bench_startup import cold_start
+from benchmarks.synthetic import (
+    DEFAULT_DAYS,
+    DEFAULT_HOURS,
+    SyntheticForecastServer,
+    generate_cities,
+)
+from output import JsonLinesWriter
+from pipeline import Pipeline
+from tasks import (
+    AsyncDataFetchingTask,
+    DataAggregationTask,
+    DataAnalyzingTask,
+    DataCalculationTask,
+    DataFetchingTask,
+)
+
+DEFAULT_OUTPUT = "benchmarks/results.json"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+DEFAULT_TOLERANCE = 0.15
+STARTUP_RUNS = 5
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchConfig:
+    cities: int = 200
+    days: int = DEFAULT_DAYS
+    hours: int = DEFAULT_HOURS
+    seed: int = 0
+    latency: float = 0.005
+    repeat: int = 3
+
+
+@dataclass
+class BenchResult:
+    name: str
+    items: int
+    seconds: float
+    throughput: float  # элементов в секунду
+    p50: float
+    p99: float
+    peak_kib: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            key: round(value, 6) if isinstance(value, float) else value
+            for key, value in asdict(self).items()
+        }
+
+
+@dataclass
+class BenchContext:
+    config: BenchConfig
+    urls: dict[str, str]
+    forecasts: dict[str, dict[str, Any]]
+    results: list[dict[str, Any]] = field(default_factory=list)
+    workdir: str = "."
+
+
+# бенчмарк возвращает число обработанных элементов и задержки по элементам
+Bench = Callable[[BenchContext], tuple[int, list[float]]]
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile, 0.0 for no samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class TimedQueue(Queue):
+    """Queue recording when items are taken: consecutive gets give per-item time"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.taken: list[float] = []
+
+    def get(self, *args, **kwargs):
+        item = super().get(*args, **kwargs)
+        self.taken.append(time.perf_counter())
+        return item
+
+
+class TimedFetchingTask(DataFetchingTask):
+    """DataFetchingTask remembering when every city was started and how long it took"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started: dict[str, float] = {}
+        self.latencies: list[float] = []
+
+    def _fetch(self, city: str, url: str) -> dict[str, Any]:
+        started = self.started[city] = time.perf_counter()
+        city_data = super()._fetch(city, url)
+        self.latencies.append(time.perf_counter() - started)
+        return city_data
+
+
+class TimedAsyncFetchingTask(AsyncDataFetchingTask):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: list[float] = []
+
+    async def fetch_weather_data(self, client, city: str, url: str) -> dict[str, Any]:
+        started = time.perf_counter()
+        city_data = await super().fetch_weather_data(client, city, url)
+        self.latencies.append(time.perf_counter() - started)
+        return city_data
+
+
+def _prefilled(items: list[Any]) -> TimedQueue:
+    queue = TimedQueue()
+    for item in items:
+        queue.put(item)
+    queue.put(None)
+    return queue
+
+
+def _gaps(started: float, taken: list[float]) -> list[float]:
+    # последний get забирает None, он в задержки не входит
+    moments = [started, *taken[:-1]]
+    return [end - begin for begin, end in zip(moments, moments[1:])]
+
+
+def bench_fetch_threads(context: BenchContext) -> tuple[int, list[float]]:
+    task = TimedFetchingTask(context.urls, Queue())
+    task.run()
+    return len(context.urls), task.latencies
+
+
+def bench_fetch_asyncio(context: BenchContext) -> tuple[int, list[float]]:
+    task = TimedAsyncFetchingTask(context.urls, Queue())
+    task.run()
+    return len(context.urls), task.latencies
+
+
+def bench_calculate_inline(context: BenchContext) -> tuple[int, list[float]]:
+    samples = []
+    for city, data in context.forecasts.items():
+        started = time.perf_counter()
+        DataCalculationTask.calculate_city_weather(city, data)
+        samples.append(time.perf_counter() - started)
+    return len(samples), samples
+
+
+def bench_calculate_pool(context: BenchContext) -> tuple[int, list[float]]:
+    """Samples are batch round trips: the pool returns results per batch"""
+    input_queue = _prefilled(
+        [{city: data} for city, data in context.forecasts.items()]
+    )
+    task = DataCalculationTask(input_queue, Queue())
+    task.run()
+    return len(context.forecasts), [t.round_trip for t in task.batch_timings]
+
+
+def bench_aggregate(context: BenchContext) -> tuple[int, list[float]]:
+    input_queue = _prefilled(context.results)
+    path = Path(context.workdir) / "aggregated_data.jsonl"
+    started = time.perf_counter()
+    with JsonLinesWriter(path) as writer:
+        DataAggregationTask(writer=writer).consume(input_queue)
+    return len(context.results), _gaps(started, input_queue.taken)
+
+
+def bench_analyze(context: BenchContext) -> tuple[int, list[float]]:
+    input_queue = _prefilled(context.results)
+    started = time.perf_counter()
+    DataAnalyzingTask().consume(input_queue)
+    return len(context.results), _gaps(started, input_queue.taken)
+
+
+def bench_end_to_end(context: BenchContext) -> tuple[int, list[float]]:
+    """Samples are per city: from the start of its request to its ranking"""
+    fetching: Optional[TimedFetchingTask] = None
+    analyzing_task = DataAnalyzingTask()
+    samples: list[float] = []
+
+    def fetch(_, output_queue):
+        nonlocal fetching
+        fetching = TimedFetchingTask(context.urls, output_queue)
+        fetching.run()
+
+    def analyze(input_queue, _):
+        while True:
+            city_weather = input_queue.get()
+            if city_weather is None:
+                break
+            analyzing_task.add(city_weather)
+            started = fetching.started[city_weather["city"]]
+            samples.append(time.perf_counter() - started)
+        return analyzing_task.run()
+
+    pipeline = Pipeline()
+    pipeline.add_stage("fetch", fetch)
+    pipeline.add_stage(
+        "calculate",
+        lambda input_queue, output_queue: DataCalculationTask(
+            input_queue, output_queue
+        ).run(),
+    )
+    path = Path(context.workdir) / "end_to_end.jsonl"
+    with JsonLinesWriter(path) as writer:
+        pipeline.add_stage("aggregate", DataAggregationTask(writer=writer).consume)
+        pipeline.add_stage("analyze", analyze)
+        pipeline.run()
+    return len(samples), samples
+
+
+def bench_startup(context: BenchContext) -> tuple[int, list[float]]:
+    """Samples are import times of main.py, each in a fresh interpreter"""
+    samples = [cold_start("main")[0] for _ in range(STARTUP_RUNS)]
+    return len(samples), samples
+
+
+BENCHMARKS: dict[str, Bench] = {
+    "fetch_threads": bench_fetch_threads,
+    "fetch_asyncio": bench_fetch_asyncio,
+    "calculate_inline": bench_calculate_inline,
+    "calculate_pool": bench_calculate_pool,
+    "aggregate": bench_aggregate,
+    "analyze": bench_analyze,
+    "end_to_end": bench_end_to_end,
+    "startup": bench_startup,
+}
+
+
+def measure(
+    name: str, bench: Bench, context: BenchContext, repeat: int
+) -> BenchResult:
+    # отдельный прогон под tracemalloc: трассировка заметно замедляет код
+    tracemalloc.start()
+    try:
+        bench(context)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best: Optional[tuple[float, int, list[float]]] = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        items, samples = bench(context)
+        seconds = time.perf_counter() - started
+        if best is None or seconds < best[0]:
+            best = (seconds, items, samples)
+
+    seconds, items, samples = best
+    return BenchResult(
+        name=name,
+        items=items,
+        seconds=seconds,
+        throughput=items / seconds if seconds else 0.0,
+        p50=percentile(samples, 50),
+        p99=percentile(samples, 99),
+        peak_kib=peak / 1024,
+    )
+
+
+def run_suite(
+    config: BenchConfig, only: Optional[list[str]] = None
+) -> dict[str, BenchResult]:
+    names = only or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    forecasts = generate_cities(config.cities, config.seed, config.days, config.hours)
+    results = {}
+    with SyntheticForecastServer(
+        config.seed, config.days, config.hours, latency=config.latency
+    ) as server, tempfile.TemporaryDirectory() as workdir:
+        context = BenchContext(
+            config=config,
+            urls=server.cities(config.cities),
+            forecasts=forecasts,
+            results=[
+                DataCalculationTask.calculate_city_weather(city, data)
+                for city, data in forecasts.items()
+            ],
+            workdir=workdir,
+        )
+        for name in names:
+            logger.info("Running %s", name)
+            results[name] = measure(name, BENCHMARKS[name], context, config.repeat)
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """Regressions of ``results`` against ``baseline``, both {name: to_dict()}"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput']:.1f}/s, "
+                f"baseline {previous['throughput']:.1f}/s"
+            )
+        for key, unit, scale in (("p99", "ms", 1000), ("peak_kib", "KiB", 1)):
+            if previous[key] and result[key] > previous[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {result[key] * scale:.2f} {unit}, "
+                    f"baseline {previous[key] * scale:.2f} {unit}"
+                )
+    return regressions
+
+
+def format_table(results: dict[str, BenchResult]) -> str:
+    lines = [
+        f"{'benchmark':<18}{'items':>7}{'seconds':>10}{'items/s':>11}"
+        f"{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>11}"
+    ]
+    for result in results.values():
+        lines.append(
+            f"{result.name:<18}{result.items:>7}{result.seconds:>10.3f}"
+            f"{result.throughput:>11.1f}{result.p50 * 1000:>10.3f}"
+            f"{result.p99 * 1000:>10.3f}{result.peak_kib:>11.1f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", default=BenchConfig.cities, type=int)
+    parser.add_argument("--days", default=DEFAULT_DAYS, type=int)
+    parser.add_argument("--hours", default=DEFAULT_HOURS, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument(
+        "--latency", default=BenchConfig.latency, type=float, help="seconds"
+    )
+    parser.add_argument("--repeat", default=BenchConfig.repeat, type=int)
+    parser.add_argument(
+        "--only", nargs="+", choices=BENCHMARKS.keys(), help="benchmarks to run"
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance", default=DEFAULT_TOLERANCE, type=float, help="e.g. 0.15"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    config = BenchConfig(
+        args.cities, args.days, args.hours, args.seed, args.latency, args.repeat
+    )
+    results = run_suite(config, args.only)
+    print(format_table(results))
+
+    document = {
+        "config": asdict(config),
+        "results": {name: result.to_dict() for name, result in results.items()},
+    }
+    Path(args.output).write_text(json.dumps(document, indent=2))
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(document, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    try:
+        baseline = json.loads(Path(args.baseline).read_text())
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+        sys.exit(0)
+    if baseline["config"] != document["config"]:
+        print("Warning: baseline was recorded with a different config")
+    regressions = compare(document["results"], baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,183 @@
+"""
+Seeded synthetic forecasts shaped like examples/response.json.
+
+Every city gets its own climate (base temperature, daily amplitude, chance of
+rain) from a generator seeded with ``f"{seed}:{city}"``, so the same seed and
+city always give the same payload. All fields of the real response are kept,
+only dates, hours, temperatures and conditions are generated.
+
+    python -m benchmarks.synthetic --cities 3 --days 2 --hours 24
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import random
+import threading
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Optional
+
+from benchmarks.stub_server import RESPONSE_PATH, StubForecastServer
+
+DEFAULT_DAYS = 5
+DEFAULT_HOURS = 24
+DEFAULT_START = date(2022, 5, 18)
+DRY_CONDITIONS = ("clear", "partly-cloudy", "cloudy", "overcast")
+WET_CONDITIONS = (
+    "drizzle",
+    "light-rain",
+    "rain",
+    "moderate-rain",
+    "heavy-rain",
+    "showers",
+    "wet-snow",
+    "light-snow",
+    "snow",
+    "thunderstorm",
+    "thunderstorm-with-rain",
+)
+MSK = timezone(timedelta(hours=3))
+
+
+@lru_cache(maxsize=1)
+def _template() -> dict[str, Any]:
+    return json.loads(RESPONSE_PATH.read_bytes())
+
+
+def generate_forecast(
+    rng: random.Random,
+    days: int = DEFAULT_DAYS,
+    hours: int = DEFAULT_HOURS,
+    start: date = DEFAULT_START,
+) -> dict[str, Any]:
+    template = _template()
+    day_template = {
+        key: value for key, value in template["forecasts"][0].items() if key != "hours"
+    }
+    hour_template = template["forecasts"][0]["hours"][0]
+
+    base_temp = rng.uniform(-15, 30)
+    amplitude = rng.uniform(2, 8)
+    rain_chance = rng.uniform(0.05, 0.6)
+
+    forecasts = []
+    for day_number in range(days):
+        day = start + timedelta(days=day_number)
+        day_ts = int(datetime(day.year, day.month, day.day, tzinfo=MSK).timestamp())
+        drift = rng.uniform(-3, 3)
+        raining = rng.random() < rain_chance
+        day_hours = []
+        for hour in range(hours):
+            # минимум около 4 утра, максимум около 16
+            diurnal = -math.cos((hour - 4) / 24 * 2 * math.pi)
+            temp = round(base_temp + drift + amplitude * diurnal + rng.gauss(0, 1))
+            wet = raining and rng.random() < 0.5
+            day_hours.append(
+                {
+                    **hour_template,
+                    "hour": str(hour),
+                    "hour_ts": day_ts + hour * 3600,
+                    "temp": temp,
+                    "feels_like": temp - rng.randint(0, 4),
+                    "condition": rng.choice(WET_CONDITIONS if wet else DRY_CONDITIONS),
+                    "prec_mm": round(rng.uniform(0.1, 4), 1) if wet else 0,
+                }
+            )
+        forecasts.append(
+            {
+                **day_template,
+                "date": day.isoformat(),
+                "date_ts": day_ts,
+                "week": day.isocalendar()[1],
+                "hours": day_hours,
+            }
+        )
+
+    forecast = {key: value for key, value in template.items() if key != "forecasts"}
+    forecast["forecasts"] = forecasts
+    return forecast
+
+
+def generate_cities(
+    count: int,
+    seed: int = 0,
+    days: int = DEFAULT_DAYS,
+    hours: int = DEFAULT_HOURS,
+) -> dict[str, dict[str, Any]]:
+    return {
+        f"CITY{i}": generate_forecast(random.Random(f"{seed}:CITY{i}"), days, hours)
+        for i in range(count)
+    }
+
+
+def generate_payload(
+    city: str, seed: int = 0, days: int = DEFAULT_DAYS, hours: int = DEFAULT_HOURS
+) -> bytes:
+    forecast = generate_forecast(random.Random(f"{seed}:{city}"), days, hours)
+    return json.dumps(forecast).encode("utf-8")
+
+
+class SyntheticForecastServer(StubForecastServer):
+    """
+    Stand-in server with a generated payload per city: ``/CITY7`` and the
+    ``cities(n)`` URLs serve the forecast of generate_payload("CITY7").
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        days: int = DEFAULT_DAYS,
+        hours: int = DEFAULT_HOURS,
+        latency: float = 0.0,
+        **kwargs,
+    ):
+        super().__init__(latency=latency, **kwargs)
+        self.seed = seed
+        self.days = days
+        self.hours = hours
+        self._payloads: dict[str, tuple[bytes, bytes, str]] = {}
+        self._payloads_lock = threading.Lock()
+
+    def cities(self, count: int) -> dict[str, str]:
+        return {f"CITY{i}": f"{self.url}/CITY{i}" for i in range(count)}
+
+    def payload_for(self, path: str) -> tuple[bytes, bytes, str]:
+        city = path.strip("/").split("/")[0].split("?")[0]
+        with self._payloads_lock:
+            cached: Optional[tuple[bytes, bytes, str]] = self._payloads.get(city)
+        if cached is not None:
+            return cached
+        body = generate_payload(city, self.seed, self.days, self.hours)
+        cached = (
+            body,
+            gzip.compress(body),
+            '"{}"'.format(hashlib.sha1(body).hexdigest()),
+        )
+        with self._payloads_lock:
+            self._payloads[city] = cached
+        return cached
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", default=3, type=int)
+    parser.add_argument("--days", default=DEFAULT_DAYS, type=int)
+    parser.add_argument("--hours", default=DEFAULT_HOURS, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    args = parser.parse_args()
+
+    cities = generate_cities(args.cities, args.seed, args.days, args.hours)
+    preview = {
+        city: [
+            (
+                day["date"],
+                [(h["hour"], h["temp"], h["condition"]) for h in day["hours"]],
+            )
+            for day in forecast["forecasts"]
+        ]
+        for city, forecast in cities.items()
+    }
+    print(json.dumps(preview, indent=1))
@@ -0,0 +1,178 @@
+import logging
+from array import array
+from itertools import chain, islice, repeat
+from operator import itemgetter
+from typing import Any, Optional
+
+from external.analyzer import DAY_FILTER
+from external.filters import CONDITION_CODES, HOUR_VALUES, HourFilter
+
+try:
+    import numpy as np
+except ImportError:  # numpy -- необязательная зависимость (extra "columnar")
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_ROW_FIELDS = itemgetter("temp", "condition")
+
+
+class ColumnarWeatherEngine:
+    """
+    Batch counterpart of DataCalculationTask.calculate_city_weather.
+
+    Hours of all added cities that fall into the window are packed into flat
+    columns (temperature, condition code, plus rows per day and day -> city
+    index) and the daily and per-city sums are computed with grouped
+    reductions over those columns -- ``numpy.bincount`` when numpy is
+    installed, a single pass over the arrays otherwise. The window and the
+    suitable conditions come from ``day_filter``: its window shifted to each
+    city's timezone (``HourFilter.for_city``) and its condition bitmask over
+    the shared CONDITION_CODES. Results are identical to the row engine,
+    including ``int()`` truncation of averages and fractional temperatures.
+    """
+
+    def __init__(
+        self,
+        day_filter: HourFilter = DAY_FILTER,
+        use_numpy: Optional[bool] = None,
+    ):
+        self.day_filter = day_filter
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        if self.use_numpy and np is None:
+            raise ImportError("numpy is required for use_numpy=True")
+
+        self.cities: list[str] = []
+        self.day_dates: list[str] = []
+        self.day_city = array("q")
+        self.temps = array("d")
+        self.condition_codes = array("H")
+        # строки дня лежат подряд, поэтому вместо индекса дня в каждой строке
+        # храним только длину дня -- она же число часов дня в окне
+        self.day_rows = array("q")
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def add(self, city: str, data: dict[str, Any]) -> None:
+        """
+        Packs one city. All its columns are built and checked locally first,
+        so a broken city raises without leaving part of its rows behind.
+        """
+        forecasts = data.get("forecasts", [])
+        dates = [forecast["date"] for forecast in forecasts]
+        # окно у каждого города своё (часовой пояс); как и строковый движок,
+        # temp и condition часов вне окна не читаем
+        window = self.day_filter.for_city(data).hours
+        day_hours = [
+            [
+                hour
+                for hour in forecast.get("hours", [])
+                if HOUR_VALUES[hour["hour"]] in window
+            ]
+            for forecast in forecasts
+        ]
+        rows = list(chain.from_iterable(day_hours))
+        temps, conditions = zip(*map(_ROW_FIELDS, rows)) if rows else ((), ())
+        # float64: дробные температуры считаются так же, как в строковом движке
+        city_temps = array("d", temps)
+        city_codes = array("H", map(CONDITION_CODES.__getitem__, conditions))
+        city_day_rows = array("q", map(len, day_hours))
+
+        self.day_city.extend(repeat(len(self.cities), len(dates)))
+        self.cities.append(city)
+        self.day_dates.extend(dates)
+        self.temps.extend(city_temps)
+        self.condition_codes.extend(city_codes)
+        self.day_rows.extend(city_day_rows)
+
+    def _suitable_lookup(self) -> list[int]:
+        """Condition code -> 1 if suitable, from the filter's bitmask"""
+        mask = self.day_filter.mask
+        return [mask >> code & 1 for code in range(len(CONDITION_CODES))]
+
+    def _daily_sums_numpy(self) -> tuple[list[int], list[float], list[int]]:
+        days = len(self.day_dates)
+        day_rows = np.frombuffer(self.day_rows, dtype=np.int64)
+        row_day = np.repeat(np.arange(days), day_rows)
+        temps = np.frombuffer(self.temps, dtype=np.float64)
+        suitable = np.array(self._suitable_lookup(), dtype=np.int64)
+        codes = np.frombuffer(self.condition_codes, dtype=np.uint16)
+
+        # суммы целых в float64 точны до 2**53, деление даёт тот же float, что
+        # и int / int; bincount складывает по порядку строк, как строковый движок
+        temp_sums = np.bincount(row_day, weights=temps, minlength=days)
+        suitable_sums = np.bincount(
+            row_day, weights=suitable[codes] if len(codes) else None, minlength=days
+        )
+        return (
+            self.day_rows.tolist(),
+            temp_sums.tolist(),
+            suitable_sums.astype(np.int64).tolist(),
+        )
+
+    def _daily_sums_python(self) -> tuple[list[int], list[float], list[int]]:
+        days = len(self.day_dates)
+        temp_sums = [0.0] * days
+        suitable_sums = [0] * days
+        suitable = self._suitable_lookup()
+        rows = zip(self.temps, self.condition_codes)
+        for day, day_rows in enumerate(self.day_rows):
+            for temp, code in islice(rows, day_rows):
+                temp_sums[day] += temp
+                suitable_sums[day] += suitable[code]
+        return self.day_rows.tolist(), temp_sums, suitable_sums
+
+    def run(self) -> list[dict[str, Any]]:
+        if self.use_numpy:
+            counts, temp_sums, suitable_sums = self._daily_sums_numpy()
+        else:
+            counts, temp_sums, suitable_sums = self._daily_sums_python()
+
+        results = [
+            {
+                "city": city,
+                "daily_data": [],
+                "avg_temp": 0,
+                "no_precipitation_hours": 0,
+            }
+            for city in self.cities
+        ]
+        city_temp = [0.0] * len(self.cities)
+        city_hours = [0] * len(self.cities)
+        for day, city_index in enumerate(self.day_city):
+            count = counts[day]
+            if not count:
+                continue
+            result = results[city_index]
+            result["daily_data"].append(
+                {
+                    "date": self.day_dates[day],
+                    "avg_temp": int(temp_sums[day] / count),
+                    "no_precipitation_hours": suitable_sums[day],
+                }
+            )
+            result["no_precipitation_hours"] += suitable_sums[day]
+            city_temp[city_index] += temp_sums[day]
+            city_hours[city_index] += count
+
+        for city_index, result in enumerate(results):
+            if city_hours[city_index]:
+                result["avg_temp"] = int(city_temp[city_index] / city_hours[city_index])
+
+        logger.debug(
+            "Calculated %s cities, %s rows (numpy=%s)",
+            len(self.cities),
+            len(self.temps),
+            self.use_numpy,
+        )
+        return results
+
+    @classmethod
+    def calculate(
+        cls, cities_data: dict[str, dict[str, Any]], **options
+    ) -> list[dict[str, Any]]:
+        engine = cls(**options)
+        for city, data in cities_data.items():
+            engine.add(city, data)
+        return engine.run()
@@ -0,0 +1,175 @@
+"""
+Where CPU work runs: inline in the calling thread, in a thread pool or in a
+process pool.
+
+Starting worker processes costs tens of milliseconds, more than the whole
+calculation of a short city list, so ``choose_mode`` compares the estimated
+serial time (items x measured per-item cost) with the parallel one (pool
+startup + dispatch + work split between workers). A WorkerPool started once
+and shared (service, repeated batch runs) has no startup cost left.
+multiprocessing is imported only when a process pool is actually created.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Optional
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+AUTO = "auto"
+MODES = (AUTO, INLINE, THREAD, PROCESS)
+
+# оценки до первого замера: запуск пула процессов и пересылка одного города
+DEFAULT_POOL_STARTUP = 0.05
+PROCESS_ITEM_OVERHEAD = 50e-6
+# меньше этого работы всего -- никакой пул не окупится
+INLINE_WORK_LIMIT = 0.002
+
+logger = logging.getLogger(__name__)
+
+_measured_startup: Optional[float] = None
+_shared_pool: Optional["WorkerPool"] = None
+_shared_lock = threading.Lock()
+
+
+def gil_enabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def pool_startup_cost() -> float:
+    """Seconds to start a process pool: last measured, or an estimate"""
+    if _measured_startup is None:
+        return DEFAULT_POOL_STARTUP
+    return _measured_startup
+
+
+def choose_mode(
+    items: int,
+    item_cost: float,
+    workers: int,
+    pool_startup: float = DEFAULT_POOL_STARTUP,
+) -> str:
+    """
+    INLINE unless spreading ``items`` of ``item_cost`` seconds over
+    ``workers`` beats doing them in place, after ``pool_startup`` seconds
+    to start the pool (0 for a warm one). Without the GIL threads run
+    Python code in parallel and need no pickling, so THREAD is preferred
+    there; with the GIL only processes give a speedup.
+    """
+    serial = items * item_cost
+    if workers <= 1 or items <= 1 or serial < INLINE_WORK_LIMIT:
+        return INLINE
+    if not gil_enabled():
+        return THREAD
+    parallel = pool_startup + items * PROCESS_ITEM_OVERHEAD + serial / workers
+    return PROCESS if parallel < serial else INLINE
+
+
+class InlineExecutor(Executor):
+    """Runs every submitted call right away in the calling thread"""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def _noop() -> None:
+    pass
+
+
+class WorkerPool:
+    """
+    ProcessPoolExecutor started ahead of time: ``start`` spawns all workers
+    and waits until each has answered, so the first real batch does not pay
+    for process startup. The measured startup time is what ``pool_startup_cost``
+    reports as the estimate for the next pool.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor: Optional[Executor] = None
+        self.startup_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def warm(self) -> bool:
+        return self.executor is not None
+
+    def start(self) -> "WorkerPool":
+        global _measured_startup
+        with self._lock:
+            if self.executor is not None:
+                return self
+            # multiprocessing нужен только здесь -- не грузим его при импорте
+            from concurrent.futures import ProcessPoolExecutor
+
+            started = time.perf_counter()
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            warmups = [executor.submit(_noop) for _ in range(self.max_workers)]
+            for future in warmups:
+                future.result()
+            self.startup_seconds = time.perf_counter() - started
+            _measured_startup = self.startup_seconds
+            self.executor = executor
+        logger.info(
+            "Worker pool of %s started in %.3fs",
+            self.max_workers,
+            self.startup_seconds,
+        )
+        return self
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+
+def shared_pool(max_workers: Optional[int] = None) -> WorkerPool:
+    """Process-wide pre-warmed pool, started on first use and reused after"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = WorkerPool(max_workers)
+    return _shared_pool.start()
+
+
+def shutdown_shared_pool() -> None:
+    global _shared_pool
+    with _shared_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def make_executor(
+    mode: str, max_workers: int, pool: Optional[WorkerPool] = None
+) -> tuple[Executor, bool]:
+    """Executor for ``mode`` and whether the caller owns (shuts down) it"""
+    if mode == INLINE:
+        return InlineExecutor(), True
+    if mode == THREAD:
+        return ThreadPoolExecutor(max_workers=max_workers), True
+    if mode == PROCESS:
+        if pool is not None:
+            return pool.start().executor, False
+        from concurrent.futures import ProcessPoolExecutor
+
+        return ProcessPoolExecutor(max_workers=max_workers), True
+    raise ValueError(f"Unknown execution mode: {mode}")
@@ -1,13 +1,24 @@
 import argparse
+import glob
 import json
 import logging
-from dataclasses import dataclass, field
+import os
+import sys
+import time
 from functools import reduce
 from operator import getitem
-from typing import Optional, List, Dict
+from typing import Any, Callable, Iterable, Optional, Dict, TextIO
+
+try:
+    from external.filters import HOUR_VALUES, HourFilter
+except ImportError:  # запуск как скрипта из каталога external
+    from filters import HOUR_VALUES, HourFilter
 
 PATH_FROM_INPUT = "./../examples/response.json"
 PATH_TO_OUTPUT = "./../examples/output.json"
+BATCH_FILE_PATTERN = "*.json"
+BATCH_MAX_CHUNK_SIZE = 64
+BATCH_PROGRESS_EVERY = 1000
 
 INPUT_FORECAST_PATH = "forecasts"
 INPUT_DATE_PATH = "date"
@@ -39,6 +50,10 @@ INPUT_DAY_SUITABLE_CONDITIONS = [
     # "thunderstorm-with-rain",
     # "thunderstorm-with-hail"
 ]
+SUITABLE_CONDITIONS = frozenset(INPUT_DAY_SUITABLE_CONDITIONS)
+DAY_FILTER = HourFilter(
+    INPUT_DAY_HOURS_START, INPUT_DAY_HOURS_END, INPUT_DAY_SUITABLE_CONDITIONS
+)
 
 OUTPUT_RAW_DATA_KEY = "raw_data"
 OUTPUT_DAYS_KEY = "days"
@@ -55,6 +70,36 @@ def deep_getitem(obj, path: str):
         return None
 
 
+def compile_path(path: str) -> Callable[[Any], Any]:
+    """deep_getitem with the path split once, for lookups in hot loops"""
+    keys = tuple(path.split(">"))
+    if len(keys) == 1:
+        (key,) = keys
+
+        def getter(obj):
+            try:
+                return obj[key]
+            except (KeyError, TypeError):
+                return None
+
+        return getter
+
+    def getter(obj):
+        try:
+            for key in keys:
+                obj = obj[key]
+            return obj
+        except (KeyError, TypeError):
+            return None
+
+    return getter
+
+
+get_forecasts = compile_path(INPUT_FORECAST_PATH)
+get_temperature = compile_path(INPUT_TEMPERATURE_PATH)
+get_condition = compile_path(INPUT_CONDITION_PATH)
+
+
 def load_data(input_path: str = PATH_FROM_INPUT):
     with open(input_path) as file:
         data = file.read()
@@ -79,54 +124,106 @@ def parse_args():
     parser.add_argument(
         "-o",
         "--output",
-        default=PATH_TO_OUTPUT,
+        default=None,
+        type=str,
+        help=(
+            f"path to file with result, {PATH_TO_OUTPUT} by default; "
+            "JSON Lines to stdout by default in batch mode"
+        ),
+    )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        default=None,
         type=str,
-        help="path to file with result",
+        help="directory or glob of input files, analyzed in a process pool",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=None,
+        type=int,
+        help="processes for batch mode, CPU count by default",
     )
     parser.add_argument("-v", "--verbose", action="store_true")
     return parser.parse_args()
 
 
-@dataclass
 class HourInfo:
-    raw_data: Dict[str, tuple[str, int]] = field(repr=False)
-    condition: Optional[str] = field(init=False, default=None)
-    temperature: Optional[int] = field(init=False, default=None)
-    hour: Optional[int] = field(init=False, default=None)
+    """Fields of one forecast hour; the raw hour dict is not kept"""
+
+    __slots__ = ("hour", "temperature", "condition")
+
+    def __init__(self, raw_data: Optional[Dict[str, Any]] = None):
+        self.hour: Optional[int] = None
+        self.temperature: Optional[int] = None
+        self.condition: Optional[str] = None
+        if raw_data:
+            self.hour = HOUR_VALUES[raw_data[INPUT_HOUR_PATH]]
+            self.temperature = int(get_temperature(raw_data))
+            self.condition = get_condition(raw_data)
+
+    def __repr__(self):
+        return (
+            f"HourInfo(condition={self.condition!r}, "
+            f"temperature={self.temperature!r}, hour={self.hour!r})"
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, HourInfo):
+            return NotImplemented
+        return (self.hour, self.temperature, self.condition) == (
+            other.hour,
+            other.temperature,
+            other.condition,
+        )
 
     @staticmethod
     def is_hour_suitable(data):
-        hour = int(data[INPUT_HOUR_PATH])
-        return (hour >= INPUT_DAY_HOURS_START) and (hour <= INPUT_DAY_HOURS_END)
+        return DAY_FILTER.hour_suitable(data[INPUT_HOUR_PATH])
 
     @property
     def is_cond_suitable(self):
-        return self.condition in INPUT_DAY_SUITABLE_CONDITIONS
-
-    def __post_init__(self):
-        self.parse()
-
-    def parse(self):
-        if not self.raw_data:
-            return
+        return DAY_FILTER.condition_suitable(self.condition)
 
-        self.hour = int(self.raw_data[INPUT_HOUR_PATH])
-        self.temperature = int(deep_getitem(self.raw_data, INPUT_TEMPERATURE_PATH))
-        self.condition = deep_getitem(self.raw_data, INPUT_CONDITION_PATH)
 
-
-@dataclass
 class DayInfo:
-    raw_data: Dict[str, tuple[str, int]] = field(repr=False)
-    hours: Optional[List[HourInfo]] = field(init=False, repr=False, default=None)
-
-    date: Optional[str] = field(init=False, default=None)
-    hour_start: Optional[int] = field(init=False, default=None)
-    hour_end: Optional[int] = field(init=False, default=None)
+    """
+    Daily summary of suitable hours. Hours are folded into the counters by
+    ``day_filter`` while iterating the raw dicts: no HourInfo per hour and no
+    references to the input are kept.
+    """
+
+    __slots__ = (
+        "date",
+        "hour_start",
+        "hour_end",
+        "hours_count",
+        "temperature_avg",
+        "relevant_condition_hours",
+    )
 
-    hours_count: Optional[int] = field(init=False, default=None)
-    temperature_avg: Optional[float] = field(init=False, default=None)
-    relevant_condition_hours: int = field(init=False, default=0)
+    def __init__(
+        self,
+        raw_data: Optional[Dict[str, Any]] = None,
+        day_filter: HourFilter = DAY_FILTER,
+    ):
+        self.date: Optional[str] = None
+        self.hour_start: Optional[int] = None
+        self.hour_end: Optional[int] = None
+        self.hours_count: Optional[int] = None
+        self.temperature_avg: Optional[float] = None
+        self.relevant_condition_hours = 0
+        if raw_data:
+            self.parse(raw_data, day_filter)
+
+    def __repr__(self):
+        return (
+            f"DayInfo(date={self.date!r}, hour_start={self.hour_start!r}, "
+            f"hour_end={self.hour_end!r}, hours_count={self.hours_count!r}, "
+            f"temperature_avg={self.temperature_avg!r}, "
+            f"relevant_condition_hours={self.relevant_condition_hours!r})"
+        )
 
     def to_json(self):
         return {
@@ -142,35 +239,16 @@ class DayInfo:
             "relevant_cond_hours": self.relevant_condition_hours,
         }
 
-    def __post_init__(self):
-        self.parse()
-
-    def parse(self):
-        if not self.raw_data:
-            return
+    def parse(self, raw_data: Dict[str, Any], day_filter: HourFilter = DAY_FILTER):
+        self.date = raw_data[INPUT_DATE_PATH]
 
-        self.date = self.raw_data[INPUT_DATE_PATH]
-
-        temp = 0
-        hours_count = 0
-        conds_count = 0
-
-        self.hours = self.raw_data[INPUT_HOURS_PATH]
         # ToDo force sort by hour key in asc mode
-        for hour_data in self.hours:
-            if not HourInfo.is_hour_suitable(hour_data):
-                continue
-
-            h_info = HourInfo(raw_data=hour_data)
-            h_hour = h_info.hour
-            self.hour_start = self.hour_start or h_hour
-            self.hour_end = h_hour
-
-            temp += h_info.temperature
-            if h_info.is_cond_suitable:
-                conds_count += 1
-            hours_count += 1
+        hours_count, temp, conds_count, hour_start, hour_end = day_filter.evaluate_raw(
+            raw_data[INPUT_HOURS_PATH]
+        )
 
+        self.hour_start = hour_start
+        self.hour_end = hour_end
         self.relevant_condition_hours = conds_count
         self.hours_count = hours_count
         if hours_count > 0:
@@ -186,11 +264,12 @@ def analyze_json(data):
     time_start = None
     # time_end = None
 
-    days_data = deep_getitem(data, INPUT_FORECAST_PATH)
+    days_data = get_forecasts(data)
+    day_filter = DAY_FILTER.for_city(data)
     days = []
     # ToDo force sort by day in asc mode
     for day_data in days_data:
-        d_info = DayInfo(raw_data=day_data)
+        d_info = DayInfo(raw_data=day_data, day_filter=day_filter)
         d_date = d_info.date
 
         time_start = time_start or d_date
@@ -198,12 +277,69 @@ def analyze_json(data):
 
         days.append(d_info.to_json())
 
-    result = DEFAULT_OUTPUT_RESULT
+    # копия: общий DEFAULT_OUTPUT_RESULT не должен меняться между вызовами
+    result = dict(DEFAULT_OUTPUT_RESULT)
     # result[OUTPUT_RAW_DATA_KEY] = data
     result[OUTPUT_DAYS_KEY] = days
     return result
 
 
+def find_inputs(pattern: str) -> list[str]:
+    """Forecast files of a directory (``*.json``) or matched by a glob"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, BATCH_FILE_PATTERN)
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+def analyze_file(input_path: str) -> dict:
+    """One JSON Lines record: the input path plus its result or error"""
+    try:
+        return {"input": input_path, **analyze_json(load_data(input_path))}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logging.error("Failed to analyze %s: %s", input_path, e)
+        return {"input": input_path, "error": str(e)}
+
+
+def analyze_batch(
+    input_paths: Iterable[str], output: TextIO, workers: Optional[int] = None
+) -> int:
+    """
+    Analyze files in a process pool and stream one compact JSON record per
+    input to ``output``, in input order. Returns the number of records.
+    """
+    input_paths = list(input_paths)
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    if workers == 1 or len(input_paths) <= 1:
+        records = map(analyze_file, input_paths)
+        executor = None
+    else:
+        # multiprocessing грузим, только когда пул действительно нужен
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunk_size = len(input_paths) // (workers * 4)
+        chunk_size = min(max(chunk_size, 1), BATCH_MAX_CHUNK_SIZE)
+        executor = ProcessPoolExecutor(max_workers=workers)
+        records = executor.map(analyze_file, input_paths, chunksize=chunk_size)
+
+    count = 0
+    try:
+        for record in records:
+            output.write(json.dumps(record, separators=(",", ":")))
+            output.write("\n")
+            count += 1
+            if count % BATCH_PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                logging.info("%d files, %.1f files/s", count, count / elapsed)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    logging.info("Analyzed %d files in %.2fs", count, time.perf_counter() - started)
+    return count
+
+
 if __name__ == "__main__":
     args = parse_args()
     input_path = args.input
@@ -213,7 +349,25 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG if verbose_mode else logging.WARNING)
     logging.info(args)
 
+    if args.batch:
+        input_paths = find_inputs(args.batch)
+        if not input_paths:
+            sys.exit(f"No input files match {args.batch}")
+        started = time.perf_counter()
+        if output_path is None:
+            count = analyze_batch(input_paths, sys.stdout, args.workers)
+        else:
+            with open(output_path, mode="w") as file:
+                count = analyze_batch(input_paths, file, args.workers)
+        elapsed = time.perf_counter() - started
+        print(
+            f"Analyzed {count} files in {elapsed:.2f}s "
+            f"({count / elapsed if elapsed else 0:.1f} files/s)",
+            file=sys.stderr,
+        )
+        sys.exit()
+
     data = load_data(input_path)
     data = analyze_json(data)
 
-    dump_data(data, output_path)
+    dump_data(data, output_path or PATH_TO_OUTPUT)
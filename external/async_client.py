@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import ssl
+import time
+from collections import defaultdict
+from http import HTTPStatus
+from typing import Optional
+from urllib.parse import urlsplit
+
+from external.cache import ResponseCache
+from external.client import decode_response, request_error
+from external.resilience import HTTPStatusError, ResilientWeatherAPI
+from external.transport import (
+    ACCEPT_ENCODING,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_USER_AGENT,
+    Response,
+    decode_body,
+)
+from metrics import metrics
+
+logger = logging.getLogger()
+
+Stream = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncConnectionPool:
+    """
+    asyncio counterpart of external.transport.ConnectionPool:
+    minimal HTTP/1.1 GET client with per-host keep-alive connections.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_POOL_SIZE):
+        self.maxsize = maxsize
+        self._idle: dict[tuple[str, str, int], list[Stream]] = defaultdict(list)
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    async def close(self) -> None:
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+    async def _open(self, scheme: str, host: str, port: int) -> Stream:
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        return await asyncio.open_connection(host, port, ssl=ssl_context)
+
+    async def request(
+        self, url: str, headers: Optional[dict[str, str]] = None
+    ) -> Response:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {scheme}")
+        default_port = 443 if scheme == "https" else 80
+        key = (scheme, parts.hostname or "", parts.port or default_port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        idle = self._idle[key]
+        reused = bool(idle)
+        reader, writer = idle.pop() if idle else await self._open(*key)
+        try:
+            response, keep_alive = await self._exchange(
+                reader, writer, key[1], path, headers
+            )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            if not reused:
+                raise
+            # сервер закрыл keep-alive соединение, пробуем один раз на новом
+            reader, writer = await self._open(*key)
+            try:
+                response, keep_alive = await self._exchange(
+                    reader, writer, key[1], path, headers
+                )
+            except BaseException:
+                writer.close()
+                raise
+        except BaseException:
+            # в том числе CancelledError по таймауту: соединение в неизвестном состоянии
+            writer.close()
+            raise
+
+        if keep_alive and len(idle) < self.maxsize:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+        return response
+
+    @staticmethod
+    async def _exchange(
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        host: str,
+        path: str,
+        headers: Optional[dict[str, str]] = None,
+    ) -> tuple[Response, bool]:
+        extra_headers = "".join(
+            f"{name}: {value}\r\n" for name, value in (headers or {}).items()
+        )
+        writer.write(
+            (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"User-Agent: {DEFAULT_USER_AGENT}\r\n"
+                f"Accept-Encoding: {ACCEPT_ENCODING}\r\n"
+                f"{extra_headers}"
+                "Connection: keep-alive\r\n\r\n"
+            ).encode("latin-1")
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        version, status, *reason = status_line.decode("latin-1").split(" ", 2)
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if int(status) in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+            response_headers.setdefault("content-length", "0")
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in response_headers:
+            body = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            body = await reader.read()
+            response_headers["connection"] = "close"
+
+        keep_alive = (
+            response_headers.get("connection", "").lower() != "close"
+            and version.upper() == "HTTP/1.1"
+        )
+        response = Response(
+            status=int(status),
+            reason=reason[0].strip() if reason else "",
+            headers=response_headers,
+            body=decode_body(body, response_headers.get("content-encoding")),
+        )
+        return response, keep_alive
+
+
+class AsyncYandexWeatherAPI:
+    """
+    asyncio version of YandexWeatherAPI, one instance per event loop. With
+    ``resilience`` every request goes through its per-attempt timeouts,
+    retries, circuit breakers, deadline and report.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        cache: Optional[ResponseCache] = None,
+        resilience: Optional[ResilientWeatherAPI] = None,
+    ):
+        self._pool = AsyncConnectionPool(maxsize=pool_size)
+        self.cache = cache
+        self.resilience = resilience
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    async def _cached_request(self, url: str) -> Response:
+        if self.cache is None:
+            return await self._pool.request(url)
+
+        entry = self.cache.lookup(url)
+        if entry is not None and entry.body is not None:
+            return Response(HTTPStatus.OK, "OK", {}, entry.body)
+        headers = entry.validators() if entry is not None else None
+        return self.cache.update(url, await self._pool.request(url, headers))
+
+    async def _attempt(self, url: str) -> Response:
+        response = await self._cached_request(url)
+        if response.status != HTTPStatus.OK:
+            raise HTTPStatusError(response.status, response.reason)
+        return response
+
+    async def get_response(self, url: str) -> Response:
+        """
+        :param url: url_to_json_data as str
+        :return: successful response with the raw body, see decode_response
+        """
+        if self.resilience is not None:
+            return await self.resilience.get_response_async(url, self._attempt)
+        try:
+            response = await self._cached_request(url)
+            if response.status != HTTPStatus.OK:
+                raise Exception(
+                    "Error during execute request. {}: {}".format(
+                        response.status, response.reason
+                    )
+                )
+            return response
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            raise request_error(ex)
+
+    async def get_forecasting(self, url: str, projected: bool = False):
+        """
+        :param url: url_to_json_data as str
+        :param projected: keep only the fields used by the calculations
+        :return: response data as json
+        """
+        started = time.perf_counter() if metrics.enabled else 0.0
+        response = await self.get_response(url)
+        try:
+            return decode_response(response, projected, started)
+        except Exception as ex:
+            raise request_error(ex)
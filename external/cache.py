@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from pathlib import Path
+from typing import Optional
+
+from external.files import make_temp_file
+from external.transport import Response
+
+DEFAULT_TTL = 15 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+BODY_SUFFIX = ".body"
+META_SUFFIX = ".meta"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    size: int
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body: Optional[bytes] = field(default=None, repr=False)
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_meta(self) -> dict:
+        return {
+            "url": self.url,
+            "size": self.size,
+            "stored_at": self.stored_at,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+        }
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    updated: int = 0
+    evicted: int = 0
+    bytes_saved: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of forecast responses.
+
+    Every entry is a pair of files named after sha256(url): the decoded body and
+    a small JSON with its ETag/Last-Modified validators. Entries younger than
+    ``ttl`` seconds are served without a request, older ones are revalidated with
+    a conditional GET. The least recently used entries are evicted once the
+    bodies exceed ``max_bytes``; access time is the body file mtime, so the LRU
+    order survives restarts without a separate index file.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def _load(self) -> None:
+        loaded = []
+        for meta_path in self.directory.glob(f"*{META_SUFFIX}"):
+            key = meta_path.name[: -len(META_SUFFIX)]
+            body_path = self._path(key, BODY_SUFFIX)
+            try:
+                meta = json.loads(meta_path.read_text())
+                accessed_at = body_path.stat().st_mtime
+            except (OSError, ValueError):
+                logger.warning("Dropping broken cache entry %s", key)
+                self._remove_files(key)
+                continue
+            loaded.append((accessed_at, key, CacheEntry(**meta)))
+
+        for _, key, entry in sorted(loaded, key=lambda item: item[0]):
+            self._entries[key] = entry
+            self._size += entry.size
+        self._evict()
+
+    def _remove_files(self, key: str) -> None:
+        for suffix in (BODY_SUFFIX, META_SUFFIX):
+            try:
+                self._path(key, suffix).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        fd, tmp_path = make_temp_file(self.directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            self._remove_files(key)
+            self.stats.evicted += 1
+
+    def _read_body(self, key: str) -> Optional[bytes]:
+        body_path = self._path(key, BODY_SUFFIX)
+        try:
+            body = body_path.read_bytes()
+            os.utime(body_path)
+        except OSError:
+            return None
+        return body
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """
+        Cached entry for ``url``. ``entry.body`` is set only when the entry is
+        still fresh and can be used without asking the server.
+        """
+        key = self._key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if time.time() - entry.stored_at >= self.ttl:
+                return CacheEntry(**entry.to_meta())
+
+        body = self._read_body(key)
+        if body is None:
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.bytes_saved += len(body)
+        return CacheEntry(**entry.to_meta(), body=body)
+
+    def update(self, url: str, response: Response) -> Response:
+        """
+        Fold a response to a (possibly conditional) request into the cache.
+        304 Not Modified is turned into 200 with the cached body.
+        """
+        key = self._key(url)
+        if response.status == HTTPStatus.NOT_MODIFIED:
+            body = self._read_body(key)
+            if body is None:
+                raise Exception(f"Got 304 for {url}, but cached body is gone")
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.stored_at = time.time()
+                    meta = entry.to_meta()
+                self.stats.revalidated += 1
+                self.stats.bytes_saved += len(body)
+            if entry is not None:
+                self._write_atomic(
+                    self._path(key, META_SUFFIX), json.dumps(meta).encode()
+                )
+            return Response(HTTPStatus.OK, "OK", response.headers, body)
+
+        if response.status != HTTPStatus.OK:
+            return response
+
+        entry = CacheEntry(
+            url=url,
+            size=len(response.body),
+            stored_at=time.time(),
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        self._write_atomic(self._path(key, BODY_SUFFIX), response.body)
+        self._write_atomic(
+            self._path(key, META_SUFFIX), json.dumps(entry.to_meta()).encode()
+        )
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+                self.stats.updated += 1
+            self._entries[key] = entry
+            self._size += entry.size
+            self._evict()
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in self._entries:
+                self._remove_files(key)
+            self._entries.clear()
+            self._size = 0
@@ -1,7 +1,12 @@
-import json
 import logging
+import time
 from http import HTTPStatus
-from urllib.request import urlopen
+from typing import Any, Optional
+
+from external.cache import ResponseCache
+from external.projection import decode_forecast
+from external.transport import DEFAULT_POOL_SIZE, ConnectionPool, Response
+from metrics import metrics
 
 ERR_MESSAGE_TEMPLATE = "Unexpected error: {error}"
 
@@ -9,33 +14,122 @@ ERR_MESSAGE_TEMPLATE = "Unexpected error: {error}"
 logger = logging.getLogger()
 
 
+def request_error(ex: Exception) -> Exception:
+    """Count, log and wrap a failed request the same way for both clients"""
+    metrics.inc("http_errors_total")
+    logger.error(ex)
+    return Exception(ERR_MESSAGE_TEMPLATE.format(error=ex))
+
+
+def decode_response(response: Response, projected: bool, started: float) -> Any:
+    """
+    Decode a successful response; with metrics enabled also records how long
+    the request (``started`` is its perf_counter start) and the decoding took
+    """
+    if not metrics.enabled:
+        return decode_forecast(response.body, projected)
+
+    fetched = time.perf_counter()
+    metrics.observe("http_request_seconds", fetched - started)
+    metrics.inc("bytes_fetched_total", len(response.body))
+    data = decode_forecast(response.body, projected)
+    metrics.observe(
+        "decode_seconds",
+        time.perf_counter() - fetched,
+        mode="projected" if projected else "full",
+    )
+    return data
+
+
 class YandexWeatherAPI:
     """
     Base class for requests
     """
 
+    _pool = ConnectionPool(maxsize=DEFAULT_POOL_SIZE)
+    response_cache: Optional[ResponseCache] = None
+
+    @classmethod
+    def configure_pool(cls, maxsize: int) -> None:
+        """
+        Set how many keep-alive connections are kept per host,
+        usually equal to the number of fetching workers
+        """
+        cls._pool.resize(maxsize)
+
+    @classmethod
+    def pool_stats(cls) -> dict[str, float]:
+        """Connection reuse statistics of the shared pool"""
+        return cls._pool.stats.to_dict()
+
+    @classmethod
+    def configure_cache(cls, cache: Optional[ResponseCache]) -> None:
+        """Serve responses through an on-disk cache, None disables it"""
+        cls.response_cache = cache
+
+    @classmethod
+    def cache_stats(cls) -> dict[str, int]:
+        """Hit/miss/revalidation counters of the response cache"""
+        return cls.response_cache.stats.to_dict() if cls.response_cache else {}
+
     @staticmethod
-    def __do_req(url: str) -> str:
+    def send(
+        url: str, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> Response:
+        """
+        One request through the pool and the response cache, any status,
+        exceptions are not wrapped -- for callers with their own error policy
+        """
+        cache = YandexWeatherAPI.response_cache
+        if cache is None:
+            return YandexWeatherAPI._pool.request(
+                url, timeout=timeout, deadline=deadline
+            )
+
+        entry = cache.lookup(url)
+        if entry is not None and entry.body is not None:
+            return Response(HTTPStatus.OK, "OK", {}, entry.body)
+        headers = entry.validators() if entry is not None else None
+        return cache.update(
+            url,
+            YandexWeatherAPI._pool.request(
+                url, headers, timeout=timeout, deadline=deadline
+            ),
+        )
+
+    @staticmethod
+    def __do_req(url: str) -> Response:
         """Base request method"""
         try:
-            with urlopen(url) as response:
-                resp_body = response.read().decode("utf-8")
-                data = json.loads(resp_body)
+            response = YandexWeatherAPI.send(url)
             if response.status != HTTPStatus.OK:
                 raise Exception(
                     "Error during execute request. {}: {}".format(
-                        resp_body.status, resp_body.reason
+                        response.status, response.reason
                     )
                 )
-            return data
+            return response
         except Exception as ex:
-            logger.error(ex)
-            raise Exception(ERR_MESSAGE_TEMPLATE.format(error=ex))
+            raise request_error(ex)
 
     @staticmethod
-    def get_forecasting(url: str):
+    def get_response(url: str) -> Response:
         """
         :param url: url_to_json_data as str
-        :return: response data as json
+        :return: successful response with the raw body, see decode_response
         """
         return YandexWeatherAPI.__do_req(url)
+
+    @staticmethod
+    def get_forecasting(url: str, projected: bool = False):
+        """
+        :param url: url_to_json_data as str
+        :param projected: keep only the fields used by the calculations
+        :return: response data as json
+        """
+        started = time.perf_counter() if metrics.enabled else 0.0
+        response = YandexWeatherAPI.__do_req(url)
+        try:
+            return decode_response(response, projected, started)
+        except Exception as ex:
+            raise request_error(ex)
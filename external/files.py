@@ -0,0 +1,35 @@
+"""
+Temp files for atomic writes: written next to the target and renamed over it.
+
+``tempfile.mkstemp`` creates files with mode 0600; after ``os.replace`` the
+published file would be owner-only, unlike one created by ``open()``. The
+temp file gets the mode ``open()`` would give it under the current umask.
+"""
+
+import os
+import tempfile
+from typing import Union
+
+
+def _read_umask() -> int:
+    # umask нельзя прочитать, не установив: читаем один раз при импорте
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+DEFAULT_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def make_temp_file(
+    directory: Union[str, os.PathLike], prefix: str = "", suffix: str = ".tmp"
+) -> tuple[int, str]:
+    """``mkstemp`` in ``directory`` with the default file mode: (fd, path)"""
+    fd, path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=suffix)
+    try:
+        os.chmod(path, DEFAULT_FILE_MODE)
+    except BaseException:
+        os.close(fd)
+        os.unlink(path)
+        raise
+    return fd, path
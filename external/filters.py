@@ -0,0 +1,214 @@
+"""
+Compiled hour-window and condition filter shared by DataCalculationTask and
+external/analyzer.py.
+
+A filter is built once from an hour window and a set of suitable conditions:
+the window becomes a set of local hours (wrapping past midnight if
+``hour_start > hour_end``), conditions get interned codes and a bitmask. The
+window may be given in a fixed timezone (``window_offset``, seconds east of
+UTC); ``for_city`` then shifts it to the city's local hours using
+``info.tzinfo.offset`` of the forecast.
+"""
+
+from sys import intern
+from typing import Any, Iterable, Optional
+
+HOURS_PER_DAY = 24
+SECONDS_PER_HOUR = 3600
+
+# (часов в окне, сумма температур, часов с хорошей погодой, первый и последний час)
+DaySummary = tuple[int, int, int, Optional[int], Optional[int]]
+
+
+class ConditionCodes(dict):
+    """Interned condition -> bit number, new conditions get the next free bit"""
+
+    def __missing__(self, condition: Optional[str]) -> int:
+        if isinstance(condition, str):
+            condition = intern(condition)
+        code = self[condition] = len(self)
+        return code
+
+
+class HourValues(dict):
+    """Memoized int(hour): the same few hour strings repeat in every forecast"""
+
+    def __missing__(self, hour) -> int:
+        value = self[hour] = int(hour)
+        return value
+
+
+CONDITION_CODES = ConditionCodes()
+HOUR_VALUES = HourValues()
+
+
+def condition_mask(conditions: Iterable[str]) -> int:
+    mask = 0
+    for condition in conditions:
+        mask |= 1 << CONDITION_CODES[condition]
+    return mask
+
+
+def window_hours(hour_start: int, hour_end: int) -> frozenset[int]:
+    for hour in (hour_start, hour_end):
+        if not 0 <= hour < HOURS_PER_DAY:
+            raise ValueError(f"Hour out of range: {hour}")
+    if hour_start <= hour_end:
+        return frozenset(range(hour_start, hour_end + 1))
+    return frozenset((*range(hour_start, HOURS_PER_DAY), *range(hour_end + 1)))
+
+
+def city_offset(data: dict[str, Any]) -> Optional[int]:
+    """``info.tzinfo.offset`` of a forecast in seconds, None if missing"""
+    try:
+        return int(data["info"]["tzinfo"]["offset"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class HourFilter:
+    """
+    Suitability of forecast hours: an hour counts if it falls into the window,
+    and counts as "good weather" if its condition is in ``conditions``.
+    The ``evaluate*`` methods fold a whole day of rows into a DaySummary.
+    """
+
+    __slots__ = (
+        "hour_start",
+        "hour_end",
+        "conditions",
+        "mask",
+        "window_offset",
+        "hours",
+        "_shifted",
+    )
+
+    def __init__(
+        self,
+        hour_start: int,
+        hour_end: int,
+        conditions: Iterable[str],
+        window_offset: Optional[int] = None,
+    ):
+        self.hour_start = hour_start
+        self.hour_end = hour_end
+        self.conditions = frozenset(intern(condition) for condition in conditions)
+        self.mask = condition_mask(self.conditions)
+        self.window_offset = window_offset
+        self.hours = window_hours(hour_start, hour_end)
+        self._shifted: dict[int, HourFilter] = {}
+
+    def __repr__(self):
+        return (
+            f"HourFilter(hour_start={self.hour_start!r}, "
+            f"hour_end={self.hour_end!r}, conditions={sorted(self.conditions)!r}, "
+            f"window_offset={self.window_offset!r})"
+        )
+
+    def __reduce__(self):
+        # маска зависит от кодов процесса: в воркере пула её надо пересчитать
+        return (
+            HourFilter,
+            (
+                self.hour_start,
+                self.hour_end,
+                tuple(self.conditions),
+                self.window_offset,
+            ),
+        )
+
+    def hour_suitable(self, hour) -> bool:
+        """``hour`` as in the forecast, str or int"""
+        return HOUR_VALUES[hour] in self.hours
+
+    def condition_suitable(self, condition: Optional[str]) -> bool:
+        return condition in self.conditions
+
+    def code_suitable(self, code: int) -> bool:
+        return bool(self.mask >> code & 1)
+
+    def for_offset(self, offset: Optional[int]) -> "HourFilter":
+        """
+        Filter over local hours of a city ``offset`` seconds east of UTC.
+        Without ``window_offset`` the window already is in local hours.
+        """
+        if self.window_offset is None or offset is None:
+            return self
+        shift = (offset - self.window_offset) // SECONDS_PER_HOUR % HOURS_PER_DAY
+        if shift == 0:
+            return self
+        shifted = self._shifted.get(shift)
+        if shifted is None:
+            shifted = self._shifted[shift] = HourFilter(
+                (self.hour_start + shift) % HOURS_PER_DAY,
+                (self.hour_end + shift) % HOURS_PER_DAY,
+                self.conditions,
+            )
+        return shifted
+
+    def for_city(self, data: dict[str, Any]) -> "HourFilter":
+        return self.for_offset(city_offset(data))
+
+    def evaluate(self, rows: Iterable[tuple[int, int, str]]) -> DaySummary:
+        """Rows of one day as (hour, temp, condition) with int hours"""
+        hours = self.hours
+        conditions = self.conditions
+        count = temp_sum = suitable = 0
+        first = last = None
+        for hour, temp, condition in rows:
+            if hour in hours:
+                if first is None:
+                    first = hour
+                last = hour
+                count += 1
+                temp_sum += temp
+                if condition in conditions:
+                    suitable += 1
+        return count, temp_sum, suitable, first, last
+
+    def evaluate_raw(self, rows: Iterable[dict[str, Any]]) -> DaySummary:
+        """Hour dicts of one day as in the API response"""
+        hours = self.hours
+        conditions = self.conditions
+        hour_values = HOUR_VALUES
+        count = temp_sum = suitable = 0
+        first = last = None
+        for row in rows:
+            hour = hour_values[row["hour"]]
+            if hour in hours:
+                if first is None:
+                    first = hour
+                last = hour
+                count += 1
+                temp_sum += int(row["temp"])
+                if row.get("condition") in conditions:
+                    suitable += 1
+        return count, temp_sum, suitable, first, last
+
+    def evaluate_codes(
+        self, hours: Iterable[int], temps: Iterable[int], codes: Iterable[int]
+    ) -> DaySummary:
+        """
+        Columns of one day, conditions as codes of this process's
+        CONDITION_CODES (codes are not shared between processes)
+        """
+        window = self.hours
+        mask = self.mask
+        count = temp_sum = suitable = 0
+        first = last = None
+        for hour, temp, code in zip(hours, temps, codes):
+            if hour in window:
+                if first is None:
+                    first = hour
+                last = hour
+                count += 1
+                temp_sum += temp
+                suitable += mask >> code & 1
+        return count, temp_sum, suitable, first, last
+
+    def evaluate_days(
+        self, days: Iterable[tuple[str, Iterable[tuple[int, int, str]]]]
+    ) -> list[tuple[str, DaySummary]]:
+        """(date, rows) pairs of many days, e.g. a projected city forecast"""
+        evaluate = self.evaluate
+        return [(date, evaluate(rows)) for date, rows in days]
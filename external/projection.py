@@ -0,0 +1,50 @@
+import json
+from sys import intern
+from typing import Any
+
+# поля, которые читают DataCalculationTask и external/analyzer.py;
+# всё остальное (geo_object, fact, biomet, ...) отбрасывается прямо во время разбора
+PROJECTED_FIELDS = frozenset(
+    (
+        "forecasts",
+        "date",
+        "hours",
+        "hour",
+        "temp",
+        "condition",
+        "info",
+        "tzinfo",
+        "offset",
+    )
+)
+# повторяются в каждой строке -- храним одну копию строки на всё приложение
+INTERNED_FIELDS = frozenset(("hour", "condition"))
+
+
+def _project_object(pairs: list[tuple[str, Any]]) -> dict[str, Any]:
+    # объект без нужных полей остаётся пустым словарём, а не None: иначе
+    # в списках (hours, forecasts) вместо словаря окажется None
+    projected = {}
+    for key, value in pairs:
+        if key in PROJECTED_FIELDS:
+            if key in INTERNED_FIELDS and isinstance(value, str):
+                value = intern(value)
+            projected[key] = value
+    return projected
+
+
+def decode_projected(body: bytes) -> dict[str, Any]:
+    """
+    Decode a forecast payload keeping only ``forecasts[*].date``,
+    ``forecasts[*].hours[*].{hour,temp,condition}`` and ``info.tzinfo.offset``.
+
+    ``object_pairs_hook`` receives every JSON object as a list of pairs, so the
+    dicts for unused objects are never built and the result stays compact.
+    """
+    return json.loads(body, object_pairs_hook=_project_object)
+
+
+def decode_forecast(body: bytes, projected: bool = False) -> dict[str, Any]:
+    if projected:
+        return decode_projected(body)
+    return json.loads(body)
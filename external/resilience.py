@@ -0,0 +1,378 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.client import HTTPException
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+from external.client import YandexWeatherAPI, decode_response, request_error
+from external.transport import Response
+from metrics import metrics
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_HEDGE_POOL_SIZE = 64
+RETRIABLE_STATUSES = frozenset(
+    {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    }
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        super().__init__(f"Error during execute request. {status}: {reason}")
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host: str):
+        self.host = host
+        super().__init__(f"Circuit breaker for {host} is open")
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def is_retriable(error: BaseException) -> bool:
+    """Connection errors, timeouts and 5xx/429 are worth another attempt"""
+    if isinstance(error, HTTPStatusError):
+        return error.status in RETRIABLE_STATUSES
+    return isinstance(error, (OSError, HTTPException))
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+    multiplier: float = 2.0
+
+    def __post_init__(self):
+        if self.attempts < 1:
+            raise ValueError(f"At least one attempt is required: {self.attempts}")
+
+    def backoff(self, retry: int) -> float:
+        """Exponential backoff with full jitter: uniform in [0, cap]"""
+        cap = min(self.max_delay, self.base_delay * self.multiplier**retry)
+        return random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` failures in a row; after
+    ``reset_timeout`` seconds one probe request is let through (half-open),
+    its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit opened after %s failures", self.failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+@dataclass
+class FetchOutcome:
+    url: str
+    status: str  # ok, failed, circuit_open, deadline
+    attempts: int
+    elapsed: float
+    hedged: bool = False
+    hedge_won: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class RunReport:
+    outcomes: list[FetchOutcome] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, outcome: FetchOutcome) -> None:
+        with self._lock:
+            self.outcomes.append(outcome)
+
+    def to_dict(self, labels: Optional[dict[str, str]] = None) -> dict[str, Any]:
+        """``labels`` maps URLs to readable names, e.g. cities, for failures"""
+        labels = labels or {}
+        with self._lock:
+            outcomes = list(self.outcomes)
+        return {
+            "requests": len(outcomes),
+            "outcomes": dict(Counter(outcome.status for outcome in outcomes)),
+            "attempts": sum(outcome.attempts for outcome in outcomes),
+            "retries": sum(max(outcome.attempts - 1, 0) for outcome in outcomes),
+            "hedged": sum(outcome.hedged for outcome in outcomes),
+            "hedge_wins": sum(outcome.hedge_won for outcome in outcomes),
+            "max_elapsed": round(max((o.elapsed for o in outcomes), default=0.0), 3),
+            "failures": [
+                {
+                    "name": labels.get(outcome.url, outcome.url),
+                    "status": outcome.status,
+                    "attempts": outcome.attempts,
+                    "error": outcome.error,
+                }
+                for outcome in outcomes
+                if outcome.status != "ok"
+            ],
+        }
+
+
+class ResilientWeatherAPI:
+    """
+    YandexWeatherAPI behind timeouts, retries, circuit breakers and hedging.
+
+    Every attempt gets ``timeout`` seconds of wall-clock time for connecting
+    and reading the whole response, cut to what is left of the total
+    ``deadline`` (counted from construction). Retriable failures are retried
+    with jittered exponential backoff while the host's circuit breaker is
+    closed. With ``hedge_after`` set, an attempt still running after that
+    many seconds gets a duplicate request and the first success wins. Every
+    call ends up as a FetchOutcome in ``report``. ``get_response_async`` does
+    the same for asyncio callers, without hedging.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        deadline: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+        hedge_after: Optional[float] = None,
+        hedge_pool_size: int = DEFAULT_HEDGE_POOL_SIZE,
+        report: Optional[RunReport] = None,
+    ):
+        self.timeout = timeout
+        self.deadline_at = time.monotonic() + deadline if deadline else None
+        self.retry = retry or RetryPolicy()
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.hedge_after = hedge_after
+        self.report = report if report is not None else RunReport()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._executor = (
+            ThreadPoolExecutor(hedge_pool_size, thread_name_prefix="hedge")
+            if hedge_after is not None
+            else None
+        )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            # проигравшие хедж-запросы доработают в фоне, ждать их незачем
+            self._executor.shutdown(wait=False)
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(
+                    self.breaker_threshold, self.breaker_reset
+                )
+            return breaker
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the total deadline, None without one"""
+        if self.deadline_at is None:
+            return None
+        return self.deadline_at - time.monotonic()
+
+    def _attempt_timeout(self) -> Optional[float]:
+        remaining = self.remaining()
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            raise DeadlineExceeded("Total fetch deadline exceeded")
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    @staticmethod
+    def _send(url: str, timeout: Optional[float]) -> Response:
+        # таймаут на всю попытку, а не на каждую операцию с сокетом
+        deadline = None if timeout is None else time.monotonic() + timeout
+        response = YandexWeatherAPI.send(url, timeout, deadline)
+        if response.status != HTTPStatus.OK:
+            raise HTTPStatusError(response.status, response.reason)
+        return response
+
+    def _attempt(
+        self, url: str, timeout: Optional[float], outcome: FetchOutcome
+    ) -> Response:
+        if self._executor is None:
+            return self._send(url, timeout)
+
+        primary = self._executor.submit(self._send, url, timeout)
+        try:
+            return primary.result(timeout=self.hedge_after)
+        except FuturesTimeoutError:
+            pass
+
+        outcome.hedged = True
+        metrics.inc("hedged_requests_total")
+        hedge = self._executor.submit(self._send, url, timeout)
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    outcome.hedge_won = future is hedge
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _retry_delay(
+        self, url: str, breaker: CircuitBreaker, retry: int, error: Exception
+    ) -> float:
+        """Records a failed attempt: backoff before the next one, or re-raises"""
+        if not is_retriable(error):
+            # 4xx и т.п. -- хост отвечает, цепь не размыкаем
+            breaker.record_success()
+            raise error
+        breaker.record_failure()
+        if retry + 1 >= self.retry.attempts:
+            raise error
+        delay = self.retry.backoff(retry)
+        remaining = self.remaining()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded("Total fetch deadline exceeded") from error
+        logger.debug("Retrying %s in %.3fs after %s", url, delay, error)
+        metrics.inc("fetch_retries_total")
+        return delay
+
+    @staticmethod
+    def _fail(outcome: FetchOutcome, error: Exception) -> None:
+        if isinstance(error, CircuitOpenError):
+            outcome.status = "circuit_open"
+        elif isinstance(error, DeadlineExceeded):
+            outcome.status = "deadline"
+        else:
+            outcome.status = "failed"
+        outcome.error = str(error)
+
+    def get_response(self, url: str) -> Response:
+        breaker = self.breaker(urlsplit(url).netloc)
+        outcome = FetchOutcome(url=url, status="ok", attempts=0, elapsed=0.0)
+        started = time.monotonic()
+        try:
+            for retry in range(self.retry.attempts):
+                timeout = self._attempt_timeout()
+                if not breaker.allow():
+                    raise CircuitOpenError(urlsplit(url).netloc)
+                outcome.attempts += 1
+                try:
+                    response = self._attempt(url, timeout, outcome)
+                except Exception as e:
+                    time.sleep(self._retry_delay(url, breaker, retry, e))
+                    continue
+                breaker.record_success()
+                return response
+            # последняя неудачная попытка выходит из цикла исключением
+            raise RuntimeError(f"No attempts made for {url}")
+        except Exception as e:
+            self._fail(outcome, e)
+            raise request_error(e)
+        finally:
+            outcome.elapsed = time.monotonic() - started
+            self.report.record(outcome)
+
+    async def get_response_async(
+        self, url: str, send: Callable[[str], Awaitable[Response]]
+    ) -> Response:
+        """
+        get_response for asyncio callers: ``send`` makes one attempt and
+        raises HTTPStatusError for a non-200 answer. The attempt timeout
+        bounds the whole awaited ``send``.
+        """
+        import asyncio
+
+        breaker = self.breaker(urlsplit(url).netloc)
+        outcome = FetchOutcome(url=url, status="ok", attempts=0, elapsed=0.0)
+        started = time.monotonic()
+        try:
+            for retry in range(self.retry.attempts):
+                timeout = self._attempt_timeout()
+                if not breaker.allow():
+                    raise CircuitOpenError(urlsplit(url).netloc)
+                outcome.attempts += 1
+                try:
+                    try:
+                        response = await asyncio.wait_for(send(url), timeout)
+                    except asyncio.TimeoutError as e:
+                        # до 3.11 asyncio.TimeoutError -- не OSError
+                        raise TimeoutError(f"Attempt timed out after {timeout}s") from e
+                except Exception as e:
+                    await asyncio.sleep(self._retry_delay(url, breaker, retry, e))
+                    continue
+                breaker.record_success()
+                return response
+            # последняя неудачная попытка выходит из цикла исключением
+            raise RuntimeError(f"No attempts made for {url}")
+        except Exception as e:
+            self._fail(outcome, e)
+            raise request_error(e)
+        finally:
+            outcome.elapsed = time.monotonic() - started
+            self.report.record(outcome)
+
+    def get_forecasting(self, url: str, projected: bool = False):
+        """
+        :param url: url_to_json_data as str
+        :param projected: keep only the fields used by the calculations
+        :return: response data as json
+        """
+        started = time.perf_counter() if metrics.enabled else 0.0
+        response = self.get_response(url)
+        try:
+            return decode_response(response, projected, started)
+        except Exception as ex:
+            raise request_error(ex)
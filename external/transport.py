@@ -0,0 +1,250 @@
+import gzip
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_USER_AGENT = "async-python-sprint-1"
+ACCEPT_ENCODING = "gzip, deflate"
+READ_CHUNK = 64 * 1024
+
+# ошибки, при которых соединение из пула считается "протухшим" (сервер закрыл keep-alive)
+STALE_CONNECTION_ERRORS = (ConnectionResetError, BrokenPipeError, HTTPException)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Response:
+    status: int
+    reason: str
+    headers: dict[str, str]
+    body: bytes
+
+
+@dataclass
+class PoolStats:
+    requests: int = 0
+    connections_opened: int = 0
+    connections_reused: int = 0
+    connections_discarded: int = 0
+    bytes_received: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.connections_reused / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "connections_discarded": self.connections_discarded,
+            "bytes_received": self.bytes_received,
+            "reuse_ratio": round(self.reuse_ratio, 3),
+        }
+
+
+def decode_body(body: bytes, content_encoding: Optional[str]) -> bytes:
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        return body
+    if encoding in ("gzip", "x-gzip"):
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # часть серверов отдаёт "сырой" deflate без zlib-заголовка
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    raise ValueError(f"Unsupported content encoding: {content_encoding}")
+
+
+def _time_left(timeout: Optional[float], deadline: Optional[float]) -> Optional[float]:
+    """Socket timeout: ``timeout`` cut to what is left until ``deadline``"""
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Request deadline exceeded")
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class ConnectionPool:
+    """
+    Per-host pool of keep-alive HTTP(S) connections.
+
+    Up to ``maxsize`` idle connections are kept for every (scheme, host, port);
+    a request takes an idle connection if there is one and returns it after
+    the response body has been read, so subsequent requests to the same host
+    skip the TCP+TLS handshake.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_POOL_SIZE, timeout: Optional[float] = None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.stats = PoolStats()
+        self._idle: dict[tuple[str, str, int], deque] = {}
+        self._lock = threading.Lock()
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            for connections in self._idle.values():
+                while len(connections) > maxsize:
+                    connections.popleft().close()
+
+    def close(self) -> None:
+        with self._lock:
+            for connections in self._idle.values():
+                while connections:
+                    connections.popleft().close()
+            self._idle.clear()
+
+    def _new_connection(self, scheme: str, host: str, port: int) -> HTTPConnection:
+        connection_cls = HTTPSConnection if scheme == "https" else HTTPConnection
+        with self.stats._lock:
+            self.stats.connections_opened += 1
+        return connection_cls(host, port, timeout=self.timeout)
+
+    def _acquire(self, key: tuple[str, str, int]) -> tuple[HTTPConnection, bool]:
+        with self._lock:
+            connections = self._idle.get(key)
+            if connections:
+                return connections.pop(), True
+        return self._new_connection(*key), False
+
+    def _release(self, key: tuple[str, str, int], connection: HTTPConnection) -> None:
+        with self._lock:
+            connections = self._idle.setdefault(key, deque())
+            if len(connections) < self.maxsize:
+                connections.append(connection)
+                return
+        connection.close()
+        with self.stats._lock:
+            self.stats.connections_discarded += 1
+
+    def request(
+        self,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Response:
+        """
+        ``timeout`` overrides the pool timeout for this request's socket ops.
+        ``deadline`` (a ``time.monotonic()`` value) bounds the whole request:
+        every socket op gets at most the time left, and the body is read in
+        chunks, so a server trickling the response cannot outlast it.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {scheme}")
+        default_port = 443 if scheme == "https" else 80
+        key = (scheme, parts.hostname or "", parts.port or default_port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        request_headers = {
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "User-Agent": DEFAULT_USER_AGENT,
+            "Connection": "keep-alive",
+        }
+        if headers:
+            request_headers.update(headers)
+
+        timeout = self.timeout if timeout is None else timeout
+        socket_timeout = _time_left(timeout, deadline)
+        connection, reused = self._acquire(key)
+        try:
+            response, sock = self._send(
+                connection, path, request_headers, socket_timeout
+            )
+        except STALE_CONNECTION_ERRORS:
+            connection.close()
+            if not reused:
+                raise
+            # повторяем ровно один раз на свежем соединении
+            logger.debug("Stale pooled connection to %s, reconnecting", key[1])
+            connection, reused = self._new_connection(*key), False
+            try:
+                socket_timeout = _time_left(timeout, deadline)
+                response, sock = self._send(
+                    connection, path, request_headers, socket_timeout
+                )
+            except Exception:
+                connection.close()
+                raise
+        except Exception:
+            connection.close()
+            raise
+
+        try:
+            body = self._read_body(response, sock, timeout, deadline)
+        except Exception:
+            # недочитанный ответ -- соединение в пул возвращать нельзя
+            connection.close()
+            raise
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        with self.stats._lock:
+            self.stats.requests += 1
+            self.stats.bytes_received += len(body)
+            if reused:
+                self.stats.connections_reused += 1
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+
+        return Response(
+            status=response.status,
+            reason=response.reason,
+            headers=response_headers,
+            body=decode_body(body, response_headers.get("content-encoding")),
+        )
+
+    @staticmethod
+    def _send(
+        connection: HTTPConnection,
+        path: str,
+        headers: dict[str, str],
+        timeout: Optional[float],
+    ):
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        connection.request("GET", path, headers=headers)
+        # при will_close getresponse отцепляет сокет от соединения, а тело
+        # ещё читается из него -- сохраняем, чтобы менять таймаут по дедлайну
+        sock = connection.sock
+        return connection.getresponse(), sock
+
+    @staticmethod
+    def _read_body(
+        response, sock, timeout: Optional[float], deadline: Optional[float]
+    ) -> bytes:
+        if deadline is None:
+            return response.read()
+        chunks = []
+        while True:
+            if sock is not None:
+                sock.settimeout(_time_left(timeout, deadline))
+            # read1 -- не больше одного чтения из сокета за вызов
+            chunk = response.read1(READ_CHUNK)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        # read1 не помечает дочитанный ответ завершённым, а read -- да:
+        # без этого соединение нельзя вернуть в пул
+        chunks.append(response.read())
+        return b"".join(chunks)
@@ -1,13 +1,24 @@
+import argparse
+import json
 import logging
+from typing import Optional
+
+from execution import AUTO, INLINE, MODES
+from external.analyzer import DAY_FILTER
+from external.cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, ResponseCache
+from external.client import YandexWeatherAPI
+from external.resilience import DEFAULT_TIMEOUT, ResilientWeatherAPI, RetryPolicy
 from tasks import (
-    DataFetchingTask,
+    FETCH_ENGINES,
     DataCalculationTask,
     DataAggregationTask,
     DataAnalyzingTask,
 )
+from metrics import metrics
+from pipeline import DEFAULT_QUEUE_SIZE, Pipeline
+from store import ResultStore
+from output import SUFFIXES, WRITERS
 from utils import CITIES, save_to_json
-from queue import Queue
-from threading import Thread
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -15,35 +26,225 @@ logging.basicConfig(
 logger = logging.getLogger()
 
 
-def main():
-    weather_data_queue = Queue()  # для передачи данных о погоде между fetching и calculation
-    results_queue = Queue()  # для передачи результатов вычислений между calculation и aggregation
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--engine",
+        choices=FETCH_ENGINES.keys(),
+        default="threads",
+        help="how to fetch forecasts: thread pool or asyncio event loop",
+    )
+    parser.add_argument(
+        "--calc-engine",
+        choices=DataCalculationTask.ENGINES,
+        default="rows",
+        help="per-city calculation in a process pool or one columnar batch",
+    )
+    parser.add_argument(
+        "--calc-mode",
+        choices=MODES,
+        default=AUTO,
+        help=(
+            "where calculation batches run; auto times the first batch and "
+            "skips the process pool when it would not pay off. The columnar "
+            "engine always runs inline (auto or inline only)"
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        default=32,
+        type=int,
+        help="cities per batch sent to the calculation process pool",
+    )
+    parser.add_argument(
+        "--max-latency",
+        default=0.05,
+        type=float,
+        help="seconds a partial batch may wait before it is sent anyway",
+    )
+    parser.add_argument(
+        "--queue-size",
+        default=DEFAULT_QUEUE_SIZE,
+        type=int,
+        help="capacity of the queues between pipeline stages",
+    )
+    parser.add_argument(
+        "--projected-decode",
+        action="store_true",
+        help="decode only the forecast fields used by the calculations",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="directory for the on-disk response cache, disabled if not set",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        default=DEFAULT_TTL,
+        type=float,
+        help="seconds a cached response is used without revalidation",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        type=int,
+        help="size cap of the response cache, least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--timeout",
+        default=DEFAULT_TIMEOUT,
+        type=float,
+        help="seconds per request attempt",
+    )
+    parser.add_argument(
+        "--deadline",
+        default=None,
+        type=float,
+        help="seconds for fetching all cities, unlimited if not set",
+    )
+    parser.add_argument(
+        "--retries",
+        default=3,
+        type=int,
+        help="attempts per city, with jittered exponential backoff between them",
+    )
+    parser.add_argument(
+        "--hedge-after",
+        default=None,
+        type=float,
+        help="send a duplicate request if an attempt is slower than this",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        default=5,
+        type=int,
+        help="failures in a row that open the circuit breaker of a host",
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="write the fetch outcome report to this JSON file",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=WRITERS.keys(),
+        default="json",
+        help="aggregated data as an indented JSON array (aggregated_data.json), "
+        "JSON Lines or binary daily-row columns",
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help="file with results of previous runs, reused for unchanged forecasts",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        default=None,
+        help="collect per-stage metrics and write them to this JSON file",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default=None,
+        help="collect per-stage metrics and write them in Prometheus text format",
+    )
+    args = parser.parse_args()
+    if args.calc_engine == "columnar" and args.calc_mode not in (AUTO, INLINE):
+        parser.error("--calc-engine columnar runs inline, use --calc-mode auto")
+    if args.retries < 1:
+        parser.error("--retries must be at least 1")
+    return args
+
 
-    data_fetching_task = DataFetchingTask(CITIES, weather_data_queue)
-    data_calculation_task = DataCalculationTask(weather_data_queue, results_queue)
+def export_metrics(
+    json_path: Optional[str] = None, prom_path: Optional[str] = None
+) -> None:
+    for name, value in YandexWeatherAPI.pool_stats().items():
+        metrics.set_gauge(f"http_pool_{name}", value)
+    for name, value in YandexWeatherAPI.cache_stats().items():
+        metrics.set_gauge(f"response_cache_{name}", value)
 
-    fetching_thread = Thread(target=data_fetching_task.run)
-    fetching_thread.start()
+    if json_path:
+        with open(json_path, "w") as file:
+            file.write(metrics.to_json())
+        logger.info("Metrics saved to %s", json_path)
+    if prom_path:
+        with open(prom_path, "w") as file:
+            file.write(metrics.to_prometheus())
+        logger.info("Metrics saved to %s", prom_path)
 
-    calculation_thread = Thread(target=data_calculation_task.run)
-    calculation_thread.start()
 
-    fetching_thread.join()
-    weather_data_queue.put(None)  # нужно чтобы DataCalculationTask знал, что больше данных не поступит, и он может завершить свою работу
-    calculation_thread.join()
+def main(
+    engine: str = "threads",
+    projected: bool = False,
+    calc_engine: str = "rows",
+    chunk_size: int = 32,
+    max_latency: float = 0.05,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    store: Optional[ResultStore] = None,
+    output_format: str = "json",
+    api: Optional[ResilientWeatherAPI] = None,
+    report_path: Optional[str] = None,
+    calc_mode: str = AUTO,
+):
+    # стадии работают параллельно и связаны ограниченными очередями: если
+    # следующая стадия не успевает, предыдущая ждёт, а не копит данные в памяти
+    fetch_options = {"projected": projected, "store": store, "api": api}
+    pipeline = Pipeline(queue_size=queue_size)
+    pipeline.add_stage(
+        "fetch",
+        lambda _, output_queue: FETCH_ENGINES[engine](
+            CITIES, output_queue, **fetch_options
+        ).run(),
+    )
+    pipeline.add_stage(
+        "calculate",
+        lambda input_queue, output_queue: DataCalculationTask(
+            input_queue,
+            output_queue,
+            engine=calc_engine,
+            chunk_size=chunk_size,
+            max_latency=max_latency,
+            mode=calc_mode,
+            expected_items=len(CITIES),
+        ).run(),
+    )
+    aggregated_path = f"aggregated_data{SUFFIXES[output_format]}"
+    best_path = "best_cities.json"
+    # файл появляется под своим именем, только если весь pipeline отработал
+    with WRITERS[output_format](aggregated_path) as writer:
+        pipeline.add_stage(
+            "aggregate", DataAggregationTask(store=store, writer=writer).consume
+        )
+        # нужен только лучший город: полные результаты остальных не копим
+        pipeline.add_stage("analyze", DataAnalyzingTask(top_k=1).consume)
+        results = pipeline.run()
 
-    aggregated_data = list(results_queue.queue)
-    data_aggregation_task = DataAggregationTask(aggregated_data)
-    aggregated_data = data_aggregation_task.run()
+    if store is not None:
+        store.save()
+        stats = store.stats
+        metrics.set_gauge("result_reuse_ratio", stats.reuse_ratio)
+        print(
+            f"Reused {stats.reused} of {stats.reused + stats.computed} city results "
+            f"({stats.reuse_ratio:.0%}), {stats.computed} recalculated"
+        )
 
-    data_analyzing_task = DataAnalyzingTask(aggregated_data)
-    best_cities = data_analyzing_task.run()
+    if api is not None:
+        report = api.report.to_dict({url: city for city, url in CITIES.items()})
+        print(
+            f"Fetch report: {report['requests']} cities, {report['outcomes']}, "
+            f"{report['retries']} retries, {report['hedged']} hedged"
+        )
+        for failure in report["failures"]:
+            print(f"  {failure['name']}: {failure['status']} ({failure['error']})")
+        if report_path:
+            with open(report_path, "w") as file:
+                json.dump(report, file, indent=2)
 
-    save_to_json(aggregated_data, "aggregated_data.json")
-    save_to_json(best_cities, "best_cities.json")
+    best_cities = results["analyze"]
+    save_to_json(best_cities, best_path)
 
-    print("Analysis complete. Best cities data saved to best_cities.json")
-    print("Aggregated data saved to aggregated_data.json")
+    print(f"Analysis complete. Best cities data saved to {best_path}")
+    print(f"Aggregated data saved to {aggregated_path}")
 
     if best_cities:
         print("\nBest city for travel:")
@@ -60,4 +261,47 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    metrics.enabled = bool(args.metrics_json or args.metrics_prom)
+    api = ResilientWeatherAPI(
+        timeout=args.timeout,
+        deadline=args.deadline,
+        retry=RetryPolicy(attempts=args.retries),
+        breaker_threshold=args.breaker_threshold,
+        hedge_after=args.hedge_after,
+    )
+    if args.cache_dir:
+        YandexWeatherAPI.configure_cache(
+            ResponseCache(
+                args.cache_dir,
+                ttl=args.cache_ttl,
+                max_bytes=args.cache_max_mb * 1024 * 1024,
+            )
+        )
+    main(
+        engine=args.engine,
+        projected=args.projected_decode,
+        calc_engine=args.calc_engine,
+        chunk_size=args.chunk_size,
+        max_latency=args.max_latency,
+        queue_size=args.queue_size,
+        store=(
+            ResultStore(
+                args.store,
+                config={
+                    "day_filter": DAY_FILTER,
+                    "engine": args.calc_engine,
+                    "projected": args.projected_decode,
+                },
+            )
+            if args.store
+            else None
+        ),
+        output_format=args.output_format,
+        api=api,
+        report_path=args.report,
+        calc_mode=args.calc_mode,
+    )
+    api.close()
+    if metrics.enabled:
+        export_metrics(args.metrics_json, args.metrics_prom)
@@ -0,0 +1,247 @@
+import heapq
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+METRIC_PREFIX = "weather_"
+# секунды: от обращения к кэшу до медленного ответа API
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+SLOWEST_KEPT = 10
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Process-wide registry of counters, gauges and histograms.
+
+    Disabled by default: every recording method returns on the first line, and
+    hot call sites check ``metrics.enabled`` before even reading the clock, so
+    the instrumentation costs an attribute lookup when it is off.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters: dict[str, dict[LabelKey, float]] = {}
+            self._gauges: dict[str, dict[LabelKey, float]] = {}
+            self._histograms: dict[str, dict[LabelKey, Histogram]] = {}
+            self._slowest: dict[str, list[tuple[float, str]]] = {}
+
+    @staticmethod
+    def _key(labels: dict[str, Any]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges.setdefault(name, {})[self._key(labels)] = value
+
+    def max_gauge(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = max(series.get(key, value), value)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        **labels,
+    ) -> None:
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_item(self, name: str, item: str, value: float) -> None:
+        """Histogram over all items plus the slowest items by name, e.g. cities"""
+        if not self.enabled:
+            return
+        self.observe(name, value)
+        with self._lock:
+            slowest = self._slowest.setdefault(name, [])
+            if len(slowest) < SLOWEST_KEPT:
+                heapq.heappush(slowest, (value, item))
+            elif value > slowest[0][0]:
+                heapq.heapreplace(slowest, (value, item))
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def to_dict(self) -> dict[str, Any]:
+        def series(values: dict[LabelKey, Any], convert=lambda value: value):
+            return [
+                {"labels": dict(key), "value": convert(value)}
+                for key, value in values.items()
+            ]
+
+        with self._lock:
+            return {
+                "counters": {n: series(v) for n, v in self._counters.items()},
+                "gauges": {n: series(v) for n, v in self._gauges.items()},
+                "histograms": {
+                    n: series(v, Histogram.to_dict) for n, v in self._histograms.items()
+                },
+                "slowest": {
+                    n: [
+                        {"item": item, "value": round(value, 6)}
+                        for value, item in sorted(v, reverse=True)
+                    ]
+                    for n, v in self._slowest.items()
+                },
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    @staticmethod
+    def _labels(key: LabelKey, extra: Optional[tuple[str, str]] = None) -> str:
+        pairs = list(key) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        body = ",".join(
+            '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"'))
+            for name, value in pairs
+        )
+        return "{" + body + "}"
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, values in self._counters.items():
+                metric = f"{METRIC_PREFIX}{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in values.items():
+                    lines.append(f"{metric}{self._labels(key)} {value}")
+            for name, values in self._gauges.items():
+                metric = f"{METRIC_PREFIX}{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                for key, value in values.items():
+                    lines.append(f"{metric}{self._labels(key)} {value}")
+            for name, values in self._histograms.items():
+                metric = f"{METRIC_PREFIX}{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in values.items():
+                    cumulative = 0
+                    bounds = [*map(str, histogram.buckets), "+Inf"]
+                    for bound, bucket_count in zip(bounds, histogram.counts):
+                        cumulative += bucket_count
+                        labels = self._labels(key, ("le", bound))
+                        lines.append(f"{metric}_bucket{labels} {cumulative}")
+                    labels = self._labels(key)
+                    lines.append(f"{metric}_sum{labels} {histogram.sum}")
+                    lines.append(f"{metric}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class QueueDepthSampler:
+    """Background thread recording queue depths of a running pipeline"""
+
+    def __init__(self, depths, interval: float = 0.05):
+        self.depths = depths
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            for queue, depth in self.depths().items():
+                metrics.observe("queue_depth", depth, buckets=SIZE_BUCKETS, queue=queue)
+                metrics.max_gauge("queue_depth_max", depth, queue=queue)
+
+    def __enter__(self) -> "QueueDepthSampler":
+        if metrics.enabled:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
@@ -0,0 +1,409 @@
+import abc
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, Optional
+
+from external.files import make_temp_file
+
+COLUMNAR_MAGIC = b"WCOL"
+COLUMNAR_VERSION = 1
+DEFAULT_BLOCK_CITIES = 1024
+JSONL_CITY_PREFIX = b'{"city":'
+
+# блок: число городов, число дневных строк, длина JSON-списка имён в байтах
+BLOCK_HEADER = struct.Struct("<III")
+# в конце файла: смещение оглавления, его длина и ещё раз magic
+TRAILER = struct.Struct("<QI4s")
+
+CITY_COLUMNS = ("avg_temp", "no_precipitation_hours", "days")
+DAILY_COLUMNS = ("date", "avg_temp", "no_precipitation_hours")
+
+logger = logging.getLogger(__name__)
+
+
+class AtomicWriter(abc.ABC):
+    """
+    Base of the streaming writers: records go to a temp file next to ``path``
+    as they arrive, and ``close`` renames it over ``path``. Readers never see
+    a half-written file; ``abort`` (or an exception inside ``with``) drops it.
+    """
+
+    binary = False
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_path = make_temp_file(
+            self.path.parent, prefix=f".{self.path.name}."
+        )
+        self._file: IO = os.fdopen(fd, "wb" if self.binary else "w")
+        self.count = 0
+        self.closed = False
+
+    @abc.abstractmethod
+    def write(self, record: dict[str, Any]) -> None:
+        """Appends one city result"""
+
+    def write_all(self, records: Iterable[dict[str, Any]]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def _finish(self) -> None:
+        """Hook for trailing data written right before the rename"""
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._finish()
+            self._file.close()
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self._discard()
+            raise
+        logger.debug("Wrote %s records to %s", self.count, self.path)
+
+    def abort(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._discard()
+
+    def _discard(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "AtomicWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class JsonLinesWriter(AtomicWriter):
+    """One compact JSON object per line"""
+
+    _encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    def write(self, record: dict[str, Any]) -> None:
+        self._file.write(self._encode(record))
+        self._file.write("\n")
+        self.count += 1
+
+
+class JsonArrayWriter(AtomicWriter):
+    """One JSON array, formatted exactly like ``json.dump(records, indent=4)``"""
+
+    def write(self, record: dict[str, Any]) -> None:
+        # каждая запись -- элемент массива с отступом в 4 пробела
+        text = json.dumps(record, indent=4).replace("\n", "\n    ")
+        self._file.write(",\n    " if self.count else "[\n    ")
+        self._file.write(text)
+        self.count += 1
+
+    def _finish(self) -> None:
+        self._file.write("\n]" if self.count else "[]")
+
+
+class JsonLinesReader:
+    """
+    Reader of JsonLinesWriter files. ``get`` finds one city by reading only
+    the ``{"city": ...`` prefix of every line and parsing the matching one.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._offsets: Optional[dict[str, int]] = None
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        with open(self.path, "rb") as file:
+            for line in file:
+                yield json.loads(line)
+
+    @staticmethod
+    def _city(line: bytes) -> str:
+        if line.startswith(JSONL_CITY_PREFIX):
+            decoder = json.JSONDecoder()
+            text = line[len(JSONL_CITY_PREFIX) :].decode("utf-8")
+            return decoder.raw_decode(text)[0]
+        return json.loads(line)["city"]
+
+    def _index(self) -> dict[str, int]:
+        if self._offsets is None:
+            offsets = {}
+            with open(self.path, "rb") as file:
+                offset = 0
+                for line in file:
+                    offsets[self._city(line)] = offset
+                    offset += len(line)
+            self._offsets = offsets
+        return self._offsets
+
+    def cities(self) -> list[str]:
+        return list(self._index())
+
+    def get(self, city: str) -> Optional[dict[str, Any]]:
+        offset = self._index().get(city)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            return json.loads(file.readline())
+
+
+def _int_column(values: Iterable[int]) -> array:
+    column = array("i", values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _read_column(buffer: bytes, offset: int, count: int) -> tuple[array, int]:
+    column = array("i")
+    end = offset + count * column.itemsize
+    column.frombytes(buffer[offset:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+
+@lru_cache(maxsize=4096)
+def _date_from_ordinal(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+class ColumnarWriter(AtomicWriter):
+    """
+    Binary columnar file of city results, little-endian int32 columns.
+
+    Cities are written in blocks of up to ``block_cities``: a BLOCK_HEADER,
+    a JSON list of city names, the per-city columns (CITY_COLUMNS) and
+    the daily row columns (DAILY_COLUMNS, dates as proleptic ordinals). A JSON
+    table of block offsets and the TRAILER close the file, so a reader can
+    jump to any block without scanning the others.
+    """
+
+    binary = True
+
+    def __init__(self, path: str, block_cities: int = DEFAULT_BLOCK_CITIES):
+        super().__init__(path)
+        self.block_cities = block_cities
+        self._blocks: list[list[int]] = []
+        self._offset = len(COLUMNAR_MAGIC)
+        self._file.write(COLUMNAR_MAGIC)
+        self._reset_block()
+
+    def _reset_block(self) -> None:
+        self._names: list[str] = []
+        self._city_columns = [[] for _ in CITY_COLUMNS]
+        self._daily_columns = [[] for _ in DAILY_COLUMNS]
+
+    def write(self, record: dict[str, Any]) -> None:
+        daily_data = record["daily_data"]
+        city_values = (
+            record["avg_temp"],
+            record["no_precipitation_hours"],
+            len(daily_data),
+        )
+        for column, value in zip(self._city_columns, city_values):
+            column.append(value)
+        dates, temps, dry_hours = self._daily_columns
+        for daily in daily_data:
+            dates.append(date.fromisoformat(daily["date"]).toordinal())
+            temps.append(daily["avg_temp"])
+            dry_hours.append(daily["no_precipitation_hours"])
+        self._names.append(record["city"])
+        self.count += 1
+        if len(self._names) >= self.block_cities:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        if not self._names:
+            return
+        names = json.dumps(self._names).encode("utf-8")
+        rows = len(self._daily_columns[0])
+        chunks = [BLOCK_HEADER.pack(len(self._names), rows, len(names)), names]
+        for column in (*self._city_columns, *self._daily_columns):
+            chunks.append(_int_column(column).tobytes())
+        data = b"".join(chunks)
+        self._file.write(data)
+        self._blocks.append([self._offset, len(self._names), rows])
+        self._offset += len(data)
+        self._reset_block()
+
+    def _finish(self) -> None:
+        self._flush_block()
+        table = json.dumps(
+            {"version": COLUMNAR_VERSION, "blocks": self._blocks}
+        ).encode("utf-8")
+        self._file.write(table)
+        self._file.write(TRAILER.pack(self._offset, len(table), COLUMNAR_MAGIC))
+
+
+class ColumnarReader:
+    """
+    Memory-mapped reader of ColumnarWriter files. Opening reads the block
+    table and city names only; columns of a block are decoded when first
+    needed, one block at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        if os.fstat(self._file.fileno()).st_size < len(COLUMNAR_MAGIC) + TRAILER.size:
+            self._file.close()
+            raise ValueError(f"{self.path} is not a columnar results file")
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buffer[: len(COLUMNAR_MAGIC)] != COLUMNAR_MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a columnar results file")
+
+        table_offset, table_size, magic = TRAILER.unpack_from(
+            self._buffer, len(self._buffer) - TRAILER.size
+        )
+        if magic != COLUMNAR_MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is truncated")
+        table = json.loads(self._buffer[table_offset : table_offset + table_size])
+        self._blocks: list[tuple[int, int, int]] = [
+            tuple(block) for block in table["blocks"]
+        ]
+        self._index: dict[str, tuple[int, int]] = {}
+        for block_number, (offset, _, _) in enumerate(self._blocks):
+            for position, name in enumerate(self._block_names(offset)):
+                self._index[name] = (block_number, position)
+        self._decoded: Optional[tuple[int, dict[str, Any]]] = None
+
+    def _block_names(self, offset: int) -> list[str]:
+        _, _, names_size = BLOCK_HEADER.unpack_from(self._buffer, offset)
+        start = offset + BLOCK_HEADER.size
+        return json.loads(self._buffer[start : start + names_size])
+
+    def _block(self, block_number: int) -> dict[str, Any]:
+        if self._decoded is not None and self._decoded[0] == block_number:
+            return self._decoded[1]
+
+        offset = self._blocks[block_number][0]
+        cities, rows, names_size = BLOCK_HEADER.unpack_from(self._buffer, offset)
+        position = offset + BLOCK_HEADER.size + names_size
+        block: dict[str, Any] = {"names": self._block_names(offset)}
+        for name in CITY_COLUMNS:
+            block[name], position = _read_column(self._buffer, position, cities)
+        daily = {}
+        for name in DAILY_COLUMNS:
+            daily[name], position = _read_column(self._buffer, position, rows)
+        block["daily"] = daily
+        # начало дневных строк каждого города внутри блока
+        starts, row = [], 0
+        for days in block["days"]:
+            starts.append(row)
+            row += days
+        block["starts"] = starts
+        self._decoded = (block_number, block)
+        return block
+
+    def _record(self, block: dict[str, Any], position: int) -> dict[str, Any]:
+        start = block["starts"][position]
+        end = start + block["days"][position]
+        daily = block["daily"]
+        return {
+            "city": block["names"][position],
+            "daily_data": [
+                {
+                    "date": _date_from_ordinal(ordinal),
+                    "avg_temp": temp,
+                    "no_precipitation_hours": dry_hours,
+                }
+                for ordinal, temp, dry_hours in zip(
+                    daily["date"][start:end],
+                    daily["avg_temp"][start:end],
+                    daily["no_precipitation_hours"][start:end],
+                )
+            ],
+            "avg_temp": block["avg_temp"][position],
+            "no_precipitation_hours": block["no_precipitation_hours"][position],
+        }
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def cities(self) -> list[str]:
+        return list(self._index)
+
+    def get(self, city: str) -> Optional[dict[str, Any]]:
+        location = self._index.get(city)
+        if location is None:
+            return None
+        block_number, position = location
+        return self._record(self._block(block_number), position)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for block_number, (_, cities, _) in enumerate(self._blocks):
+            block = self._block(block_number)
+            for position in range(cities):
+                yield self._record(block, position)
+
+    def daily_rows(self) -> Iterator[tuple[str, str, int, int]]:
+        """(city, date, avg_temp, no_precipitation_hours) without building dicts"""
+        for block_number in range(len(self._blocks)):
+            block = self._block(block_number)
+            daily = block["daily"]
+            cities = (
+                name
+                for name, days in zip(block["names"], block["days"])
+                for _ in range(days)
+            )
+            for city, ordinal, temp, dry_hours in zip(
+                cities,
+                daily["date"],
+                daily["avg_temp"],
+                daily["no_precipitation_hours"],
+            ):
+                yield city, _date_from_ordinal(ordinal), temp, dry_hours
+
+    def close(self) -> None:
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> "ColumnarReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+WRITERS = {
+    "json": JsonArrayWriter,
+    "jsonl": JsonLinesWriter,
+    "columnar": ColumnarWriter,
+}
+SUFFIXES = {
+    "json": ".json",
+    "jsonl": ".jsonl",
+    "columnar": ".wcol",
+}
+
+
+def open_reader(path: str):
+    """ColumnarReader or JsonLinesReader, chosen by the file's magic bytes"""
+    with open(path, "rb") as file:
+        magic = file.read(len(COLUMNAR_MAGIC))
+    if magic == COLUMNAR_MAGIC:
+        return ColumnarReader(path)
+    return JsonLinesReader(path)
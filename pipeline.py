@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from queue import Full, Queue
+from typing import Any, Callable, Optional
+
+from metrics import QueueDepthSampler, metrics
+
+SENTINEL = None
+DEFAULT_QUEUE_SIZE = 64
+CLOSED_POLL_INTERVAL = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    def __init__(self, errors: list[tuple[str, BaseException]]):
+        self.errors = errors
+        details = "; ".join(f"{stage}: {error!r}" for stage, error in errors)
+        super().__init__(f"Pipeline failed in {len(errors)} stage(s): {details}")
+
+
+class Channel(Queue):
+    """
+    Bounded queue between two stages. ``put`` blocks while the queue is full,
+    which is what pushes back on the producer. Once the consumer is gone
+    (``close``), puts are dropped so the producer can finish instead of
+    blocking forever.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE):
+        super().__init__(maxsize)
+        self.closed = threading.Event()
+        self.dropped = 0
+
+    def put(self, item: Any, block: bool = True, timeout: Optional[float] = None):
+        if not block or self.maxsize <= 0:
+            return super().put(item, block, timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.closed.is_set():
+            wait = CLOSED_POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise Full
+            try:
+                return super().put(item, timeout=wait)
+            except Full:
+                continue
+        self.dropped += 1
+
+    def close(self) -> None:
+        self.closed.set()
+
+
+StageTarget = Callable[[Optional[Channel], Optional[Channel]], Any]
+
+
+@dataclass
+class Stage:
+    name: str
+    target: StageTarget
+
+
+class Pipeline:
+    """
+    Runs stages connected by bounded channels, each stage in its own thread.
+
+    A stage is ``target(input_channel, output_channel)``: the first stage gets
+    no input, the last one no output. The runtime, not the stage, puts the
+    ``None`` sentinel into the output channel when a stage returns or fails, so
+    shutdown always reaches the end of the pipeline. A failed stage closes its
+    input channel so upstream stages do not block on a full queue, and
+    ``run`` re-raises all stage errors as one PipelineError.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.stages: list[Stage] = []
+        self.channels: list[Channel] = []
+        self.results: dict[str, Any] = {}
+        self.errors: list[tuple[str, BaseException]] = []
+        self._errors_lock = threading.Lock()
+
+    def add_stage(self, name: str, target: StageTarget) -> "Pipeline":
+        if self.stages:
+            self.channels.append(Channel(self.queue_size))
+        self.stages.append(Stage(name, target))
+        return self
+
+    def queue_depths(self) -> dict[str, int]:
+        return {
+            f"{self.stages[i].name}->{self.stages[i + 1].name}": channel.qsize()
+            for i, channel in enumerate(self.channels)
+        }
+
+    def _run_stage(self, index: int) -> None:
+        stage = self.stages[index]
+        input_channel = self.channels[index - 1] if index > 0 else None
+        output_channel = self.channels[index] if index < len(self.channels) else None
+        started = time.perf_counter()
+        try:
+            self.results[stage.name] = stage.target(input_channel, output_channel)
+        except BaseException as e:
+            logger.exception("Stage %s failed", stage.name)
+            with self._errors_lock:
+                self.errors.append((stage.name, e))
+            if input_channel is not None:
+                input_channel.close()
+        finally:
+            if output_channel is not None:
+                output_channel.put(SENTINEL)
+            elapsed = time.perf_counter() - started
+            metrics.set_gauge("stage_seconds", elapsed, stage=stage.name)
+            logger.debug("Stage %s finished in %.3fs", stage.name, elapsed)
+
+    def run(self) -> dict[str, Any]:
+        threads = [
+            threading.Thread(target=self._run_stage, args=(i,), name=stage.name)
+            for i, stage in enumerate(self.stages)
+        ]
+        with QueueDepthSampler(self.queue_depths):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        if self.errors:
+            raise PipelineError(self.errors) from self.errors[0][1]
+        return self.results
@@ -0,0 +1,111 @@
+import threading
+from bisect import bisect_right, insort
+from itertools import chain, islice
+from typing import Any, Iterator, Optional
+
+
+class OrderedBuckets:
+    """
+    Sorted index of positions by key: a sorted list of distinct keys plus one
+    bucket per key. Temperatures and hour counts take few distinct values, so
+    an insert is a dict lookup and a list append; ties keep insertion order.
+    """
+
+    def __init__(self):
+        self._keys: list[float] = []
+        self._buckets: dict[float, list[int]] = {}
+
+    def add(self, key: float, position: int) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            insort(self._keys, key)
+            bucket = self._buckets[key] = []
+        bucket.append(position)
+
+    def count_upto(self, key: float) -> int:
+        """Positions with keys up to ``key`` inclusive"""
+        keys = self._keys[: bisect_right(self._keys, key)]
+        return sum(len(self._buckets[k]) for k in keys)
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(self._buckets[key] for key in self._keys)
+
+
+class RankingIndex:
+    """
+    Incrementally maintained rank orders of city results.
+
+    Two ordered indexes -- by ``avg_temp`` and by ``no_precipitation_hours``,
+    both descending -- are updated as results arrive. Ties keep arrival order,
+    exactly like the stable sorts in the original DataAnalyzingTask. The
+    overall rank orders cities by (temperature rank, precipitation rank).
+    Reads return copies with a ``rank`` key, the added results are never
+    modified. With ``keep`` set only the ``keep`` best results are held in
+    full, every other city is indexed by its name and two keys alone, and
+    reads are limited to the top ``keep``.
+    """
+
+    def __init__(
+        self,
+        cities: Optional[list[dict[str, Any]]] = None,
+        keep: Optional[int] = None,
+    ):
+        self.keep = keep
+        self._by_temp = OrderedBuckets()
+        self._by_precipitation = OrderedBuckets()
+        self._names: list[str] = []
+        # полные результаты: все или только текущие кандидаты в top-keep
+        self._records: dict[int, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        for city_weather in cities or []:
+            self.add(city_weather)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, city_weather: dict[str, Any]) -> None:
+        with self._lock:
+            position = len(self._names)
+            self._names.append(city_weather["city"])
+            temp_key = -city_weather["avg_temp"]
+            self._by_temp.add(temp_key, position)
+            self._by_precipitation.add(
+                -city_weather["no_precipitation_hours"], position
+            )
+            if self.keep is None:
+                self._records[position] = city_weather
+            elif self._by_temp.count_upto(temp_key) <= self.keep:
+                self._records[position] = city_weather
+                if len(self._records) > self.keep:
+                    # вытесняем того, кто сдвинулся на место keep + 1
+                    evicted = next(islice(self._by_temp, self.keep, None))
+                    del self._records[evicted]
+
+    def _overall_order(self, k: Optional[int]) -> list[int]:
+        # ранг по температуре уникален (позиция в устойчивой сортировке), поэтому
+        # порядок по (temp_rank, precipitation_rank) совпадает с порядком по температуре
+        return list(islice(self._by_temp, k))
+
+    def top(self, k: int) -> list[dict[str, Any]]:
+        with self._lock:
+            if self.keep is not None and k > self.keep and len(self) > self.keep:
+                raise ValueError(f"Only the {self.keep} best results are kept")
+            return [
+                {**self._records[position], "rank": rank}
+                for rank, position in enumerate(self._overall_order(k), start=1)
+            ]
+
+    def best(self) -> list[dict[str, Any]]:
+        return self.top(1)
+
+    def ranked(self) -> list[dict[str, Any]]:
+        return self.top(len(self))
+
+    def ranks(self) -> dict[str, tuple[int, int]]:
+        """city -> (temperature rank, precipitation rank)"""
+        with self._lock:
+            temp_ranks = {p: rank for rank, p in enumerate(self._by_temp, 1)}
+            return {
+                self._names[position]: (temp_ranks[position], rank)
+                for rank, position in enumerate(self._by_precipitation, 1)
+            }
@@ -0,0 +1,468 @@
+"""
+Resident forecast service: city results are kept in an in-memory TTL cache,
+refreshed on a schedule by the regular fetch and calculation tasks, and
+served over a small JSON HTTP API.
+
+    python service.py --port 8000 --ttl 600 --refresh-interval 300
+
+    GET  /cities              cached city names
+    GET  /cities/<CITY>       daily data of a city, fetched on a cache miss
+    GET  /top?k=10            k best cities with ranks
+    GET  /best                best city (as a one-element list)
+    GET  /stats               cache and refresh counters, last refresh report
+    POST /refresh[?city=X]    refresh all cities or one city now
+"""
+
+import argparse
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue
+from typing import Any, Iterable, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from execution import AUTO, WorkerPool
+from external.resilience import ResilientWeatherAPI, RunReport
+from metrics import metrics
+from pipeline import Pipeline
+from ranking import RankingIndex
+from sharding import load_registry
+from tasks import DataCalculationTask, DataFetchingTask
+from utils import CITIES
+
+DEFAULT_TTL = 600.0
+DEFAULT_REFRESH_INTERVAL = 300.0
+DEFAULT_TOP_K = 10
+# столько городов и меньше считаем в потоке запроса, без пула процессов
+INLINE_REFRESH_LIMIT = 4
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Dict of values that expire ``ttl`` seconds after they were put"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Any]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key: str, value: Any, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries[key] = (value, now + self.ttl)
+
+    def live(self, now: Optional[float] = None) -> dict[str, tuple[Any, float]]:
+        """{key: (value, expires_at)} of entries that have not expired yet"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return {
+                key: entry for key, entry in self._entries.items() if entry[1] > now
+            }
+
+    def purge(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [key for key, (_, exp) in self._entries.items() if exp <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+
+@dataclass
+class ServiceStats:
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    refreshed_cities: int = 0
+    failed_cities: int = 0
+    coalesced: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class ForecastService:
+    """
+    City results behind a TTL cache. ``refresh`` runs DataFetchingTask and
+    DataCalculationTask for the given cities (all by default); a city that is
+    already being refreshed is not requested again, the caller waits for the
+    running refresh instead. A failed city keeps its previous cached result
+    until it expires. Rankings are built once per cache change and served
+    from that snapshot.
+    """
+
+    def __init__(
+        self,
+        cities: Optional[dict[str, str]] = None,
+        ttl: float = DEFAULT_TTL,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        api: Optional[ResilientWeatherAPI] = None,
+        projected: bool = False,
+        calc_workers: Optional[int] = None,
+        warm_pool: bool = True,
+    ):
+        self.cities = dict(CITIES if cities is None else cities)
+        self.cache = TTLCache(ttl)
+        self.refresh_interval = refresh_interval
+        self.api = api
+        self.projected = projected
+        self.calc_workers = calc_workers
+        # пул процессов живёт вместе с сервисом, обновления не ждут его запуска
+        self.pool = WorkerPool(calc_workers) if warm_pool else None
+        self.stats = ServiceStats()
+        # отчёт api только о последнем обновлении: общий копил бы исходы всех
+        self.last_report: Optional[RunReport] = None
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._ranked: Optional[list[dict[str, Any]]] = None
+        self._ranked_until = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _fetch_inline(self, urls: dict[str, str]) -> dict[str, dict[str, Any]]:
+        results = {}
+        for city, url in urls.items():
+            city_data = DataFetchingTask.fetch_weather_data(
+                city, url, projected=self.projected, api=self.api
+            )
+            data = city_data[city]
+            if data:
+                try:
+                    results[city] = DataCalculationTask.calculate_city_weather(
+                        city, data
+                    )
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.error("Error calculating weather for %s: %s", city, e)
+        return results
+
+    def _fetch_pipeline(self, urls: dict[str, str]) -> dict[str, dict[str, Any]]:
+        results: dict[str, dict[str, Any]] = {}
+
+        def collect(input_queue: Queue, _) -> None:
+            while True:
+                city_weather = input_queue.get()
+                if city_weather is None:
+                    break
+                results[city_weather["city"]] = city_weather
+
+        pipeline = Pipeline()
+        pipeline.add_stage(
+            "fetch",
+            lambda _, output_queue: DataFetchingTask(
+                urls, output_queue, projected=self.projected, api=self.api
+            ).run(),
+        )
+        pipeline.add_stage(
+            "calculate",
+            lambda input_queue, output_queue: DataCalculationTask(
+                input_queue,
+                output_queue,
+                max_workers=self.calc_workers,
+                mode=AUTO,
+                expected_items=len(urls),
+                pool=self.pool,
+            ).run(),
+        )
+        pipeline.add_stage("collect", collect)
+        pipeline.run()
+        return results
+
+    def _load(self, cities: list[str]) -> dict[str, dict[str, Any]]:
+        urls = {city: self.cities[city] for city in cities}
+        if self.api is not None:
+            with self._lock:
+                self.api.report = self.last_report = RunReport()
+        if len(urls) <= INLINE_REFRESH_LIMIT:
+            results = self._fetch_inline(urls)
+        else:
+            results = self._fetch_pipeline(urls)
+
+        now = time.monotonic()
+        for city, result in results.items():
+            self.cache.put(city, result, now)
+        with self._lock:
+            self._ranked = None
+            self.stats.refreshes += 1
+            self.stats.refreshed_cities += len(results)
+            self.stats.failed_cities += len(urls) - len(results)
+        metrics.inc("service_refreshed_cities_total", len(results))
+        if len(results) < len(urls):
+            failed = sorted(set(urls) - set(results))
+            logger.warning("Refresh failed for %s", ", ".join(failed))
+        return results
+
+    def refresh(self, cities: Optional[Iterable[str]] = None) -> dict[str, Any]:
+        """
+        {city: fresh result or None if it could not be fetched}. Unknown
+        cities raise KeyError before anything is requested.
+        """
+        # повторы одного города (?city=a&city=A) не должны ждать сами себя
+        names = list(dict.fromkeys(self.cities if cities is None else cities))
+        unknown = [city for city in names if city not in self.cities]
+        if unknown:
+            raise KeyError(f"Unknown cities: {', '.join(unknown)}")
+
+        own: dict[str, Future] = {}
+        waiting: dict[str, Future] = {}
+        with self._lock:
+            for city in names:
+                future = self._in_flight.get(city)
+                if future is None:
+                    own[city] = self._in_flight[city] = Future()
+                else:
+                    waiting[city] = future
+            self.stats.coalesced += len(waiting)
+        if waiting:
+            metrics.inc("service_coalesced_total", len(waiting))
+
+        try:
+            results = self._load(list(own)) if own else {}
+        except BaseException as e:
+            for future in own.values():
+                future.set_exception(e)
+            raise
+        else:
+            for city, future in own.items():
+                future.set_result(results.get(city))
+        finally:
+            with self._lock:
+                for city in own:
+                    del self._in_flight[city]
+
+        refreshed = {city: future.result() for city, future in waiting.items()}
+        refreshed.update(results)
+        return {city: refreshed.get(city) for city in names}
+
+    def city(self, name: str, refresh_on_miss: bool = True) -> Optional[dict]:
+        result = self.cache.get(name)
+        with self._lock:
+            if result is not None:
+                self.stats.hits += 1
+                return result
+            self.stats.misses += 1
+        if not refresh_on_miss or name not in self.cities:
+            return None
+        return self.refresh([name])[name]
+
+    def _ranking(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            if self._ranked is not None and now < self._ranked_until:
+                return self._ranked
+            live = self.cache.live(now)
+            # порядок реестра: при равных температурах ранги как у DataAnalyzingTask
+            entries = [live[city] for city in self.cities if city in live]
+            self._ranked = RankingIndex([result for result, _ in entries]).ranked()
+            self._ranked_until = min((exp for _, exp in entries), default=math.inf)
+            return self._ranked
+
+    def top(self, k: int = DEFAULT_TOP_K) -> list[dict[str, Any]]:
+        return self._ranking()[:k]
+
+    def best(self) -> list[dict[str, Any]]:
+        return self.top(1)
+
+    def cached_cities(self) -> list[str]:
+        return list(self.cache.live())
+
+    def to_dict(self) -> dict[str, Any]:
+        report = None
+        if self.last_report is not None:
+            labels = {url: city for city, url in self.cities.items()}
+            report = self.last_report.to_dict(labels)
+        return {
+            "cities": len(self.cities),
+            "cached": len(self.cache.live()),
+            "ttl": self.cache.ttl,
+            "refresh_interval": self.refresh_interval,
+            **self.stats.to_dict(),
+            "last_refresh": report,
+        }
+
+    def _refresh_loop(self) -> None:
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.cache.purge()
+                self.refresh()
+            except Exception:
+                logger.exception("Scheduled refresh failed")
+
+    def start(self, warm: bool = True) -> "ForecastService":
+        """
+        Start the worker pool, refresh all cities (unless ``warm`` is False)
+        and schedule refreshes
+        """
+        if self.pool is not None:
+            self.pool.start()
+        if warm:
+            try:
+                self.refresh()
+            except BaseException:
+                if self.pool is not None:
+                    self.pool.shutdown()
+                raise
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="refresh", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    _encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def _send_json(self, status: int, data: Any) -> None:
+        body = self._encode(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self) -> tuple[list[str], dict[str, list[str]]]:
+        parts = urlsplit(self.path)
+        segments = [unquote(part) for part in parts.path.split("/") if part]
+        return segments, parse_qs(parts.query)
+
+    def do_GET(self):
+        service: ForecastService = self.server.service
+        segments, query = self._route()
+        if segments == ["cities"]:
+            return self._send_json(200, service.cached_cities())
+        if len(segments) == 2 and segments[0] == "cities":
+            name = segments[1].upper()
+            if name not in service.cities:
+                return self._send_json(404, {"error": f"Unknown city: {name}"})
+            result = service.city(name)
+            if result is None:
+                return self._send_json(503, {"error": f"No data for {name}"})
+            return self._send_json(200, result)
+        if segments == ["top"]:
+            try:
+                k = int(query.get("k", [DEFAULT_TOP_K])[0])
+            except ValueError:
+                return self._send_json(400, {"error": "k must be an integer"})
+            if k < 1:
+                return self._send_json(400, {"error": "k must be positive"})
+            return self._send_json(200, service.top(k))
+        if segments == ["best"]:
+            return self._send_json(200, service.best())
+        if segments == ["stats"]:
+            return self._send_json(200, service.to_dict())
+        self._send_json(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self):
+        service: ForecastService = self.server.service
+        segments, query = self._route()
+        if segments != ["refresh"]:
+            return self._send_json(404, {"error": f"Not found: {self.path}"})
+        cities = [city.upper() for city in query.get("city", [])] or None
+        try:
+            results = service.refresh(cities)
+        except KeyError as e:
+            return self._send_json(404, {"error": e.args[0]})
+        refreshed = sum(result is not None for result in results.values())
+        self._send_json(200, {"requested": len(results), "refreshed": refreshed})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, service: ForecastService, host: str = "127.0.0.1", port: int = 8000
+    ):
+        super().__init__((host, port), ServiceHandler)
+        self.service = service
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=8000, type=int)
+    parser.add_argument(
+        "--ttl", default=DEFAULT_TTL, type=float, help="seconds a result is served"
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        default=DEFAULT_REFRESH_INTERVAL,
+        type=float,
+        help="seconds between scheduled refreshes, keep it below --ttl",
+    )
+    parser.add_argument(
+        "--registry", default=None, help="JSON {city: url}, utils.CITIES if unset"
+    )
+    parser.add_argument("--timeout", default=10.0, type=float, help="per attempt")
+    parser.add_argument("--projected-decode", action="store_true")
+    parser.add_argument(
+        "--no-warm-pool",
+        action="store_true",
+        help="do not keep calculation processes running between refreshes",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    args = parse_args()
+    api = ResilientWeatherAPI(timeout=args.timeout)
+    service = ForecastService(
+        load_registry(args.registry),
+        ttl=args.ttl,
+        refresh_interval=args.refresh_interval,
+        api=api,
+        projected=args.projected_decode,
+        warm_pool=not args.no_warm_pool,
+    ).start()
+    server = ServiceHTTPServer(service, args.host, args.port)
+    logger.info("Serving %s cities on %s", len(service.cities), server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        api.close()
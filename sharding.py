@@ -0,0 +1,287 @@
+"""
+Sharded execution over a large city registry.
+
+The registry is split by a consistent-hash ring into shards. Every shard
+worker runs fetch + calculate + aggregate for its cities only, writes its
+results and its partial ranking (top-k) to files, and the merge step combines
+the partial rankings into the global DataAnalyzingTask result. Workers are
+local processes here, but they only share the registry and an output
+directory, so the same ``worker``/``merge`` commands run on separate machines.
+
+    python sharding.py run --shards 4 --registry cities.json --output-dir out
+    python sharding.py worker --shard shard-1 --shards 4 --registry cities.json
+    python sharding.py merge --shards 4 --output-dir out
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+import time
+from bisect import bisect
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from output import JsonLinesReader, JsonLinesWriter
+from pipeline import DEFAULT_QUEUE_SIZE, Pipeline
+from tasks import (
+    FETCH_ENGINES,
+    DataAggregationTask,
+    DataAnalyzingTask,
+    DataCalculationTask,
+)
+from utils import CITIES
+
+DEFAULT_REPLICAS = 128
+DEFAULT_TOP_K = 10
+RESULTS_SUFFIX = ".jsonl"
+TOP_SUFFIX = ".top.jsonl"
+SUMMARY_SUFFIX = ".summary.json"
+
+logger = logging.getLogger(__name__)
+
+
+class ShardError(Exception):
+    def __init__(self, shards: list[str]):
+        self.shards = shards
+        super().__init__(f"Shard worker(s) failed: {', '.join(shards)}")
+
+
+class HashRing:
+    """
+    Consistent-hash ring: every shard owns ``replicas`` points on the ring and
+    a city goes to the shard of the first point after its hash. Adding or
+    removing a shard moves only about 1/N of the cities.
+    """
+
+    def __init__(self, shards: Iterable[str], replicas: int = DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        self.shards: list[str] = []
+        for shard in shards:
+            self.add(shard)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def _rebuild(self, points: list[tuple[int, str]]) -> None:
+        points.sort()
+        self._points = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def add(self, shard: str) -> None:
+        if shard in self.shards:
+            return
+        self.shards.append(shard)
+        points = list(zip(self._points, self._owners))
+        points.extend(
+            (self._hash(f"{shard}#{replica}"), shard)
+            for replica in range(self.replicas)
+        )
+        self._rebuild(points)
+
+    def remove(self, shard: str) -> None:
+        self.shards.remove(shard)
+        points = zip(self._points, self._owners)
+        self._rebuild([(point, owner) for point, owner in points if owner != shard])
+
+    def shard_for(self, key: str) -> str:
+        if not self._points:
+            raise ValueError("Hash ring has no shards")
+        index = bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def partition(self, cities: dict[str, str]) -> dict[str, dict[str, str]]:
+        parts: dict[str, dict[str, str]] = {shard: {} for shard in self.shards}
+        for city, url in cities.items():
+            parts[self.shard_for(city)][city] = url
+        return parts
+
+
+def shard_names(count: int) -> list[str]:
+    return [f"shard-{i}" for i in range(count)]
+
+
+def load_registry(path: Optional[str] = None) -> dict[str, str]:
+    """{city: url} from a JSON file, utils.CITIES if no path is given"""
+    if path is None:
+        return dict(CITIES)
+    with open(path) as file:
+        return json.load(file)
+
+
+def run_shard(
+    shard: str,
+    cities: dict[str, str],
+    output_dir: str,
+    top_k: int = DEFAULT_TOP_K,
+    engine: str = "threads",
+    calc_workers: Optional[int] = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> dict[str, Any]:
+    """
+    Worker of one shard: results go to ``<shard>.jsonl``, the shard's top-k to
+    ``<shard>.top.jsonl`` and counters to ``<shard>.summary.json``
+    """
+    started = time.perf_counter()
+    directory = Path(output_dir)
+    analyzing_task = DataAnalyzingTask(top_k=top_k)
+    pipeline = Pipeline(queue_size=queue_size)
+    pipeline.add_stage(
+        "fetch",
+        lambda _, output_queue: FETCH_ENGINES[engine](cities, output_queue).run(),
+    )
+    pipeline.add_stage(
+        "calculate",
+        lambda input_queue, output_queue: DataCalculationTask(
+            input_queue, output_queue, max_workers=calc_workers
+        ).run(),
+    )
+    with JsonLinesWriter(directory / f"{shard}{RESULTS_SUFFIX}") as writer:
+        pipeline.add_stage("aggregate", DataAggregationTask(writer=writer).consume)
+        pipeline.add_stage("analyze", analyzing_task.consume)
+        pipeline.run()
+
+    with JsonLinesWriter(directory / f"{shard}{TOP_SUFFIX}") as writer:
+        writer.write_all(analyzing_task.top(top_k))
+
+    summary = {
+        "shard": shard,
+        "cities": len(cities),
+        "results": len(analyzing_task.index),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    (directory / f"{shard}{SUMMARY_SUFFIX}").write_text(json.dumps(summary))
+    logger.info("Shard finished: %s", summary)
+    return summary
+
+
+def merge_rankings(partials: Iterable[list[dict[str, Any]]]) -> DataAnalyzingTask:
+    """
+    Global ranking from per-shard top-k lists. Each list is already ordered
+    by temperature, so a k-way merge feeds the candidates to one
+    DataAnalyzingTask in global order; its top(k) equals the top(k) over all
+    shards' results, since every city of the global top-k is in its shard's
+    top-k.
+    """
+    ranked_partials = [
+        [{key: value for key, value in city.items() if key != "rank"} for city in part]
+        for part in partials
+    ]
+    merged = heapq.merge(*ranked_partials, key=lambda city: -city["avg_temp"])
+    return DataAnalyzingTask(list(merged))
+
+
+def read_partials(output_dir: str, shards: Iterable[str]) -> list[list[dict]]:
+    directory = Path(output_dir)
+    return [
+        list(JsonLinesReader(directory / f"{shard}{TOP_SUFFIX}")) for shard in shards
+    ]
+
+
+def run_sharded(
+    cities: dict[str, str],
+    shards: int,
+    output_dir: str,
+    top_k: int = DEFAULT_TOP_K,
+    **options,
+) -> DataAnalyzingTask:
+    """
+    Run every shard in its own process and merge their rankings. Processes
+    are spawned, not forked: each worker starts with its own connection pools
+    and calculation pool, like a worker on another machine.
+    """
+    names = shard_names(shards)
+    parts = HashRing(names).partition(cities)
+    if options.get("calc_workers") is None:
+        options["calc_workers"] = max(1, (os.cpu_count() or 1) // shards)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_shard,
+            args=(name, parts[name], output_dir, top_k),
+            kwargs=options,
+            name=name,
+        )
+        for name in names
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    failed = [process.name for process in processes if process.exitcode != 0]
+    if failed:
+        raise ShardError(failed)
+    return merge_rankings(read_partials(output_dir, names))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run all shards as local processes")
+    worker = commands.add_parser("worker", help="run one shard of the registry")
+    merge = commands.add_parser("merge", help="merge rankings of finished shards")
+    for command in (run, worker, merge):
+        command.add_argument("--shards", default=4, type=int, help="number of shards")
+        command.add_argument("--output-dir", default="shards", help="shard files")
+        command.add_argument("--top-k", default=DEFAULT_TOP_K, type=int)
+    for command in (run, worker):
+        command.add_argument(
+            "--registry", default=None, help="JSON {city: url}, utils.CITIES if unset"
+        )
+        command.add_argument(
+            "--engine", choices=FETCH_ENGINES.keys(), default="threads"
+        )
+        command.add_argument(
+            "--calc-workers", default=None, type=int, help="processes per shard"
+        )
+    worker.add_argument("--shard", required=True, help="shard name, e.g. shard-0")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    args = parse_args()
+    if args.command != "merge":
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+
+    if args.command == "worker":
+        parts = HashRing(shard_names(args.shards)).partition(
+            load_registry(args.registry)
+        )
+        run_shard(
+            args.shard,
+            parts[args.shard],
+            args.output_dir,
+            args.top_k,
+            engine=args.engine,
+            calc_workers=args.calc_workers,
+        )
+    else:
+        if args.command == "run":
+            ranking = run_sharded(
+                load_registry(args.registry),
+                args.shards,
+                args.output_dir,
+                args.top_k,
+                engine=args.engine,
+                calc_workers=args.calc_workers,
+            )
+        else:
+            ranking = merge_rankings(
+                read_partials(args.output_dir, shard_names(args.shards))
+            )
+        for city in ranking.top(args.top_k):
+            print(
+                f"{city['rank']:>3}. {city['city']}: {city['avg_temp']}°C, "
+                f"{city['no_precipitation_hours']} dry hours"
+            )
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from external.files import make_temp_file
+
+logger = logging.getLogger(__name__)
+
+
+class ReusedResult(dict):
+    """
+    City result taken from the store instead of a forecast payload. The
+    calculation stage passes it through as is, without sending it to the pool.
+    """
+
+
+@dataclass
+class StoreStats:
+    reused: int = 0
+    computed: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        total = self.reused + self.computed
+        return self.reused / total if total else 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "reused": self.reused,
+            "computed": self.computed,
+            "reuse_ratio": round(self.reuse_ratio, 3),
+        }
+
+
+class ResultStore:
+    """
+    Persistent city results keyed by city and sha256 of the raw payload
+    together with ``config``, the calculation settings the results depend on
+    (hour filter, engine, decode mode): changing any of them recalculates
+    every city instead of serving results of the old settings.
+
+    ``lookup`` is called by the fetch stage with the response body: an
+    unchanged payload returns the previous result, otherwise the digest is
+    remembered until ``record`` receives the freshly calculated result for that
+    city. ``save`` writes the whole store to one JSON file atomically.
+    """
+
+    def __init__(self, path: str, config: Optional[dict[str, Any]] = None):
+        self.path = Path(path)
+        self.fingerprint = self.config_fingerprint(config or {})
+        self.stats = StoreStats()
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._pending: dict[str, str] = {}
+        self._changed = False
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def config_fingerprint(config: dict[str, Any]) -> bytes:
+        # repr даёт устойчивое описание HourFilter: условия в нём отсортированы
+        encoded = json.dumps(config, sort_keys=True, default=repr)
+        return hashlib.sha256(encoded.encode("utf-8")).digest()
+
+    def digest(self, payload: bytes) -> str:
+        return hashlib.sha256(self.fingerprint + payload).hexdigest()
+
+    def _load(self) -> None:
+        try:
+            self._entries = json.loads(self.path.read_bytes())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring broken result store %s: %s", self.path, e)
+            self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, city: str, payload: bytes) -> Optional[ReusedResult]:
+        digest = self.digest(payload)
+        with self._lock:
+            entry = self._entries.get(city)
+            if entry is not None and entry["digest"] == digest:
+                self.stats.reused += 1
+                return ReusedResult(entry["result"])
+            self._pending[city] = digest
+            return None
+
+    def record(self, result: dict[str, Any]) -> None:
+        """Store a calculated result whose payload was seen by ``lookup``"""
+        if isinstance(result, ReusedResult):
+            return
+        with self._lock:
+            digest = self._pending.pop(result["city"], None)
+            if digest is None:
+                return
+            self._entries[result["city"]] = {"digest": digest, "result": result}
+            self.stats.computed += 1
+            self._changed = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._changed:
+                return
+            data = json.dumps(self._entries).encode("utf-8")
+            self._changed = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = make_temp_file(self.path.parent)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.debug("Saved %s results to %s", len(self._entries), self.path)
@@ -1,71 +1,403 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
-from typing import Any
-from queue import Queue
+import os
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    FIRST_COMPLETED,
+    wait,
+)
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Union
+from queue import Empty, Full, Queue, SimpleQueue
 
-from external.analyzer import INPUT_DAY_SUITABLE_CONDITIONS
-from external.client import YandexWeatherAPI
+from execution import (
+    AUTO,
+    INLINE,
+    MODES,
+    PROCESS,
+    THREAD,
+    InlineExecutor,
+    WorkerPool,
+    choose_mode,
+    make_executor,
+    pool_startup_cost,
+)
+from external.analyzer import DAY_FILTER
+from external.client import YandexWeatherAPI, decode_response
+from external.filters import HOUR_VALUES, HourFilter
+from external.resilience import ResilientWeatherAPI
+from metrics import SIZE_BUCKETS, metrics
+from output import AtomicWriter
+from ranking import RankingIndex
+from store import ResultStore, ReusedResult
 from utils import get_url_by_city_name
 
+if TYPE_CHECKING:
+    from external.async_client import AsyncYandexWeatherAPI
+
+# asyncio, multiprocessing и numpy (columnar) импортируются там, где нужны:
+# CLI, которому они не понадобятся, не платит за их загрузку при старте
+
 logger = logging.getLogger(__name__)
 
 
 class DataFetchingTask:
-    def __init__(self, cities: dict[str, str], output_queue: Queue):
+    def __init__(
+        self,
+        cities: dict[str, str],
+        output_queue: Queue,
+        max_workers: Optional[int] = None,
+        projected: bool = False,
+        store: Optional[ResultStore] = None,
+        api: Optional[ResilientWeatherAPI] = None,
+    ):
         self.cities = cities
         self.output_queue = output_queue
+        # как и ThreadPoolExecutor по умолчанию: min(32, cpu_count + 4)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.projected = projected
+        self.store = store
+        # таймауты, повторы и circuit breaker; без него -- один запрос без таймаута
+        self.api = api
+        self.busy_time = 0.0
+        self._busy_lock = threading.Lock()
 
     @staticmethod
-    def fetch_weather_data(city: str) -> dict[str, Any]:
-        url = get_url_by_city_name(city)
+    def fetch_weather_data(
+        city: str,
+        url: Optional[str] = None,
+        projected: bool = False,
+        store: Optional[ResultStore] = None,
+        api: Optional[ResilientWeatherAPI] = None,
+    ) -> dict[str, Any]:
+        """
+        ``{city: data}``, or with a store and an unchanged payload the stored
+        ReusedResult, which skips decoding and calculation. Requests go
+        through ``api`` if given, otherwise straight to YandexWeatherAPI.
+        """
+        url = url or get_url_by_city_name(city)
+        client = api or YandexWeatherAPI
         try:
-            data = YandexWeatherAPI.get_forecasting(url)
-            logger.debug(f"Fetched data for {city}: {data}")
+            if store is None:
+                data = client.get_forecasting(url, projected=projected)
+            else:
+                started = time.perf_counter() if metrics.enabled else 0.0
+                response = client.get_response(url)
+                reused = store.lookup(city, response.body)
+                if reused is not None:
+                    logger.debug("Payload of %s unchanged, result reused", city)
+                    return reused
+                data = decode_response(response, projected, started)
+            logger.debug("Fetched data for %s", city)
             return {city: data}
         except Exception as e:
-            logger.error(f"Error fetching data for {city}: {e}")
+            metrics.inc("fetch_errors_total")
+            logger.error("Error fetching data for %s: %s", city, e)
             return {city: {}}
 
+    def _fetch(self, city: str, url: str) -> dict[str, Any]:
+        options = (self.projected, self.store, self.api)
+        if not metrics.enabled:
+            return self.fetch_weather_data(city, url, *options)
+
+        started = time.perf_counter()
+        city_data = self.fetch_weather_data(city, url, *options)
+        elapsed = time.perf_counter() - started
+        metrics.observe_item("fetch_city_seconds", city, elapsed)
+        with self._busy_lock:
+            self.busy_time += elapsed
+        return city_data
+
     def run(self) -> None:
-        with ThreadPoolExecutor() as executor:
-            future_to_city = {
-                executor.submit(self.fetch_weather_data, city): city
-                for city in self.cities.keys()
-            }
-            for future in as_completed(future_to_city):
-                city_data = future.result()
-                self.output_queue.put(city_data)
+        # каждому потоку -- своё keep-alive соединение, лишние не держим
+        YandexWeatherAPI.configure_pool(self.max_workers)
+        started = time.perf_counter()
+        cities = iter(self.cities.items())
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # в работе не больше 2 * max_workers городов: если следующая стадия
+            # не успевает и очередь заполнена, скачанные ответы не копятся в памяти
+            pending = set()
+            for city, url in islice(cities, 2 * self.max_workers):
+                pending.add(executor.submit(self._fetch, city, url))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.output_queue.put(future.result())
+                    for city, url in islice(cities, 1):
+                        pending.add(executor.submit(self._fetch, city, url))
         logger.debug("All data fetched and put in the queue.")
+        if metrics.enabled:
+            wall_time = time.perf_counter() - started
+            metrics.set_gauge(
+                "worker_utilization",
+                self.busy_time / (wall_time * self.max_workers) if wall_time else 0.0,
+                stage="fetch",
+            )
+        logger.info("Connection pool stats: %s", YandexWeatherAPI.pool_stats())
+        if YandexWeatherAPI.response_cache is not None:
+            logger.info("Response cache stats: %s", YandexWeatherAPI.cache_stats())
+
+
+class AsyncDataFetchingTask:
+    """
+    asyncio drop-in for DataFetchingTask: one event loop instead of a thread
+    per in-flight request. Same output contract -- ``{city: data}`` per city,
+    ``{city: {}}`` on failure or when the overall deadline is hit. With
+    ``api`` requests get its attempt timeouts, retries, circuit breakers and
+    report entries, and ``request_timeout`` is not applied on top.
+    """
+
+    def __init__(
+        self,
+        cities: dict[str, str],
+        output_queue: Queue,
+        concurrency: int = 100,
+        request_timeout: Optional[float] = 10.0,
+        deadline: Optional[float] = None,
+        projected: bool = False,
+        store: Optional[ResultStore] = None,
+        api: Optional[ResilientWeatherAPI] = None,
+    ):
+        self.cities = cities
+        self.output_queue = output_queue
+        self.concurrency = concurrency
+        # попытки и их таймауты считает api: общий таймаут оборвал бы повторы
+        self.request_timeout = None if api is not None else request_timeout
+        self.deadline = deadline
+        self.projected = projected
+        self.store = store
+        self.api = api
+        self.busy_time = 0.0
+
+    async def _publish(self, city_data: dict[str, Any]) -> None:
+        import asyncio
+
+        try:
+            self.output_queue.put_nowait(city_data)
+        except Full:
+            # ограниченная очередь заполнена -- ждём в потоке, не блокируя event loop
+            await asyncio.to_thread(self.output_queue.put, city_data)
+
+    async def _get(
+        self, client: "AsyncYandexWeatherAPI", city: str, url: str
+    ) -> dict[str, Any]:
+        if self.store is None:
+            return {city: await client.get_forecasting(url, projected=self.projected)}
+
+        started = time.perf_counter() if metrics.enabled else 0.0
+        response = await client.get_response(url)
+        reused = self.store.lookup(city, response.body)
+        if reused is not None:
+            logger.debug("Payload of %s unchanged, result reused", city)
+            return reused
+        return {city: decode_response(response, self.projected, started)}
+
+    async def fetch_weather_data(
+        self, client: "AsyncYandexWeatherAPI", city: str, url: str
+    ) -> dict[str, Any]:
+        import asyncio
+
+        started = time.perf_counter() if metrics.enabled else 0.0
+        try:
+            city_data = await asyncio.wait_for(
+                self._get(client, city, url), timeout=self.request_timeout
+            )
+            logger.debug("Fetched data for %s", city)
+        except asyncio.TimeoutError:
+            metrics.inc("fetch_errors_total")
+            logger.error("Timeout fetching data for %s", city)
+            city_data = {city: {}}
+        except Exception as e:
+            metrics.inc("fetch_errors_total")
+            logger.error("Error fetching data for %s: %s", city, e)
+            city_data = {city: {}}
+        if metrics.enabled:
+            elapsed = time.perf_counter() - started
+            metrics.observe_item("fetch_city_seconds", city, elapsed)
+            self.busy_time += elapsed
+        return city_data
+
+    async def _worker(
+        self,
+        client: "AsyncYandexWeatherAPI",
+        cities: Iterator[tuple[str, str]],
+        published: set[str],
+    ) -> None:
+        # город считается отправленным до put: если дедлайн отменит ожидание,
+        # put в потоке всё равно завершится, и повторно город не отправится
+        for city, url in cities:
+            city_data = await self.fetch_weather_data(client, city, url)
+            published.add(city)
+            await self._publish(city_data)
+
+    async def _run(self) -> None:
+        import asyncio
+
+        from external.async_client import AsyncYandexWeatherAPI
+
+        client = AsyncYandexWeatherAPI(
+            pool_size=self.concurrency,
+            cache=YandexWeatherAPI.response_cache,
+            resilience=self.api,
+        )
+        cities = iter(self.cities.items())
+        published: set[str] = set()
+        # concurrency корутин разбирают общий итератор: одновременно в работе
+        # не больше concurrency запросов и ответов, ожидающих места в очереди
+        workers = [
+            asyncio.create_task(self._worker(client, cities, published))
+            for _ in range(min(self.concurrency, len(self.cities)))
+        ]
+        try:
+            if not workers:
+                return
+            _, pending = await asyncio.wait(workers, timeout=self.deadline)
+            if pending:
+                for worker in pending:
+                    worker.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                dropped = [city for city in self.cities if city not in published]
+                logger.error(
+                    "Fetch deadline of %ss exceeded, %s cities dropped",
+                    self.deadline,
+                    len(dropped),
+                )
+                for city in dropped:
+                    await self._publish({city: {}})
+            for worker in workers:
+                if not worker.cancelled() and worker.exception() is not None:
+                    raise worker.exception()
+        finally:
+            await client.close()
+
+    def run(self) -> None:
+        import asyncio
+
+        started = time.perf_counter()
+        asyncio.run(self._run())
+        wall_time = time.perf_counter() - started
+        logger.debug("All data fetched and put in the queue in %.3fs.", wall_time)
+        if metrics.enabled and wall_time:
+            slots = min(self.concurrency, len(self.cities)) or 1
+            metrics.set_gauge(
+                "worker_utilization",
+                self.busy_time / (wall_time * slots),
+                stage="fetch",
+            )
+
+
+FETCH_ENGINES = {
+    "threads": DataFetchingTask,
+    "asyncio": AsyncDataFetchingTask,
+}
+
+
+# часы дня в виде (date, [(hour, temp, condition), ...]) -- всё, что нужно расчёту
+ProjectedDay = tuple[str, list[tuple[int, int, str]]]
+
+
+@dataclass
+class BatchTiming:
+    size: int
+    fill_time: float  # от первого города в пакете до отправки в пул
+    round_trip: float  # от отправки до готового результата: IPC + ожидание + расчёт
+    compute_time: float  # чистый расчёт внутри процесса-воркера
+
+    @property
+    def overhead(self) -> float:
+        return self.round_trip - self.compute_time
 
 
 class DataCalculationTask:
-    def __init__(self, input_queue: Queue, output_queue: Queue):
+    ENGINES = ("rows", "columnar")
+
+    def __init__(
+        self,
+        input_queue: Queue,
+        output_queue: Queue,
+        engine: str = "rows",
+        chunk_size: int = 32,
+        max_latency: float = 0.05,
+        max_workers: Optional[int] = None,
+        day_filter: HourFilter = DAY_FILTER,
+        mode: Optional[str] = None,
+        expected_items: Optional[int] = None,
+        pool: Optional[WorkerPool] = None,
+    ):
+        """
+        ``mode`` is where batches are calculated: "process" (default),
+        "thread", "inline", or "auto" to time the first batch in place and
+        choose by ``expected_items`` and the measured cost per city. A started
+        ``pool`` is used for process batches instead of a new pool and is
+        left running for the next run. The columnar engine always calculates
+        in place: it accepts only "inline" (its default) and "auto".
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown calculation engine: {engine}")
+        if mode is None:
+            mode = INLINE if engine == "columnar" else PROCESS
+        if mode not in MODES:
+            raise ValueError(f"Unknown execution mode: {mode}")
+        if engine == "columnar" and (mode in (THREAD, PROCESS) or pool is not None):
+            raise ValueError("Columnar engine calculates inline, without a pool")
         self.input_queue = input_queue
         self.output_queue = output_queue
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.max_latency = max_latency
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.day_filter = day_filter
+        self.mode = mode
+        self.expected_items = expected_items
+        self.pool = pool
+        self.chosen_mode: Optional[str] = None if mode == AUTO else mode
+        if engine == "columnar":
+            self.chosen_mode = INLINE
+        self.batch_timings: list[BatchTiming] = []
+        self._timings_lock = threading.Lock()
 
     @staticmethod
-    def calculate_city_weather(city: str, data: dict[str, Any]) -> dict:
+    def project_city_weather(
+        data: dict[str, Any], day_filter: HourFilter
+    ) -> list[ProjectedDay]:
+        """
+        Hours of the ``day_filter`` window only (a filter already shifted to
+        the city's timezone): temp and condition of other hours are not read,
+        so odd values outside the window do not fail the city.
+        """
+        window = day_filter.hours
+        return [
+            (
+                forecast["date"],
+                [
+                    (hour_value, hour["temp"], hour["condition"])
+                    for hour in forecast.get("hours", [])
+                    if (hour_value := HOUR_VALUES[hour["hour"]]) in window
+                ],
+            )
+            for forecast in data.get("forecasts", [])
+        ]
+
+    @staticmethod
+    def calculate_projected_weather(
+        city: str, days: list[ProjectedDay], day_filter: HourFilter = DAY_FILTER
+    ) -> dict:
         total_temp = 0
         total_hours_count = 0
         total_no_precipitation_hours = 0
         daily_data = []
 
-        for forecast in data.get("forecasts", []):
-            daily_temp = 0
-            daily_hours_count = 0
-            daily_no_precipitation_hours = 0
-            for hour in forecast.get("hours", []):
-                if 9 <= int(hour["hour"]) <= 19:
-                    daily_hours_count += 1
-                    daily_temp += hour["temp"]
-                    if hour["condition"] in INPUT_DAY_SUITABLE_CONDITIONS:
-                        daily_no_precipitation_hours += 1
-
+        for date, summary in day_filter.evaluate_days(days):
+            daily_hours_count, daily_temp, daily_no_precipitation_hours = summary[:3]
             if daily_hours_count > 0:
                 avg_daily_temp = daily_temp / daily_hours_count
                 daily_data.append(
                     {
-                        "date": forecast["date"],
+                        "date": date,
                         "avg_temp": int(avg_daily_temp),
                         "no_precipitation_hours": daily_no_precipitation_hours,
                     }
@@ -83,75 +415,359 @@ class DataCalculationTask:
             "no_precipitation_hours": total_no_precipitation_hours,
         }
 
-        logger.debug(f"Calculated weather for {city}: {result}")
+        logger.debug("Calculated weather for %s: %s", city, result)
         return result
 
+    @staticmethod
+    def calculate_city_weather(
+        city: str, data: dict[str, Any], day_filter: HourFilter = DAY_FILTER
+    ) -> dict:
+        day_filter = day_filter.for_city(data)
+        return DataCalculationTask.calculate_projected_weather(
+            city,
+            DataCalculationTask.project_city_weather(data, day_filter),
+            day_filter,
+        )
+
+    @staticmethod
+    def calculate_batch(
+        batch: list[tuple[str, list[ProjectedDay], HourFilter]]
+    ) -> tuple[list[dict], list[tuple[str, str]], float]:
+        """Runs in a worker process: results, (city, error) pairs and compute time"""
+        started = time.perf_counter()
+        results, errors = [], []
+        for city, days, day_filter in batch:
+            try:
+                result = DataCalculationTask.calculate_projected_weather(
+                    city, days, day_filter
+                )
+                results.append(result)
+            except Exception as e:
+                errors.append((city, str(e)))
+        return results, errors, time.perf_counter() - started
+
+    def _run_columnar(self) -> None:
+        from columnar import ColumnarWeatherEngine
+
+        engine = ColumnarWeatherEngine(self.day_filter)
+        while True:
+            city_data = self.input_queue.get()
+            if city_data is None:
+                break
+            if isinstance(city_data, ReusedResult):
+                self.output_queue.put(city_data)
+                continue
+            for city, data in city_data.items():
+                if not data:
+                    continue
+                try:
+                    if not metrics.enabled:
+                        engine.add(city, data)
+                        continue
+                    with metrics.timer("columnar_seconds", phase="pack"):
+                        engine.add(city, data)
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.error("Error calculating weather for %s: %s", city, e)
+
+        with metrics.timer("columnar_seconds", phase="reduce"):
+            results = engine.run()
+        for result in results:
+            self.output_queue.put(result)
+        logger.debug("All data calculated and put in the queue.")
+
+    def _choose_executor(
+        self, calibration: Future, batch_size: int
+    ) -> tuple[Executor, bool]:
+        compute_time = 0.0
+        if calibration.exception() is None:
+            compute_time = calibration.result()[2]
+        if self.expected_items is not None:
+            remaining = self.expected_items - batch_size
+        else:
+            # сколько ещё придёт, неизвестно -- считаем по пакету на воркер
+            remaining = self.chunk_size * self.max_workers
+        item_cost = compute_time / batch_size
+        pool_warm = self.pool is not None and self.pool.warm
+        self.chosen_mode = choose_mode(
+            remaining,
+            item_cost,
+            self.max_workers,
+            pool_startup=0.0 if pool_warm else pool_startup_cost(),
+        )
+        logger.info(
+            "Calculation mode: %s (%.1f us per city, %s cities left)",
+            self.chosen_mode,
+            item_cost * 1e6,
+            remaining,
+        )
+        return make_executor(self.chosen_mode, self.max_workers, self.pool)
+
+    def _submit(
+        self,
+        executor: Executor,
+        in_flight: threading.Semaphore,
+        done_batches: SimpleQueue,
+        batch: list[tuple[str, list[ProjectedDay], HourFilter]],
+        batch_started: float,
+    ) -> Future:
+        # не больше двух пакетов на воркер: иначе очередь пула растёт без ограничений
+        in_flight.acquire()
+        submitted = time.perf_counter()
+        future = executor.submit(self.calculate_batch, batch)
+
+        def record(done: Future) -> None:
+            # работает в служебном потоке пула: только замеры, без записи в
+            # ограниченную output_queue -- медленный потребитель встал бы пул
+            try:
+                if done.exception() is None:
+                    self._record_timing(
+                        BatchTiming(
+                            size=len(batch),
+                            fill_time=submitted - batch_started,
+                            round_trip=time.perf_counter() - submitted,
+                            compute_time=done.result()[2],
+                        )
+                    )
+            finally:
+                in_flight.release()
+                done_batches.put((batch, done))
+
+        future.add_done_callback(record)
+        return future
+
+    def _record_timing(self, timing: BatchTiming) -> None:
+        with self._timings_lock:
+            self.batch_timings.append(timing)
+        if metrics.enabled:
+            metrics.observe("calc_batch_size", timing.size, buckets=SIZE_BUCKETS)
+            for phase in ("fill_time", "round_trip", "compute_time", "overhead"):
+                metrics.observe(
+                    "calc_batch_seconds", getattr(timing, phase), phase=phase
+                )
+
+    def _publish(self, done_batches: SimpleQueue, block: bool = False) -> int:
+        """Puts results of finished batches into ``output_queue``: batches done"""
+        published = 0
+        while block or not done_batches.empty():
+            batch, done = done_batches.get()
+            block = False
+            published += 1
+            try:
+                results, errors, _ = done.result()
+            except Exception as e:
+                cities = ", ".join(city for city, *_ in batch)
+                logger.error("Error calculating weather for %s: %s", cities, e)
+                continue
+            for result in results:
+                self.output_queue.put(result)
+            for city, error in errors:
+                logger.error("Error calculating weather for %s: %s", city, error)
+        return published
+
     def run(self) -> None:
-        with ProcessPoolExecutor() as executor:
-            future_to_city = {}
-            while True:
-                city_data = self.input_queue.get()
+        if self.engine == "columnar":
+            self._run_columnar()
+            return
+
+        started = time.perf_counter()
+        in_flight = threading.Semaphore(2 * self.max_workers)
+        # готовые пакеты публикует этот поток, а не колбэки пула
+        done_batches: SimpleQueue = SimpleQueue()
+        pending = 0
+        executor: Optional[Executor] = None
+        owned = False
+        if self.mode != AUTO:
+            executor, owned = make_executor(self.mode, self.max_workers, self.pool)
+        try:
+            batch: list[tuple[str, list[ProjectedDay], HourFilter]] = []
+            batch_started = 0.0
+            finished = False
+            while not finished:
+                timeout = None
+                if batch:
+                    waited = time.perf_counter() - batch_started
+                    timeout = max(0.0, self.max_latency - waited)
+                elif pending:
+                    # пока ждём вход, готовые пакеты не должны застревать
+                    timeout = self.max_latency
+                try:
+                    city_data = self.input_queue.get(timeout=timeout)
+                except Empty:
+                    # пакет ждёт дольше max_latency -- отправляем как есть
+                    city_data = {}
+                    timeout = 0.0
+                pending -= self._publish(done_batches)
                 if city_data is None:
-                    break
+                    finished = True
+                    city_data = {}
+                elif isinstance(city_data, ReusedResult):
+                    # ответ API не изменился -- готовый результат прошлого запуска
+                    self.output_queue.put(city_data)
+                    city_data = {}
+
                 for city, data in city_data.items():
-                    if data:
-                        future = executor.submit(self.calculate_city_weather, city, data)
-                        future_to_city[future] = city
+                    if not data:
+                        continue
+                    # фильтр один на часовой пояс, в пакете он сериализуется один раз
+                    day_filter = self.day_filter.for_city(data)
+                    try:
+                        days = self.project_city_weather(data, day_filter)
+                    except (KeyError, TypeError, ValueError) as e:
+                        logger.error("Error calculating weather for %s: %s", city, e)
+                        continue
+                    if not batch:
+                        batch_started = time.perf_counter()
+                    batch.append((city, days, day_filter))
+
+                expired = timeout == 0.0
+                if batch and (len(batch) >= self.chunk_size or finished or expired):
+                    if executor is None:
+                        # auto: первый пакет считаем на месте, по нему выбираем режим
+                        future = self._submit(
+                            InlineExecutor(),
+                            in_flight,
+                            done_batches,
+                            batch,
+                            batch_started,
+                        )
+                        executor, owned = self._choose_executor(future, len(batch))
+                    else:
+                        self._submit(
+                            executor, in_flight, done_batches, batch, batch_started
+                        )
+                    pending += 1
+                    batch = []
+            while pending:
+                pending -= self._publish(done_batches, block=True)
+        finally:
+            if executor is not None and owned:
+                executor.shutdown()
 
-            for future in as_completed(future_to_city):
-                city = future_to_city[future]
-                try:
-                    result = future.result()
-                    self.output_queue.put(result)
-                except Exception as e:
-                    logging.error(f"Error calculating weather for {city}: {e}")
         logger.debug("All data calculated and put in the queue.")
+        if self.batch_timings:
+            logger.info("Calculation batches: %s", self.batch_stats())
+        if metrics.enabled:
+            wall_time = time.perf_counter() - started
+            with self._timings_lock:
+                compute_time = sum(t.compute_time for t in self.batch_timings)
+            workers = 1 if self.chosen_mode in (None, INLINE) else self.max_workers
+            metrics.set_gauge(
+                "worker_utilization",
+                compute_time / (wall_time * workers) if wall_time else 0.0,
+                stage="calculate",
+            )
+
+    def batch_stats(self) -> dict[str, float]:
+        with self._timings_lock:
+            timings = list(self.batch_timings)
+        if not timings:
+            return {"batches": 0}
+
+        def avg(values) -> float:
+            return round(sum(values) / len(timings), 6)
+
+        return {
+            "batches": len(timings),
+            "cities": sum(t.size for t in timings),
+            "avg_batch_size": avg(t.size for t in timings),
+            "avg_fill_time": avg(t.fill_time for t in timings),
+            "avg_round_trip": avg(t.round_trip for t in timings),
+            "avg_compute_time": avg(t.compute_time for t in timings),
+            "avg_overhead": avg(t.overhead for t in timings),
+            "max_round_trip": round(max(t.round_trip for t in timings), 6),
+        }
 
 
 class DataAggregationTask:
-    def __init__(self, city_weather: list[dict]):
-        self.city_weather = city_weather
+    def __init__(
+        self,
+        city_weather: Optional[list[dict]] = None,
+        store: Optional[ResultStore] = None,
+        writer: Optional[AtomicWriter] = None,
+    ):
+        self.city_weather = city_weather if city_weather is not None else []
+        self.store = store
+        # результаты пишутся по мере поступления, а не одним списком в конце
+        self.writer = writer
+        self.count = 0
 
     def run(self) -> list[dict[str, Any]]:
         aggregated_data = []
         for data in self.city_weather:
             aggregated_data.append(data)
-        logger.debug(f"Aggregated data: {aggregated_data}")
+        logger.debug("Aggregated data for %s cities", len(aggregated_data))
         return aggregated_data
 
+    def consume(
+        self, input_queue: Queue, output_queue: Optional[Queue] = None
+    ) -> Union[list[dict[str, Any]], int]:
+        """
+        Pipeline stage: collect results until the None sentinel, passing each
+        on. With a ``writer`` results are only streamed to it, not kept, and
+        the number of results is returned instead of the list.
+        """
+        while True:
+            city_weather = input_queue.get()
+            if city_weather is None:
+                break
+            self.count += 1
+            if self.store is not None:
+                self.store.record(city_weather)
+            if self.writer is not None:
+                self.writer.write(city_weather)
+            else:
+                self.city_weather.append(city_weather)
+            if output_queue is not None:
+                output_queue.put(city_weather)
+        if self.writer is not None:
+            logger.debug("Aggregated data for %s cities", self.count)
+            return self.count
+        return self.run()
 
-class DataAnalyzingTask:
-    def __init__(self, aggregated_data: list[dict[str, Any]]):
-        self.aggregated_data = aggregated_data
 
-    def run(self) -> list[dict[str, Any]]:
-        sorted_by_temp = sorted(
-            self.aggregated_data, key=lambda x: x["avg_temp"], reverse=True
-        )
-        sorted_by_precipitation = sorted(
-            self.aggregated_data,
-            key=lambda x: x["no_precipitation_hours"],
-            reverse=True,
-        )
-
-        for rank, city in enumerate(sorted_by_temp):
-            city["temp_rank"] = rank + 1
-        for rank, city in enumerate(sorted_by_precipitation):
-            city["precipitation_rank"] = rank + 1
+class DataAnalyzingTask:
+    def __init__(
+        self,
+        aggregated_data: Optional[list[dict[str, Any]]] = None,
+        top_k: Optional[int] = None,
+    ):
+        """
+        With ``top_k`` only that many best results are kept in full: memory
+        of the stage no longer grows with daily data of every city, and
+        ``top`` is limited to ``top_k``.
+        """
+        # ранги поддерживаются по мере поступления результатов, без пересортировки
+        self.index = RankingIndex(aggregated_data, keep=top_k)
 
-        best_cities = sorted(
-            self.aggregated_data,
-            key=lambda x: (x["temp_rank"], x["precipitation_rank"]),
-        )
+    def add(self, city_weather: dict[str, Any]) -> None:
+        if not metrics.enabled:
+            self.index.add(city_weather)
+            return
+        with metrics.timer("analyze_add_seconds"):
+            self.index.add(city_weather)
 
-        for rank, city in enumerate(best_cities):
-            city["rank"] = rank + 1
+    def consume(
+        self, input_queue: Queue, output_queue: Optional[Queue] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Pipeline stage: rank results as they arrive. ``best``/``top`` can be
+        read from other threads before the None sentinel for partial rankings.
+        """
+        while True:
+            city_weather = input_queue.get()
+            if city_weather is None:
+                break
+            self.add(city_weather)
+        return self.run()
 
-        best_cities = [city for city in best_cities if city["rank"] == 1]
+    def best(self) -> list[dict[str, Any]]:
+        return self.index.best()
 
-        for city in self.aggregated_data:
-            city.pop("temp_rank", None)
-            city.pop("precipitation_rank", None)
+    def top(self, k: int) -> list[dict[str, Any]]:
+        return self.index.top(k)
 
-        logger.debug(f"Best cities: {best_cities}")
+    def run(self) -> list[dict[str, Any]]:
+        with metrics.timer("analyze_rank_seconds"):
+            best_cities = self.best()
+        logger.debug("Best cities: %s", [city["city"] for city in best_cities])
         return best_cities
@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.stub_server import StubForecastServer
+from pipeline import Pipeline
+from tasks import (
+    DataAggregationTask,
+    DataAnalyzingTask,
+    DataCalculationTask,
+    DataFetchingTask,
+)
+
+
+@pytest.fixture
+def forecast_server():
+    with StubForecastServer() as server:
+        yield server.url
+
+
+@pytest.fixture
+def run_pipeline():
+    """Runs fetch -> calculate -> aggregate -> analyze and returns stage results"""
+
+    def run(
+        cities,
+        fetching_task=DataFetchingTask,
+        store=None,
+        queue_size=2,
+        fetch_options=None,
+        **calc_options,
+    ):
+        fetch_options = {"store": store, **(fetch_options or {})}
+        calc_options = {"chunk_size": 4, "max_workers": 2, **calc_options}
+        pipeline = Pipeline(queue_size=queue_size)
+        pipeline.add_stage(
+            "fetch",
+            lambda _, output_queue: fetching_task(
+                cities, output_queue, **fetch_options
+            ).run(),
+        )
+        pipeline.add_stage(
+            "calculate",
+            lambda input_queue, output_queue: DataCalculationTask(
+                input_queue, output_queue, **calc_options
+            ).run(),
+        )
+        pipeline.add_stage("aggregate", DataAggregationTask(store=store).consume)
+        pipeline.add_stage("analyze", DataAnalyzingTask().consume)
+        return pipeline.run()
+
+    return run
@@ -0,0 +1,84 @@
+import io
+import json
+import logging
+import shutil
+from pathlib import Path
+
+from external.analyzer import (
+    DEFAULT_OUTPUT_RESULT,
+    DayInfo,
+    HourInfo,
+    analyze_batch,
+    analyze_json,
+    compile_path,
+    find_inputs,
+    load_data,
+)
+
+EXAMPLES = Path(__file__).resolve().parent.parent / "examples"
+
+
+def test_output_matches_example():
+    result = analyze_json(load_data(EXAMPLES / "response.json"))
+
+    assert json.dumps(result, indent=2) == (EXAMPLES / "output.json").read_text()
+
+
+def test_compiled_path_matches_deep_getitem():
+    get_offset = compile_path("info>tzinfo>offset")
+
+    assert get_offset({"info": {"tzinfo": {"offset": 10800}}}) == 10800
+    assert get_offset({"info": {}}) is None
+    assert get_offset({"info": None}) is None
+    assert compile_path("condition")({"temp": 1}) is None
+
+
+def test_slots_objects_do_not_keep_raw_data():
+    day = DayInfo(
+        {
+            "date": "2022-05-18",
+            "hours": [
+                {"hour": "8", "temp": 5, "condition": "clear"},
+                {"hour": "9", "temp": 10, "condition": "clear"},
+                {"hour": "10", "temp": 13, "condition": "rain"},
+            ],
+        }
+    )
+    hour = HourInfo({"hour": "9", "temp": 10, "condition": "clear"})
+
+    assert not hasattr(day, "__dict__") and not hasattr(hour, "__dict__")
+    assert day.to_json() == {
+        "date": "2022-05-18",
+        "hours_start": 9,
+        "hours_end": 10,
+        "hours_count": 2,
+        "temp_avg": 11.5,
+        "relevant_cond_hours": 1,
+    }
+    assert hour.is_cond_suitable and (hour.hour, hour.temperature) == (9, 10)
+
+
+def test_analyze_json_does_not_share_result():
+    data = load_data(EXAMPLES / "response.json")
+    first, second = analyze_json(data), analyze_json(data)
+
+    assert first == second and first is not second
+    assert DEFAULT_OUTPUT_RESULT == {"days": []}
+
+
+def test_batch_streams_json_lines(tmp_path, caplog):
+    for i in range(6):
+        shutil.copy(EXAMPLES / "response.json", tmp_path / f"forecast{i}.json")
+    (tmp_path / "broken.json").write_text("{")
+    expected = analyze_json(load_data(EXAMPLES / "response.json"))
+
+    output = io.StringIO()
+    inputs = find_inputs(str(tmp_path))
+    with caplog.at_level(logging.INFO):
+        assert analyze_batch(inputs, output, workers=2) == 7
+    assert "Analyzed 7 files" in caplog.text
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["input"] for record in records] == inputs
+    assert "error" in records[0] and records[0]["input"].endswith("broken.json")
+    assert all(record["days"] == expected["days"] for record in records[1:])
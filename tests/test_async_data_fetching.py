@@ -0,0 +1,68 @@
+import asyncio
+from queue import Queue
+
+import pytest
+from benchmarks.stub_server import StubForecastServer
+from external.async_client import AsyncConnectionPool
+from tasks import AsyncDataFetchingTask
+
+
+def drain(queue: Queue) -> dict:
+    result = {}
+    while not queue.empty():
+        result.update(queue.get())
+    return result
+
+
+def test_async_fetch(forecast_server):
+    cities = {
+        "MOSCOW": f"{forecast_server}/moscow-response.json",
+        "PARIS": f"{forecast_server}/paris-response.json",
+    }
+    queue = Queue()
+    AsyncDataFetchingTask(cities, queue, concurrency=1).run()
+
+    result = drain(queue)
+    assert set(result) == {"MOSCOW", "PARIS"}
+    assert result["MOSCOW"]["forecasts"][0]["date"] == "2022-05-18"
+
+
+def test_async_fetch_timeout_and_deadline():
+    with StubForecastServer(latency=0.5) as server:
+        queue = Queue()
+        AsyncDataFetchingTask(server.cities(3), queue, request_timeout=0.1).run()
+        assert drain(queue) == {"CITY0": {}, "CITY1": {}, "CITY2": {}}
+
+        queue = Queue()
+        AsyncDataFetchingTask(server.cities(3), queue, deadline=0.1).run()
+        assert drain(queue) == {"CITY0": {}, "CITY1": {}, "CITY2": {}}
+
+
+def test_failed_retry_closes_the_new_connection(forecast_server, monkeypatch):
+    url = f"{forecast_server}/moscow-response.json"
+    opened = []
+
+    async def scenario():
+        pool = AsyncConnectionPool()
+        await pool.request(url)
+        open_stream = pool._open
+
+        async def tracked_open(*key):
+            opened.append(await open_stream(*key))
+            return opened[-1]
+
+        async def broken_exchange(*args):
+            raise ConnectionResetError
+
+        monkeypatch.setattr(pool, "_open", tracked_open)
+        monkeypatch.setattr(pool, "_exchange", broken_exchange)
+        try:
+            with pytest.raises(ConnectionResetError):
+                await pool.request(url)
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+    assert len(opened) == 1
+    assert opened[0][1].is_closing()
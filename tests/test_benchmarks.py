@@ -0,0 +1,93 @@
+import json
+from queue import Queue
+
+import pytest
+from benchmarks.suite import BenchConfig, compare, percentile, run_suite
+from benchmarks.synthetic import (
+    SyntheticForecastServer,
+    generate_cities,
+    generate_payload,
+)
+from external.analyzer import analyze_json
+from external.client import YandexWeatherAPI
+from tasks import DataCalculationTask, DataFetchingTask
+
+
+@pytest.fixture
+def synthetic_server():
+    with SyntheticForecastServer(seed=7, days=3, hours=12) as server:
+        yield server
+
+
+def test_generator_is_deterministic_and_shaped_like_the_api():
+    cities = generate_cities(3, seed=7, days=3, hours=12)
+
+    assert cities == generate_cities(3, seed=7, days=3, hours=12)
+    assert cities != generate_cities(3, seed=8, days=3, hours=12)
+    assert cities["CITY0"] != cities["CITY1"]
+    forecasts = cities["CITY0"]["forecasts"]
+    assert [day["date"] for day in forecasts] == [
+        "2022-05-18",
+        "2022-05-19",
+        "2022-05-20",
+    ]
+    assert all(len(day["hours"]) == 12 for day in forecasts)
+    assert cities["CITY0"]["info"]["tzinfo"]["offset"] == 10800
+
+    result = DataCalculationTask.calculate_city_weather("CITY0", cities["CITY0"])
+    assert len(result["daily_data"]) == 3
+    # часы 9-19 в окно анализа попадают только частично
+    assert analyze_json(cities["CITY0"])["days"][0]["hours_count"] == 3
+
+
+def test_server_serves_a_payload_per_city(synthetic_server):
+    urls = synthetic_server.cities(2)
+    queue: Queue = Queue()
+    YandexWeatherAPI.configure_pool(2)
+
+    DataFetchingTask(urls, queue).run()
+
+    fetched = {}
+    while not queue.empty():
+        fetched.update(queue.get())
+    for city in urls:
+        assert fetched[city] == json.loads(generate_payload(city, 7, 3, 12))
+
+
+def test_percentile_is_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {
+        "fetch": {"throughput": 100.0, "p99": 0.010, "peak_kib": 1000.0},
+        "analyze": {"throughput": 100.0, "p99": 0.010, "peak_kib": 1000.0},
+    }
+    results = {
+        "fetch": {"throughput": 90.0, "p99": 0.011, "peak_kib": 1100.0},
+        "analyze": {"throughput": 50.0, "p99": 0.020, "peak_kib": 1000.0},
+        "new": {"throughput": 1.0, "p99": 1.0, "peak_kib": 1.0},
+    }
+
+    regressions = compare(results, baseline, tolerance=0.15)
+
+    assert len(regressions) == 2
+    assert all(regression.startswith("analyze:") for regression in regressions)
+
+
+def test_suite_runs_every_stage():
+    config = BenchConfig(cities=4, days=2, hours=24, latency=0.0, repeat=1)
+
+    results = run_suite(config, ["fetch_threads", "aggregate", "end_to_end"])
+
+    assert list(results) == ["fetch_threads", "aggregate", "end_to_end"]
+    for result in results.values():
+        assert result.items == 4
+        assert result.throughput > 0
+        assert 0 < result.p50 <= result.p99
+        assert result.peak_kib > 0
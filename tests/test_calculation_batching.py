@@ -0,0 +1,45 @@
+import threading
+from queue import Queue
+
+from benchmarks.bench_calculation import synthetic_cities
+from tasks import DataCalculationTask
+
+
+def test_batches_match_per_city_results():
+    cities = synthetic_cities(10)
+    input_queue, output_queue = Queue(), Queue()
+    for city, data in cities.items():
+        input_queue.put({city: data})
+    input_queue.put({"EMPTY": {}})
+    input_queue.put(None)
+
+    task = DataCalculationTask(input_queue, output_queue, chunk_size=4, max_workers=2)
+    task.run()
+
+    results = {}
+    while not output_queue.empty():
+        result = output_queue.get()
+        results[result["city"]] = result
+    assert results == {
+        city: DataCalculationTask.calculate_city_weather(city, data)
+        for city, data in cities.items()
+    }
+    assert [timing.size for timing in task.batch_timings].count(4) == 2
+    assert task.batch_stats()["cities"] == 10
+
+
+def test_results_published_before_sentinel():
+    input_queue, output_queue = Queue(), Queue()
+    task = DataCalculationTask(
+        input_queue, output_queue, chunk_size=100, max_latency=0.01, max_workers=1
+    )
+    thread = threading.Thread(target=task.run)
+    thread.start()
+
+    input_queue.put(synthetic_cities(1))
+    # пакет не заполнен, но max_latency истекает и результат уходит дальше
+    result = output_queue.get(timeout=30)
+    input_queue.put(None)
+    thread.join()
+
+    assert result["city"] == "CITY0"
@@ -0,0 +1,121 @@
+from queue import Queue
+
+import pytest
+from benchmarks.bench_calculation import synthetic_cities
+from benchmarks.synthetic import generate_cities
+from columnar import ColumnarWeatherEngine, np
+from external.analyzer import INPUT_DAY_SUITABLE_CONDITIONS
+from external.filters import HourFilter
+from tasks import DataCalculationTask
+
+BACKENDS = [False] + ([True] if np is not None else [])
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_matches_row_engine(use_numpy):
+    cities = synthetic_cities(12)
+    cities["EMPTY"] = {"forecasts": [{"date": "2022-05-26", "hours": []}]}
+    cities["COLD"] = {
+        "forecasts": [
+            {
+                "date": "2022-05-26",
+                "hours": [
+                    {"hour": "10", "temp": -3, "condition": "clear"},
+                    {"hour": "11", "temp": -2, "condition": "snow"},
+                ],
+            }
+        ]
+    }
+    expected = [
+        DataCalculationTask.calculate_city_weather(city, data)
+        for city, data in cities.items()
+    ]
+
+    assert ColumnarWeatherEngine.calculate(cities, use_numpy=use_numpy) == expected
+
+
+def test_task_skips_broken_city():
+    input_queue, output_queue = Queue(), Queue()
+    input_queue.put({"MOSCOW": synthetic_cities(1)["CITY0"]})
+    input_queue.put({"BROKEN": {"forecasts": [{"date": "2022-05-26", "hours": [{}]}]}})
+    input_queue.put(None)
+
+    DataCalculationTask(input_queue, output_queue, engine="columnar").run()
+
+    assert [output_queue.get()["city"]] == ["MOSCOW"]
+    assert output_queue.empty()
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_broken_city_leaves_columns_aligned(use_numpy):
+    cities = synthetic_cities(2)
+    engine = ColumnarWeatherEngine(use_numpy=use_numpy)
+    engine.add("CITY0", cities["CITY0"])
+    broken = [
+        {"hour": "10", "temp": 5, "condition": "clear"},
+        {"hour": "nine", "temp": 5, "condition": "clear"},
+        {"hour": "11", "temp": "warm", "condition": "clear"},
+        {"hour": "12", "temp": 5},
+    ]
+    for hours in broken[1:]:
+        with pytest.raises((KeyError, TypeError, ValueError)):
+            day = {"date": "2022-05-26", "hours": [broken[0], hours]}
+            engine.add("BROKEN", {"forecasts": [day]})
+    engine.add("CITY1", cities["CITY1"])
+
+    assert engine.run() == [
+        DataCalculationTask.calculate_city_weather(city, cities[city])
+        for city in ("CITY0", "CITY1")
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_fractional_temperatures_match_row_engine(use_numpy):
+    hours = [
+        {"hour": str(hour), "temp": hour / 3 - 0.1, "condition": "clear"}
+        for hour in range(24)
+    ]
+    cities = {"WARM": {"forecasts": [{"date": "2022-05-26", "hours": hours}] * 3}}
+
+    assert ColumnarWeatherEngine.calculate(cities, use_numpy=use_numpy) == [
+        DataCalculationTask.calculate_city_weather("WARM", cities["WARM"])
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+@pytest.mark.parametrize(
+    "day_filter",
+    [
+        HourFilter(6, 16, INPUT_DAY_SUITABLE_CONDITIONS, window_offset=0),
+        HourFilter(22, 3, ["clear", "overcast"]),
+    ],
+)
+def test_uses_the_shared_filter(use_numpy, day_filter):
+    cities = generate_cities(6, seed=3, days=3, hours=24)
+    for i, data in enumerate(cities.values()):
+        data["info"]["tzinfo"]["offset"] = 3600 * (i * 3 - 5)
+    expected = [
+        DataCalculationTask.calculate_city_weather(city, data, day_filter)
+        for city, data in cities.items()
+    ]
+
+    engine = ColumnarWeatherEngine(day_filter, use_numpy=use_numpy)
+    for city, data in cities.items():
+        engine.add(city, data)
+
+    assert engine.run() == expected
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_values_outside_the_window_are_not_read(use_numpy):
+    hours = [
+        {"hour": "3", "temp": None},
+        {"hour": "10", "temp": 12, "condition": "clear"},
+        {"hour": "22", "temp": "n/a", "condition": None},
+    ]
+    cities = {"ODD": {"forecasts": [{"date": "2022-05-26", "hours": hours}]}}
+
+    expected = DataCalculationTask.calculate_city_weather("ODD", cities["ODD"])
+
+    assert expected["avg_temp"] == 12 and expected["no_precipitation_hours"] == 1
+    assert ColumnarWeatherEngine.calculate(cities, use_numpy=use_numpy) == [expected]
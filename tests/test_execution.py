@@ -0,0 +1,139 @@
+import json
+import subprocess
+import sys
+import time
+from queue import Queue
+
+import pytest
+from benchmarks.bench_startup import ROOT, parse_importtime
+from benchmarks.stub_server import RESPONSE_PATH
+from execution import (
+    AUTO,
+    INLINE,
+    PROCESS,
+    THREAD,
+    InlineExecutor,
+    WorkerPool,
+    choose_mode,
+    gil_enabled,
+)
+from pipeline import Pipeline
+from tasks import DataCalculationTask
+
+
+@pytest.fixture
+def forecast():
+    return json.loads(RESPONSE_PATH.read_bytes())
+
+
+def calculate(items: list[dict], **kwargs) -> tuple[DataCalculationTask, list]:
+    input_queue, output_queue = Queue(), Queue()
+    for item in items:
+        input_queue.put(item)
+    input_queue.put(None)
+    task = DataCalculationTask(input_queue, output_queue, **kwargs)
+    task.run()
+    results = []
+    while not output_queue.empty():
+        results.append(output_queue.get())
+    return task, results
+
+
+@pytest.mark.skipif(not gil_enabled(), reason="threads are chosen without the GIL")
+def test_pool_is_chosen_only_when_it_pays_off():
+    # 15 городов по 1 мс: запуск пула дороже всей работы
+    assert choose_mode(15, 0.001, workers=4) == INLINE
+    assert choose_mode(1, 10.0, workers=4) == INLINE
+    assert choose_mode(1000, 0.001, workers=1) == INLINE
+    assert choose_mode(1000, 0.001, workers=4) == PROCESS
+    # у прогретого пула платить за запуск уже не нужно
+    assert choose_mode(40, 0.001, workers=4) == INLINE
+    assert choose_mode(40, 0.001, workers=4, pool_startup=0.0) == PROCESS
+
+
+def test_inline_executor_runs_in_place():
+    executor = InlineExecutor()
+
+    assert executor.submit(sum, [1, 2, 3]).result() == 6
+    with pytest.raises(ZeroDivisionError):
+        executor.submit(divmod, 1, 0).result()
+
+
+def test_auto_mode_keeps_a_short_list_inline(forecast):
+    cities = ["MOSCOW", "PARIS", "LONDON"]
+
+    task, results = calculate(
+        [{city: forecast} for city in cities], mode=AUTO, expected_items=3
+    )
+
+    assert task.chosen_mode == INLINE
+    assert results == [
+        DataCalculationTask.calculate_city_weather(city, forecast) for city in cities
+    ]
+    with pytest.raises(ValueError):
+        DataCalculationTask(Queue(), Queue(), mode="fibers")
+
+
+def test_columnar_engine_rejects_pool_modes():
+    for options in ({"mode": PROCESS}, {"mode": THREAD}, {"pool": WorkerPool(2)}):
+        with pytest.raises(ValueError):
+            DataCalculationTask(Queue(), Queue(), engine="columnar", **options)
+
+    task = DataCalculationTask(Queue(), Queue(), engine="columnar", mode=AUTO)
+    assert task.chosen_mode == INLINE
+
+
+def test_warm_pool_survives_the_task(forecast):
+    with WorkerPool(max_workers=2) as pool:
+        executor = pool.executor
+        for _ in range(2):
+            _, results = calculate([{"MOSCOW": forecast}], mode=PROCESS, pool=pool)
+            assert results == [
+                DataCalculationTask.calculate_city_weather("MOSCOW", forecast)
+            ]
+        assert pool.executor is executor
+        assert pool.startup_seconds is not None
+    assert not pool.warm
+
+
+def test_warm_pool_publishes_every_result_to_a_slow_stage(forecast):
+    def produce(_, output_queue):
+        for i in range(40):
+            output_queue.put({f"CITY{i}": forecast})
+
+    def slow_collect(input_queue, _):
+        cities = []
+        while (result := input_queue.get()) is not None:
+            time.sleep(0.005)
+            cities.append(result["city"])
+        return cities
+
+    with WorkerPool(max_workers=4) as pool:
+        for _ in range(2):
+            pipeline = Pipeline(queue_size=2)
+            pipeline.add_stage("produce", produce)
+            pipeline.add_stage(
+                "calculate",
+                lambda input_queue, output_queue: DataCalculationTask(
+                    input_queue, output_queue, chunk_size=4, mode=PROCESS, pool=pool
+                ).run(),
+            )
+            pipeline.add_stage("collect", slow_collect)
+            results = pipeline.run()
+
+            assert sorted(results["collect"]) == sorted(f"CITY{i}" for i in range(40))
+
+
+def test_cli_does_not_import_asyncio_or_multiprocessing():
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imported = {item.name for item in parse_importtime(process.stderr)}
+    assert "tasks" in imported
+    assert "asyncio" not in imported
+    assert "multiprocessing" not in imported
@@ -0,0 +1,94 @@
+import json
+import pickle
+import random
+from queue import Queue
+
+import pytest
+from benchmarks.stub_server import RESPONSE_PATH
+from benchmarks.synthetic import generate_forecast
+from external.analyzer import (
+    DAY_FILTER,
+    INPUT_DAY_SUITABLE_CONDITIONS,
+    analyze_json,
+)
+from external.filters import CONDITION_CODES, HourFilter, window_hours
+from tasks import DataCalculationTask
+
+
+def legacy_day(hours: list[dict]) -> tuple[int, int, int]:
+    count = temp = suitable = 0
+    for hour in hours:
+        if 9 <= int(hour["hour"]) <= 19:
+            count += 1
+            temp += hour["temp"]
+            if hour["condition"] in INPUT_DAY_SUITABLE_CONDITIONS:
+                suitable += 1
+    return count, temp, suitable
+
+
+def test_filter_matches_the_inline_checks():
+    forecast = generate_forecast(random.Random(1), days=10)
+
+    for day in forecast["forecasts"]:
+        rows = [(int(h["hour"]), h["temp"], h["condition"]) for h in day["hours"]]
+        hours, temps, conditions = zip(*rows)
+        codes = [CONDITION_CODES[condition] for condition in conditions]
+        expected = legacy_day(day["hours"])
+
+        assert DAY_FILTER.evaluate(rows)[:3] == expected
+        assert DAY_FILTER.evaluate_raw(day["hours"])[:3] == expected
+        assert DAY_FILTER.evaluate_codes(hours, temps, codes)[:3] == expected
+        assert DAY_FILTER.evaluate(rows)[3:] == (9, 19)
+
+
+def test_window_wraps_past_midnight():
+    assert window_hours(22, 2) == {22, 23, 0, 1, 2}
+    night = HourFilter(22, 2, ["clear"])
+
+    rows = [(hour, 1, "clear") for hour in range(24)]
+
+    assert night.evaluate(rows) == (5, 5, 5, 0, 23)
+    with pytest.raises(ValueError):
+        HourFilter(9, 24, ["clear"])
+
+
+def test_window_in_utc_is_shifted_to_city_hours():
+    utc_day = HourFilter(6, 16, INPUT_DAY_SUITABLE_CONDITIONS, window_offset=0)
+    data = json.loads(RESPONSE_PATH.read_bytes())
+
+    moscow = utc_day.for_city(data)
+
+    assert (moscow.hour_start, moscow.hour_end) == (9, 19)
+    assert utc_day.for_offset(10800) is moscow
+    assert utc_day.for_city({}) is utc_day
+    assert DAY_FILTER.for_city(data) is DAY_FILTER
+    assert DataCalculationTask.calculate_city_weather(
+        "MOSCOW", data, utc_day
+    ) == DataCalculationTask.calculate_city_weather("MOSCOW", data)
+
+
+def test_pickled_filter_rebuilds_its_mask():
+    restored = pickle.loads(pickle.dumps(DAY_FILTER))
+
+    assert restored.hours == DAY_FILTER.hours
+    assert restored.conditions == DAY_FILTER.conditions
+    assert restored.mask == DAY_FILTER.mask
+    assert restored.code_suitable(CONDITION_CODES["clear"])
+    assert not restored.code_suitable(CONDITION_CODES["rain"])
+
+
+def test_pool_and_analyzer_use_the_filter():
+    data = json.loads(RESPONSE_PATH.read_bytes())
+    evening = HourFilter(17, 23, ["overcast", "cloudy"])
+    input_queue, output_queue = Queue(), Queue()
+    input_queue.put({"MOSCOW": data})
+    input_queue.put(None)
+
+    DataCalculationTask(input_queue, output_queue, day_filter=evening).run()
+
+    result = output_queue.get()
+    assert result == DataCalculationTask.calculate_city_weather(
+        "MOSCOW", data, evening
+    )
+    assert result != DataCalculationTask.calculate_city_weather("MOSCOW", data)
+    assert analyze_json(data)["days"][0]["hours_start"] == 9
@@ -0,0 +1,93 @@
+from queue import Queue
+
+import pytest
+from benchmarks.bench_calculation import synthetic_cities
+from benchmarks.stub_server import StubForecastServer
+from metrics import Metrics, metrics
+from tasks import DataCalculationTask
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enabled = True
+    yield metrics
+    metrics.enabled = False
+    metrics.reset()
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics()
+    registry.inc("requests_total")
+    registry.observe("request_seconds", 0.1)
+    registry.observe_item("fetch_city_seconds", "MOSCOW", 0.1)
+    with registry.timer("stage_seconds"):
+        pass
+
+    assert registry.to_dict() == {
+        "counters": {},
+        "gauges": {},
+        "histograms": {},
+        "slowest": {},
+    }
+
+
+def test_histogram_quantiles_and_prometheus_format():
+    registry = Metrics(enabled=True)
+    for value in (0.001, 0.002, 0.02, 3.0):
+        registry.observe("request_seconds", value, mode="full")
+    registry.inc("errors_total", 2)
+
+    series = registry.to_dict()["histograms"]["request_seconds"][0]
+    assert series["labels"] == {"mode": "full"}
+    histogram = series["value"]
+    assert histogram["count"] == 4
+    assert histogram["p50"] == 0.0025
+    assert histogram["p99"] == 5.0
+
+    text = registry.to_prometheus()
+    assert "# TYPE weather_request_seconds histogram" in text
+    assert 'weather_request_seconds_bucket{mode="full",le="0.0025"} 2' in text
+    assert 'weather_request_seconds_bucket{mode="full",le="+Inf"} 4' in text
+    assert 'weather_request_seconds_count{mode="full"} 4' in text
+    assert "weather_errors_total 2" in text
+
+
+def test_slowest_items_are_kept():
+    registry = Metrics(enabled=True)
+    for i in range(20):
+        registry.observe_item("fetch_city_seconds", f"CITY{i}", i / 100)
+
+    slowest = registry.to_dict()["slowest"]["fetch_city_seconds"]
+    assert [entry["item"] for entry in slowest[:3]] == ["CITY19", "CITY18", "CITY17"]
+    assert len(slowest) == 10
+
+
+def test_pipeline_records_stage_metrics(enabled_metrics, run_pipeline):
+    with StubForecastServer() as server:
+        run_pipeline(server.cities(8), fetch_options={"max_workers": 4})
+
+    recorded = enabled_metrics.to_dict()
+    stages = {s["labels"]["stage"] for s in recorded["gauges"]["stage_seconds"]}
+    assert stages == {"fetch", "calculate", "aggregate", "analyze"}
+    assert recorded["histograms"]["fetch_city_seconds"][0]["value"]["count"] == 8
+    assert recorded["histograms"]["http_request_seconds"][0]["value"]["count"] == 8
+    assert len(recorded["slowest"]["fetch_city_seconds"]) == 8
+    assert "calc_batch_seconds" in recorded["histograms"]
+    utilization = {
+        s["labels"]["stage"] for s in recorded["gauges"]["worker_utilization"]
+    }
+    assert utilization == {"fetch", "calculate"}
+
+
+def test_columnar_pack_is_timed_per_city(enabled_metrics):
+    input_queue, output_queue = Queue(), Queue()
+    for city, data in synthetic_cities(3).items():
+        input_queue.put({city: data})
+    input_queue.put(None)
+
+    DataCalculationTask(input_queue, output_queue, engine="columnar").run()
+
+    recorded = enabled_metrics.to_dict()["histograms"]["columnar_seconds"]
+    counts = {s["labels"]["phase"]: s["value"]["count"] for s in recorded}
+    assert counts == {"pack": 3, "reduce": 1}
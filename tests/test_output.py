@@ -0,0 +1,130 @@
+import json
+import os
+import random
+import stat
+from queue import Queue
+
+import pytest
+from output import (
+    ColumnarReader,
+    ColumnarWriter,
+    JsonArrayWriter,
+    JsonLinesReader,
+    JsonLinesWriter,
+    open_reader,
+)
+from tasks import DataAggregationTask
+
+
+def city_results(count, seed=0):
+    rnd = random.Random(seed)
+    return [
+        {
+            "city": f"CITY{i}",
+            "daily_data": [
+                {
+                    "date": f"2022-05-{day:02d}",
+                    "avg_temp": rnd.randint(-10, 30),
+                    "no_precipitation_hours": rnd.randint(0, 11),
+                }
+                for day in range(18, 18 + rnd.randint(0, 5))
+            ],
+            "avg_temp": rnd.randint(-10, 30),
+            "no_precipitation_hours": rnd.randint(0, 55),
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize(
+    "writer, reader",
+    [
+        (JsonLinesWriter, JsonLinesReader),
+        (lambda path: ColumnarWriter(path, block_cities=3), ColumnarReader),
+    ],
+)
+def test_round_trip(tmp_path, writer, reader):
+    path = tmp_path / "aggregated"
+    results = city_results(10)
+    with writer(path) as output:
+        for result in results:
+            output.write(result)
+
+    loaded = reader(path)
+    assert list(loaded) == results
+    assert loaded.cities() == [result["city"] for result in results]
+    assert loaded.get("CITY7") == results[7]
+    assert loaded.get("UNKNOWN") is None
+    assert isinstance(open_reader(path), reader)
+
+
+@pytest.mark.parametrize("count", [0, 1, 5])
+def test_json_array_matches_indented_dump(tmp_path, count):
+    path = tmp_path / "aggregated_data.json"
+    results = city_results(count)
+    with JsonArrayWriter(path) as output:
+        output.write_all(results)
+
+    assert path.read_text() == json.dumps(results, indent=4)
+
+
+def test_columnar_daily_rows(tmp_path):
+    path = tmp_path / "aggregated.wcol"
+    results = city_results(7)
+    with ColumnarWriter(path, block_cities=2) as output:
+        output.write_all(results)
+
+    with ColumnarReader(path) as loaded:
+        assert list(loaded.daily_rows()) == [
+            (
+                result["city"],
+                daily["date"],
+                daily["avg_temp"],
+                daily["no_precipitation_hours"],
+            )
+            for result in results
+            for daily in result["daily_data"]
+        ]
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = tmp_path / "aggregated.jsonl"
+    with JsonLinesWriter(path) as output:
+        output.write_all(city_results(2))
+    previous = path.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with JsonLinesWriter(path) as output:
+            output.write_all(city_results(5, seed=1))
+            raise RuntimeError("pipeline failed")
+
+    assert path.read_bytes() == previous
+    assert [p.name for p in tmp_path.iterdir()] == ["aggregated.jsonl"]
+
+
+@pytest.mark.parametrize("writer", [JsonLinesWriter, ColumnarWriter])
+def test_published_file_has_default_mode(tmp_path, writer):
+    reference = tmp_path / "reference"
+    reference.write_text("")
+    path = tmp_path / "aggregated"
+
+    with writer(path) as output:
+        output.write_all(city_results(2))
+
+    mode = stat.S_IMODE(os.stat(path).st_mode)
+    assert mode == stat.S_IMODE(os.stat(reference).st_mode)
+
+
+def test_aggregation_streams_to_the_writer(tmp_path):
+    path = tmp_path / "aggregated.jsonl"
+    results = city_results(6)
+    input_queue = Queue()
+    for result in [*results, None]:
+        input_queue.put(result)
+
+    with JsonLinesWriter(path) as output:
+        task = DataAggregationTask(writer=output)
+        assert task.consume(input_queue) == 6
+
+    assert task.city_weather == []
+    assert list(JsonLinesReader(path)) == results
@@ -0,0 +1,61 @@
+import pytest
+from benchmarks.stub_server import StubForecastServer
+from pipeline import Pipeline, PipelineError
+
+
+def produce(count):
+    def target(_, output_queue):
+        for i in range(count):
+            output_queue.put(i)
+        return count
+
+    return target
+
+
+def collect(input_queue, _):
+    items = []
+    while (item := input_queue.get()) is not None:
+        items.append(item)
+    return items
+
+
+def test_backpressure_keeps_queue_bounded():
+    pipeline = Pipeline(queue_size=2)
+    depths = []
+
+    def slow_collect(input_queue, output_queue):
+        items = []
+        while (item := input_queue.get()) is not None:
+            depths.append(pipeline.queue_depths()["produce->collect"])
+            items.append(item)
+        return items
+
+    pipeline.add_stage("produce", produce(50)).add_stage("collect", slow_collect)
+    results = pipeline.run()
+
+    assert results["collect"] == list(range(50))
+    assert max(depths) <= 2
+
+
+def test_failed_stage_does_not_block_upstream():
+    def fail(input_queue, output_queue):
+        input_queue.get()
+        raise ValueError("broken stage")
+
+    pipeline = Pipeline(queue_size=1)
+    pipeline.add_stage("produce", produce(100))
+    pipeline.add_stage("fail", fail)
+    pipeline.add_stage("collect", collect)
+
+    with pytest.raises(PipelineError, match="broken stage"):
+        pipeline.run()
+    assert pipeline.results == {"produce": 100, "collect": []}
+    assert pipeline.channels[0].dropped > 0
+
+
+def test_weather_pipeline(run_pipeline):
+    with StubForecastServer() as server:
+        results = run_pipeline(server.cities(20), fetch_options={"max_workers": 4})
+
+    assert len(results["aggregate"]) == 20
+    assert results["analyze"][0]["rank"] == 1
@@ -0,0 +1,48 @@
+import copy
+import json
+
+from benchmarks.stub_server import RESPONSE_PATH
+from external.analyzer import analyze_json
+from external.projection import decode_projected
+from tasks import DataCalculationTask
+
+
+def test_projected_fields():
+    data = decode_projected(RESPONSE_PATH.read_bytes())
+
+    assert set(data) == {"forecasts", "info"}
+    assert data["info"] == {"tzinfo": {"offset": 10800}}
+    assert set(data["forecasts"][0]) == {"date", "hours"}
+    assert data["forecasts"][0]["hours"][0] == {
+        "hour": "0",
+        "temp": 10,
+        "condition": "overcast",
+    }
+
+
+def test_projected_results_match_full_decode():
+    body = RESPONSE_PATH.read_bytes()
+    full, projected = json.loads(body), decode_projected(body)
+
+    assert DataCalculationTask.calculate_city_weather(
+        "MOSCOW", projected
+    ) == DataCalculationTask.calculate_city_weather("MOSCOW", full)
+    expected = copy.deepcopy(analyze_json(full))
+    assert analyze_json(projected) == expected
+
+
+def test_objects_without_projected_fields_stay_dicts():
+    body = json.dumps(
+        {
+            "fact": {"temp": 20},
+            "forecasts": [
+                {"date": "2022-05-26", "hours": [{"uv_index": 3}], "parts": {}},
+                {"week": 21},
+            ],
+        }
+    ).encode("utf-8")
+
+    assert decode_projected(body) == {
+        "forecasts": [{"date": "2022-05-26", "hours": [{}]}, {}]
+    }
+    assert decode_projected(b'{"fact": {"temp": 20}}') == {}
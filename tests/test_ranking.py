@@ -0,0 +1,71 @@
+import copy
+import random
+
+import pytest
+from ranking import RankingIndex
+from tasks import DataAnalyzingTask
+
+
+def full_sort_ranking(aggregated_data):
+    """Ranking of the original DataAnalyzingTask: three full sorts"""
+    by_temp = sorted(aggregated_data, key=lambda x: x["avg_temp"], reverse=True)
+    by_precipitation = sorted(
+        aggregated_data, key=lambda x: x["no_precipitation_hours"], reverse=True
+    )
+    temp_rank = {id(city): rank for rank, city in enumerate(by_temp, 1)}
+    precipitation_rank = {id(city): rank for rank, city in enumerate(by_precipitation, 1)}
+    ranked = sorted(
+        aggregated_data,
+        key=lambda x: (temp_rank[id(x)], precipitation_rank[id(x)]),
+    )
+    return [{**city, "rank": rank} for rank, city in enumerate(ranked, 1)]
+
+
+def random_cities(count, seed=0):
+    rnd = random.Random(seed)
+    return [
+        {
+            "city": f"CITY{i}",
+            "avg_temp": rnd.randint(-5, 30),
+            "no_precipitation_hours": rnd.randint(0, 55),
+            "daily_data": [],
+        }
+        for i in range(count)
+    ]
+
+
+def test_incremental_matches_full_sort():
+    cities = random_cities(500)
+    index = RankingIndex()
+    for i, city in enumerate(cities, 1):
+        index.add(city)
+        if i % 50 == 0:
+            assert index.top(10) == full_sort_ranking(cities[:i])[:10]
+
+    assert index.ranked() == full_sort_ranking(cities)
+
+
+def test_analyzing_does_not_mutate_input():
+    cities = random_cities(20)
+    snapshot = copy.deepcopy(cities)
+
+    best = DataAnalyzingTask(cities).run()
+
+    assert cities == snapshot
+    assert best == full_sort_ranking(cities)[:1]
+    assert best[0]["rank"] == 1
+
+
+def test_bounded_index_keeps_only_the_top_records():
+    cities = random_cities(500, seed=1)
+    index = RankingIndex(keep=10)
+    for i, city in enumerate(cities, 1):
+        index.add(city)
+        if i % 50 == 0:
+            assert index.top(10) == full_sort_ranking(cities[:i])[:10]
+        assert len(index._records) == min(i, 10)
+
+    assert len(index) == 500
+    assert index.ranks() == RankingIndex(cities).ranks()
+    with pytest.raises(ValueError):
+        index.top(11)
@@ -0,0 +1,162 @@
+import sys
+import time
+from queue import Queue
+
+import main
+import pytest
+from benchmarks.stub_server import FaultyForecastServer
+from external.resilience import CircuitBreaker, ResilientWeatherAPI, RetryPolicy
+from tasks import AsyncDataFetchingTask, DataFetchingTask
+
+FAST_RETRY = RetryPolicy(attempts=3, base_delay=0.01, max_delay=0.05)
+
+
+@pytest.fixture
+def faulty_server():
+    with FaultyForecastServer(stall=1.0) as server:
+        yield server
+
+
+def test_retries_recover_from_errors(faulty_server):
+    url = f"{faulty_server.url}/moscow-response.json"
+    faulty_server.schedule("/moscow-response.json", "error", "error")
+    api = ResilientWeatherAPI(timeout=2.0, retry=FAST_RETRY)
+
+    data = api.get_forecasting(url)
+
+    assert data["info"]["tzinfo"]["offset"] == 10800
+    report = api.report.to_dict()
+    assert report["outcomes"] == {"ok": 1}
+    assert report["attempts"] == 3 and report["retries"] == 2
+    assert faulty_server.requests_served == 3
+
+
+def test_reset_connection_is_retried(faulty_server):
+    faulty_server.schedule("/reset-response.json", "reset", "reset")
+    api = ResilientWeatherAPI(timeout=2.0, retry=FAST_RETRY)
+
+    api.get_forecasting(f"{faulty_server.url}/reset-response.json")
+
+    assert api.report.outcomes[0].status == "ok"
+    assert faulty_server.requests_served == 3
+
+
+def test_stalled_request_times_out_and_is_retried(faulty_server):
+    faulty_server.schedule("/stall-response.json", "stall")
+    api = ResilientWeatherAPI(timeout=0.2, retry=FAST_RETRY)
+
+    started = time.monotonic()
+    api.get_forecasting(f"{faulty_server.url}/stall-response.json")
+
+    assert time.monotonic() - started < 0.9
+    assert api.report.outcomes[0].attempts == 2
+
+
+def test_trickled_response_is_cut_at_the_attempt_timeout(faulty_server):
+    faulty_server.schedule("/trickle-response.json", "trickle")
+    api = ResilientWeatherAPI(timeout=0.3, retry=FAST_RETRY)
+
+    started = time.monotonic()
+    data = api.get_forecasting(f"{faulty_server.url}/trickle-response.json")
+
+    assert time.monotonic() - started < 0.9
+    assert data["info"]["tzinfo"]["offset"] == 10800
+    assert api.report.outcomes[0].attempts == 2
+
+
+def test_total_deadline(faulty_server):
+    faulty_server.default_fault = "stall"
+    api = ResilientWeatherAPI(timeout=5.0, deadline=0.3, retry=FAST_RETRY)
+
+    started = time.monotonic()
+    with pytest.raises(Exception):
+        api.get_forecasting(f"{faulty_server.url}/slow-response.json")
+
+    assert time.monotonic() - started < 0.9
+    assert api.report.outcomes[0].status == "deadline"
+
+
+def test_circuit_breaker_stops_requests_to_failing_host(faulty_server):
+    faulty_server.default_fault = "error"
+    api = ResilientWeatherAPI(
+        retry=RetryPolicy(attempts=1), breaker_threshold=2, breaker_reset=60
+    )
+
+    for i in range(4):
+        with pytest.raises(Exception):
+            api.get_forecasting(f"{faulty_server.url}/city{i}-response.json")
+
+    statuses = [outcome.status for outcome in api.report.outcomes]
+    assert statuses == ["failed", "failed", "circuit_open", "circuit_open"]
+    assert faulty_server.requests_served == 2
+
+
+def test_circuit_breaker_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # одна пробная попытка за раз
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_retry_policy_requires_an_attempt(monkeypatch):
+    with pytest.raises(ValueError):
+        RetryPolicy(attempts=0)
+
+    monkeypatch.setattr(sys, "argv", ["main.py", "--retries", "0"])
+    with pytest.raises(SystemExit):
+        main.parse_args()
+
+
+def test_hedged_request_wins_over_stalled_one(faulty_server):
+    faulty_server.schedule("/hedge-response.json", "stall")
+    api = ResilientWeatherAPI(timeout=5.0, hedge_after=0.05, retry=FAST_RETRY)
+
+    started = time.monotonic()
+    api.get_forecasting(f"{faulty_server.url}/hedge-response.json")
+    api.close()
+
+    assert time.monotonic() - started < 0.9
+    outcome = api.report.outcomes[0]
+    assert outcome.hedged and outcome.hedge_won and outcome.attempts == 1
+
+
+def test_fetching_task_reports_failed_cities(faulty_server):
+    cities = faulty_server.cities(4)
+    faulty_server.schedule("/city3-response.json", "error", "error", "error")
+    api = ResilientWeatherAPI(timeout=2.0, retry=FAST_RETRY)
+    output_queue = Queue()
+
+    DataFetchingTask(cities, output_queue, max_workers=2, api=api).run()
+
+    fetched = {}
+    while not output_queue.empty():
+        fetched.update(output_queue.get())
+    assert fetched["CITY3"] == {} and all(fetched[f"CITY{i}"] for i in range(3))
+    report = api.report.to_dict({url: city for city, url in cities.items()})
+    assert report["outcomes"] == {"ok": 3, "failed": 1}
+    assert [failure["name"] for failure in report["failures"]] == ["CITY3"]
+
+
+def test_async_fetching_task_goes_through_the_api(faulty_server):
+    cities = faulty_server.cities(4)
+    faulty_server.schedule("/city0-response.json", "error", "error")
+    faulty_server.schedule("/city1-response.json", "trickle")
+    faulty_server.schedule("/city3-response.json", "error", "error", "error")
+    api = ResilientWeatherAPI(timeout=0.3, retry=FAST_RETRY)
+    output_queue = Queue()
+
+    AsyncDataFetchingTask(cities, output_queue, api=api).run()
+
+    fetched = {}
+    while not output_queue.empty():
+        fetched.update(output_queue.get())
+    assert fetched["CITY3"] == {} and all(fetched[f"CITY{i}"] for i in range(3))
+    report = api.report.to_dict({url: city for city, url in cities.items()})
+    assert report["outcomes"] == {"ok": 3, "failed": 1}
+    assert report["retries"] == 2 + 1 + 2
+    assert [failure["name"] for failure in report["failures"]] == ["CITY3"]
@@ -0,0 +1,62 @@
+import pytest
+from benchmarks.stub_server import StubForecastServer
+from external.cache import ResponseCache
+from external.client import YandexWeatherAPI
+from external.transport import Response
+
+
+@pytest.fixture
+def server():
+    with StubForecastServer() as server:
+        yield server
+
+
+@pytest.fixture
+def use_cache():
+    def configure(cache):
+        YandexWeatherAPI.configure_cache(cache)
+        return cache
+
+    yield configure
+    YandexWeatherAPI.configure_cache(None)
+
+
+def test_fresh_entry_is_served_from_disk(server, use_cache, tmp_path):
+    cache = use_cache(ResponseCache(tmp_path, ttl=60))
+    url = f"{server.url}/moscow-response.json"
+
+    first = YandexWeatherAPI.get_forecasting(url)
+    second = YandexWeatherAPI.get_forecasting(url)
+
+    assert first == second
+    assert server.requests_served == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 1
+
+
+def test_stale_entry_is_revalidated(server, use_cache, tmp_path):
+    cache = use_cache(ResponseCache(tmp_path, ttl=0))
+    url = f"{server.url}/moscow-response.json"
+
+    YandexWeatherAPI.get_forecasting(url)
+    # новый экземпляр читает записи с диска
+    cache = use_cache(ResponseCache(tmp_path, ttl=0))
+    data = YandexWeatherAPI.get_forecasting(url)
+
+    assert data["info"]["geoid"] == 213
+    assert server.requests_served == 2
+    assert cache.stats.revalidated == 1
+    assert cache.stats.bytes_saved == len(server.payload)
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=25)
+    for name in ("a", "b", "c"):
+        cache.update(name, Response(200, "OK", {}, b"0123456789"))
+    cache.lookup("b")
+    cache.update("d", Response(200, "OK", {}, b"0123456789"))
+
+    assert cache.lookup("a") is None
+    assert cache.lookup("c") is None
+    assert cache.lookup("b").body == b"0123456789"
+    assert cache.stats.evicted == 2
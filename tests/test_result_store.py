@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from benchmarks.stub_server import RESPONSE_PATH, StubForecastServer
+from external.analyzer import DAY_FILTER
+from external.filters import HourFilter
+from store import ResultStore, ReusedResult
+from tasks import AsyncDataFetchingTask, DataFetchingTask
+
+
+def warmer_payload():
+    data = json.loads(RESPONSE_PATH.read_bytes())
+    for forecast in data["forecasts"]:
+        for hour in forecast["hours"]:
+            hour["temp"] += 5
+    return json.dumps(data).encode("utf-8")
+
+
+@pytest.fixture
+def run_stored(run_pipeline):
+    def run(cities, store, fetching_task=DataFetchingTask, day_filter=DAY_FILTER):
+        results = run_pipeline(
+            cities, fetching_task, store=store, queue_size=4, day_filter=day_filter
+        )
+        store.save()
+        return sorted(results["aggregate"], key=lambda result: result["city"])
+
+    return run
+
+
+@pytest.mark.parametrize("fetching_task", [DataFetchingTask, AsyncDataFetchingTask])
+def test_unchanged_payloads_are_reused(tmp_path, fetching_task, run_stored):
+    path = tmp_path / "results.json"
+    with StubForecastServer() as server:
+        cities = server.cities(10)
+        first_store = ResultStore(path)
+        first = run_stored(cities, first_store, fetching_task)
+        second_store = ResultStore(path)
+        second = run_stored(cities, second_store, fetching_task)
+
+    assert first_store.stats.to_dict() == {
+        "reused": 0,
+        "computed": 10,
+        "reuse_ratio": 0.0,
+    }
+    assert second_store.stats.to_dict() == {
+        "reused": 10,
+        "computed": 0,
+        "reuse_ratio": 1.0,
+    }
+    assert second == first
+    assert all(isinstance(result, ReusedResult) for result in second)
+
+
+def test_changed_payloads_are_recalculated(tmp_path, run_stored):
+    path = tmp_path / "results.json"
+    with StubForecastServer() as server:
+        before = run_stored(server.cities(4), ResultStore(path))
+    with StubForecastServer(payload=warmer_payload()) as server:
+        store = ResultStore(path)
+        after = run_stored(server.cities(4), store)
+
+    assert store.stats.computed == 4 and store.stats.reused == 0
+    assert [r["avg_temp"] for r in after] == [r["avg_temp"] + 5 for r in before]
+    assert ResultStore(path).lookup("CITY0", warmer_payload()) == after[0]
+
+
+def test_changed_filter_is_recalculated(tmp_path, run_stored):
+    path = tmp_path / "results.json"
+    evening = HourFilter(17, 23, ["overcast", "cloudy"])
+    with StubForecastServer() as server:
+        cities = server.cities(4)
+        before = run_stored(cities, ResultStore(path, {"day_filter": DAY_FILTER}))
+        store = ResultStore(path, {"day_filter": evening})
+        after = run_stored(cities, store, day_filter=evening)
+        reordered = HourFilter(17, 23, ["cloudy", "overcast"])
+        same = ResultStore(path, {"day_filter": reordered})
+        run_stored(cities, same, day_filter=evening)
+
+    assert store.stats.computed == 4 and store.stats.reused == 0
+    assert after != before
+    assert same.stats.reused == 4
+
+
+def test_broken_store_file_is_ignored(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text("{not json")
+
+    store = ResultStore(path)
+
+    assert len(store) == 0
+    assert store.lookup("MOSCOW", b"{}") is None
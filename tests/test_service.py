@@ -0,0 +1,150 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+from benchmarks.synthetic import SyntheticForecastServer, generate_cities
+from external.resilience import ResilientWeatherAPI
+from service import ForecastService, ServiceHTTPServer, TTLCache
+from tasks import DataAnalyzingTask, DataCalculationTask
+
+
+@pytest.fixture
+def synthetic_server():
+    with SyntheticForecastServer(seed=3, days=3, latency=0.05) as server:
+        yield server
+
+
+@pytest.fixture
+def service(synthetic_server):
+    service = ForecastService(synthetic_server.cities(6), refresh_interval=60)
+    yield service.start()
+    service.stop()
+
+
+@pytest.fixture
+def api_url(service):
+    server = ServiceHTTPServer(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.url
+    server.shutdown()
+    server.server_close()
+
+
+def get_json(url: str, method: str = "GET"):
+    with urlopen(Request(url, method=method), timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl=10)
+    cache.put("MOSCOW", {"avg_temp": 10}, now=100.0)
+
+    assert cache.get("MOSCOW", now=109.9) == {"avg_temp": 10}
+    assert cache.live(now=110.0) == {}
+    assert cache.get("MOSCOW", now=110.0) is None
+    assert len(cache) == 0
+
+
+def test_rankings_match_the_analyzing_task(service):
+    forecasts = generate_cities(6, seed=3, days=3)
+    expected = DataAnalyzingTask(
+        [
+            DataCalculationTask.calculate_city_weather(city, data)
+            for city, data in forecasts.items()
+        ]
+    )
+
+    assert service.top(3) == expected.top(3)
+    assert service.best() == expected.best()
+    assert service.city("CITY2") == DataCalculationTask.calculate_city_weather(
+        "CITY2", forecasts["CITY2"]
+    )
+    assert service.stats.hits == 1 and service.stats.misses == 0
+
+
+def test_concurrent_refreshes_of_a_city_are_coalesced(synthetic_server):
+    service = ForecastService(synthetic_server.cities(2))
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.refresh(["CITY1"])))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert synthetic_server.requests_served == 1
+    assert service.stats.coalesced == 4
+    assert all(result == results[0] for result in results)
+    assert results[0]["CITY1"]["city"] == "CITY1"
+
+
+def test_duplicate_names_are_refreshed_once(synthetic_server):
+    service = ForecastService(synthetic_server.cities(2))
+
+    result = service.refresh(["CITY1", "CITY1"])
+
+    assert list(result) == ["CITY1"]
+    assert synthetic_server.requests_served == 1
+    assert service.stats.coalesced == 0
+
+
+def test_failed_warm_up_shuts_the_pool_down(synthetic_server, monkeypatch):
+    service = ForecastService(synthetic_server.cities(2), calc_workers=1)
+
+    def broken_load(cities):
+        raise RuntimeError("registry is down")
+
+    monkeypatch.setattr(service, "_load", broken_load)
+    with pytest.raises(RuntimeError):
+        service.start()
+
+    assert not service.pool.warm
+
+
+def test_stats_report_only_the_last_refresh(synthetic_server):
+    api = ResilientWeatherAPI()
+    service = ForecastService(synthetic_server.cities(3), api=api)
+    try:
+        service.refresh()
+        service.refresh(["CITY1"])
+    finally:
+        api.close()
+
+    report = service.to_dict()["last_refresh"]
+
+    assert report["requests"] == 1 and report["outcomes"] == {"ok": 1}
+    assert len(api.report.outcomes) == 1
+
+
+def test_cache_miss_fetches_the_city(synthetic_server):
+    service = ForecastService(synthetic_server.cities(3))
+
+    assert service.city("CITY0")["city"] == "CITY0"
+    assert service.city("CITY0")["city"] == "CITY0"
+    assert service.city("PARIS") is None
+    assert synthetic_server.requests_served == 1
+    assert service.stats.to_dict()["hits"] == 1
+
+
+def test_http_api(api_url, service):
+    status, best = get_json(f"{api_url}/best")
+    assert status == 200 and best == service.best()
+
+    status, top = get_json(f"{api_url}/top?k=2")
+    assert [city["rank"] for city in top] == [1, 2]
+
+    status, city = get_json(f"{api_url}/cities/city4")
+    assert city["city"] == "CITY4" and len(city["daily_data"]) == 3
+
+    status, refreshed = get_json(f"{api_url}/refresh?city=CITY4", method="POST")
+    assert refreshed == {"requested": 1, "refreshed": 1}
+
+    for path, code in (("/cities/PARIS", 404), ("/top?k=x", 400), ("/nope", 404)):
+        with pytest.raises(HTTPError) as error:
+            get_json(f"{api_url}{path}")
+        assert error.value.code == code
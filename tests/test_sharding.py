@@ -0,0 +1,61 @@
+import random
+
+from benchmarks.stub_server import StubForecastServer
+from sharding import HashRing, merge_rankings, run_sharded, shard_names
+from tasks import DataAnalyzingTask
+
+
+def test_ring_spreads_cities_and_moves_few_on_resize():
+    cities = {f"CITY{i}": "" for i in range(20000)}
+    ring = HashRing(shard_names(4))
+    before = {city: ring.shard_for(city) for city in cities}
+
+    sizes = [len(part) for part in ring.partition(cities).values()]
+    assert min(sizes) > 0.15 * len(cities) and max(sizes) < 0.35 * len(cities)
+
+    ring.add("shard-4")
+    moved = [city for city in cities if ring.shard_for(city) != before[city]]
+    assert 0.1 * len(cities) < len(moved) < 0.3 * len(cities)
+    assert all(ring.shard_for(city) == "shard-4" for city in moved)
+
+    ring.remove("shard-4")
+    assert {city: ring.shard_for(city) for city in cities} == before
+
+
+def test_merged_partial_rankings_match_global_ranking():
+    rnd = random.Random(0)
+    temps = rnd.sample(range(-500, 500), 300)
+    results = [
+        {
+            "city": f"CITY{i}",
+            "daily_data": [],
+            "avg_temp": temp,
+            "no_precipitation_hours": rnd.randint(0, 55),
+        }
+        for i, temp in enumerate(temps)
+    ]
+    ring = HashRing(shard_names(3))
+    shards = {shard: [] for shard in ring.shards}
+    for result in results:
+        shards[ring.shard_for(result["city"])].append(result)
+
+    partials = [DataAnalyzingTask(part).top(5) for part in shards.values()]
+    merged = merge_rankings(partials)
+
+    assert merged.top(5) == DataAnalyzingTask(results).top(5)
+    assert merged.best() == DataAnalyzingTask(results).best()
+
+
+def test_local_shard_processes(tmp_path):
+    with StubForecastServer() as server:
+        cities = server.cities(12)
+        ranking = run_sharded(cities, 3, str(tmp_path), top_k=12, calc_workers=1)
+
+    top = ranking.top(12)
+    assert sorted(city["city"] for city in top) == sorted(cities)
+    assert [city["rank"] for city in top] == list(range(1, 13))
+    shard_results = sum(
+        len((tmp_path / f"{shard}.jsonl").read_text().splitlines())
+        for shard in shard_names(3)
+    )
+    assert shard_results == 12
@@ -0,0 +1,68 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from external.client import YandexWeatherAPI
+from external.transport import ConnectionPool, decode_body
+
+
+def test_connection_is_reused(forecast_server):
+    pool = ConnectionPool(maxsize=2)
+    for _ in range(5):
+        response = pool.request(f"{forecast_server}/moscow-response.json")
+        assert response.status == 200
+
+    assert pool.stats.requests == 5
+    assert pool.stats.connections_opened == 1
+    assert pool.stats.connections_reused == 4
+    pool.close()
+
+
+def test_gzip_response_is_decoded(forecast_server):
+    pool = ConnectionPool()
+    response = pool.request(f"{forecast_server}/moscow-response.json")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "forecasts" in json.loads(response.body)
+    pool.close()
+
+
+@pytest.mark.parametrize("compress", [zlib.compress, gzip.compress])
+def test_decode_body(compress):
+    body = b'{"hour": "10"}'
+    encoding = "gzip" if compress is gzip.compress else "deflate"
+    assert decode_body(compress(body), encoding) == body
+
+
+def test_get_forecasting_uses_pool(forecast_server):
+    before = YandexWeatherAPI.pool_stats()["requests"]
+    data = YandexWeatherAPI.get_forecasting(f"{forecast_server}/paris-response.json")
+
+    assert data["info"]["tzinfo"]["name"] == "Europe/Moscow"
+    assert YandexWeatherAPI.pool_stats()["requests"] == before + 1
+
+
+def test_failed_retry_closes_the_new_connection(forecast_server, monkeypatch):
+    url = f"{forecast_server}/moscow-response.json"
+    pool = ConnectionPool()
+    pool.request(url)
+    opened = []
+    new_connection = pool._new_connection
+
+    def tracked_connection(*key):
+        opened.append(new_connection(*key))
+        return opened[-1]
+
+    def broken_send(connection, *args):
+        connection.connect()
+        raise ConnectionResetError
+
+    monkeypatch.setattr(pool, "_new_connection", tracked_connection)
+    monkeypatch.setattr(pool, "_send", broken_send)
+    with pytest.raises(ConnectionResetError):
+        pool.request(url)
+
+    assert len(opened) == 1
+    assert opened[0].sock is None
+    pool.close()
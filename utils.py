@@ -1,4 +1,3 @@
-import json
 from typing import Any
 
 CITIES = {
@@ -48,5 +47,8 @@ def get_url_by_city_name(city_name):
 
 
 def save_to_json(data: list[dict[str, Any]], filename: str):
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=4)
+    from output import JsonArrayWriter
+
+    # тот же формат, что у json.dump(indent=4), но файл подменяется атомарно
+    with JsonArrayWriter(filename) as writer:
+        writer.write_all(data)